@@ -5,8 +5,10 @@ A minimal example of using the DNA synthesis API.
 import asyncio
 
 from openoligo.hal.instrument import Instrument
+from openoligo.hal.platform import Platform, __platform__
 from openoligo.protocols.oligosynthesis import synthesize_ssdna
 from openoligo.seq import Seq
+from openoligo.utils import run_virtual
 from openoligo.utils.logger import OligoLogger
 
 rl = OligoLogger(rotates=False)
@@ -15,9 +17,14 @@ logger = rl.get_logger()
 
 def main():
     inst = Instrument()
+    inst.setup()
 
     try:
-        asyncio.run(synthesize_ssdna(inst, Seq("ATCGAAATTTTT")))
+        synthesis = synthesize_ssdna(inst, Seq("ATCGAAATTTTT"))
+        if __platform__ == Platform.SIM:
+            run_virtual(synthesis)  # Simulate in virtual time, instantly
+        else:
+            asyncio.run(synthesis)
         logger.info("Synthesis Complete! Exiting...")
     except KeyboardInterrupt:
         logger.warning("Keyboard interrupt received, exiting...")
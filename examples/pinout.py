@@ -21,6 +21,7 @@ pinout = Pinout(
 )
 
 ins = Instrument(pinout=pinout)
+ins.setup()
 
 ins.all_except(["a", "waste_rxn", "rxn_out"])
 wait(10)
@@ -0,0 +1,119 @@
+"""
+Registry of the amidites in the inventory, compiled once into an Alphabet.
+
+The alphabet is loaded from the Reactant table the first time it is needed and kept until
+a reagent is saved or deleted, so validating and parsing sequences never hits the database
+or rebuilds the lookup tables per request.
+
+The alphabet may be limited to the amidites that the pinout of the instrument has a valve for,
+so that a sequence the instrument can not synthesize is rejected before it is queued.
+
+Changes are noticed through the model signals, so reagents must be added, changed and
+removed through model instances rather than bulk queryset updates.
+"""
+import logging
+from typing import Collection, Iterable, Optional
+
+from tortoise.signals import post_delete, post_save
+
+from openoligo.api.models import Reactant, ReactantType
+from openoligo.hal.board import Pinout
+from openoligo.seq import Alphabet, Phosphoramidite, builtin_alphabet, phosphoramidite_alphabet
+
+AMIDITE_REACTANT_TYPES = (ReactantType.NUCLEOTIDE, ReactantType.MODIFIED_NUCLEOTIDE)
+
+
+def pinout_amidites(pinout: Pinout) -> frozenset[Phosphoramidite]:
+    """
+    The amidites that a pinout has a valve for.
+
+    The protocols route an amidite to the valve named after it in a sequence (eg. A or 5mC).
+    """
+    names = {name.lower() for name in pinout.phosphoramidites}
+    return frozenset(amidite for amidite in Phosphoramidite if amidite.value.lower() in names)
+
+
+def compile_alphabet(
+    accronyms: Iterable[str], available: Optional[Collection[Phosphoramidite]] = None
+) -> Alphabet:
+    """
+    Compile the accronyms of the amidites in the inventory into an Alphabet.
+
+    Accronyms may be written any way a sequence may (eg. 5mC, M5C or GalNAc). Accronyms that
+    are not a known amidite are ignored, and an empty inventory gives every known amidite, so
+    that an instrument is usable before its inventory is filled in.
+
+    args:
+        accronyms: Accronyms of the amidites in the inventory.
+        available: Amidites the instrument has a valve for, the others are left out.
+    """
+    tokens = phosphoramidite_alphabet()
+    inventory: dict[Phosphoramidite, str] = {}
+    for accronym in accronyms:
+        amidite = tokens.get(accronym)
+        if amidite is None:
+            logging.warning("Ignoring reagent '%s', it is not a known amidite", accronym)
+            continue
+        inventory.setdefault(amidite, accronym)
+    if available is None:
+        return Alphabet(inventory) if inventory else builtin_alphabet
+    return Alphabet(
+        {
+            amidite: accronym
+            for amidite, accronym in (inventory or builtin_alphabet.accronyms).items()
+            if amidite in available
+        }
+    )
+
+
+class AlphabetRegistry:
+    """
+    The Alphabet of the amidites in the inventory, loaded once per pinout and reloaded only
+    after the reagents change.
+    """
+
+    def __init__(self) -> None:
+        self._alphabets: dict[Optional[frozenset[Phosphoramidite]], Alphabet] = {}
+        self._generation = 0
+
+    async def get(self, pinout: Optional[Pinout] = None) -> Alphabet:
+        """
+        The alphabet of the inventory, loading it from the database if needed.
+
+        args:
+            pinout: Pinout of the instrument, to leave out the amidites it has no valve for.
+        """
+        available = None if pinout is None else pinout_amidites(pinout)
+        alphabet = self._alphabets.get(available)
+        if alphabet is not None:
+            return alphabet
+
+        generation = self._generation
+        accronyms = await Reactant.filter(reactant_type__in=AMIDITE_REACTANT_TYPES).values_list(
+            "accronym", flat=True
+        )
+        alphabet = compile_alphabet(accronyms, available)  # type: ignore
+        if generation == self._generation:  # Unless the reagents changed while loading
+            self._alphabets[available] = alphabet
+            logging.debug("Loaded the amidite alphabet: %s", alphabet)
+        return alphabet
+
+    def invalidate(self) -> None:
+        """Forget the loaded alphabet, the next get loads it again."""
+        self._alphabets.clear()
+        self._generation += 1
+
+
+alphabet_registry = AlphabetRegistry()
+
+
+@post_save(Reactant)
+async def _reactant_saved(*_args, **_kwargs) -> None:
+    """Reload the alphabet after a reagent is added or changed."""
+    alphabet_registry.invalidate()
+
+
+@post_delete(Reactant)
+async def _reactant_deleted(*_args, **_kwargs) -> None:
+    """Reload the alphabet after a reagent is removed."""
+    alphabet_registry.invalidate()
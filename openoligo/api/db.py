@@ -9,6 +9,9 @@ from openoligo.hal.platform import Platform
 
 tmp_dir = os.getenv("OO_TMP_DIR", "/tmp")
 
+# Name of the connection of the models, the same as their app, as the test databases name it
+DB_CONNECTION = "models"
+
 
 def get_db_url(platform: Platform) -> str:
     """Get the database URL for the given platform."""
@@ -25,6 +28,14 @@ async def db_init(url: str):
     """Initialize the database."""
 
     await Tortoise.init(
-        db_url=url, modules={"models": ["openoligo.api.models"]}
+        config={
+            "connections": {DB_CONNECTION: url},
+            "apps": {
+                "models": {
+                    "models": ["openoligo.api.models"],
+                    "default_connection": DB_CONNECTION,
+                }
+            },
+        }
     )  # pragma: no cover
     await Tortoise.generate_schemas()  # pragma: no cover
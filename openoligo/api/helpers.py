@@ -2,62 +2,77 @@
 Convinience functions for code interaction with the database.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
-from openoligo.api.models import Reactant, Settings, SynthesisQueue, TaskStatus
+from tortoise.expressions import F
 
+from openoligo.api.models import Reactant, Settings, SynthesisQueue, TaskStatus, content_hash
+from openoligo.seq import SeqCategory
+from openoligo.utils.trace import tracer
 
+
+@tracer.traced("db")
 async def update_task_status(task_id: int, status: TaskStatus):
     """Update the status of a synthesis task."""
     await SynthesisQueue.filter(id=task_id).update(status=status)
 
 
+@tracer.traced("db")
 async def set_started_now(task_id: int):
     """Set the started_at timestamp of a synthesis task."""
     await SynthesisQueue.filter(id=task_id).update(started_at=datetime.now())
 
 
+@tracer.traced("db")
 async def set_completed_now(task_id: int):
     """Set the completed_at timestamp of a synthesis task."""
     await SynthesisQueue.filter(id=task_id).update(completed_at=datetime.now())
 
 
+@tracer.traced("db")
 async def set_failed_now(task_id: int):
     """Set the completed_at timestamp of a synthesis task."""
     await update_task_status(task_id, TaskStatus.FAILED)
 
 
+@tracer.traced("db")
 async def set_task_in_progress(task_id: int):
     """Set the status of a synthesis task."""
     await SynthesisQueue.filter(id=task_id).update(status=TaskStatus.IN_PROGRESS)
 
 
+@tracer.traced("db")
 async def set_log_file(task_id: int, log_file: str):
     """Set the log file of a synthesis task."""
     await SynthesisQueue.filter(id=task_id).update(log_file=log_file)
 
 
+@tracer.traced("db")
 async def get_log_file(task_id: int) -> str:
     """Get the log file name of a synthesis task."""
     return await SynthesisQueue.get(id=task_id).values_list("log_file", flat=True)  # type: ignore
 
 
+@tracer.traced("db")
 async def set_org_id(org_id: str) -> None:
     """Set the organisation ID."""
     await Settings.create(org_id=org_id)
 
 
+@tracer.traced("db")
 async def get_instrument_settings() -> Optional[Settings]:
     """Get the instrument settings."""
     return await Settings.first()
 
 
+@tracer.traced("db")
 async def get_settings() -> Optional[list[Settings]]:
     """Get the organisation ID."""
     settings = await Settings.first().values()
     return [Settings(**setting) for setting in settings] if settings else None
 
 
+@tracer.traced("db")
 async def update_reactant_used(accronym: str, volume: float) -> None:
     """Reduce the volume of a reagent by the given amount."""
     assert volume >= 0, "Volume must be positive"
@@ -66,16 +81,19 @@ async def update_reactant_used(accronym: str, volume: float) -> None:
     await Reactant.filter(accronym=accronym).update(current_volume=current_volume - volume)
 
 
+@tracer.traced("db")
 async def get_all_reactants() -> list[Reactant]:
     """Get all reactants."""
     return await Reactant.all()
 
 
+@tracer.traced("db")
 async def create_new_reactant(name: str, accronym: str, volume: float) -> None:
     """Create a new reactants."""
     await Reactant.create(name=name, accronym=accronym, volume=volume, current_volume=volume)
 
 
+@tracer.traced("db")
 async def get_next_task() -> Optional[SynthesisQueue]:
     """Get the next synthesis task."""
     return (
@@ -83,3 +101,63 @@ async def get_next_task() -> Optional[SynthesisQueue]:
         .order_by("-rank", "created_at")
         .first()
     )
+
+
+@tracer.traced("db")
+async def get_tasks_in_progress() -> list[SynthesisQueue]:
+    """Get the synthesis tasks left in progress, eg. by a crash, in the order they started."""
+    return await SynthesisQueue.filter(status=TaskStatus.IN_PROGRESS).order_by("started_at")
+
+
+@tracer.traced("db")
+async def find_identical_tasks(
+    sequence: str,
+    category: SeqCategory = SeqCategory.DNA,
+    statuses: Optional[Iterable[TaskStatus]] = None,
+) -> list[SynthesisQueue]:
+    """
+    Find the tasks that synthesize the same thing, through the content hash index.
+
+    args:
+        sequence: Sequence to look for, in any spelling that Seq accepts.
+        category: Category of the sequence.
+        statuses: Only return tasks in one of these statuses, all tasks if None.
+    """
+    digest = content_hash(sequence, category)
+    if digest is None:
+        return []
+    tasks = SynthesisQueue.filter(content_hash=digest)
+    if statuses is not None:
+        tasks = tasks.filter(status__in=list(statuses))
+    return await tasks.order_by("created_at")
+
+
+@tracer.traced("db")
+async def merge_into_task(task: SynthesisQueue, rank: int = 0, count: int = 1) -> None:
+    """
+    Count more requests against an existing task, raising its rank if needed.
+    """
+    await SynthesisQueue.filter(id=task.id).update(
+        multiplicity=F("multiplicity") + count, rank=max(task.rank, rank)
+    )
+    await task.refresh_from_db(fields=["multiplicity", "rank"])
+
+
+@tracer.traced("db")
+async def add_or_merge_task(
+    sequence: str, category: SeqCategory = SeqCategory.DNA, rank: int = 0
+) -> tuple[SynthesisQueue, bool]:
+    """
+    Add a task to the queue, unless an identical task is still queued.
+
+    In which case the request is merged into that task, by increasing its multiplicity,
+    instead of synthesizing the same sequence twice.
+
+    returns:
+        The task, and whether the request was merged into an existing task.
+    """
+    queued = await find_identical_tasks(sequence, category, [TaskStatus.QUEUED])
+    if queued:
+        await merge_into_task(queued[0], rank)
+        return queued[0], True
+    return await SynthesisQueue.create(sequence=sequence, category=category, rank=rank), False
@@ -0,0 +1,279 @@
+"""
+Streaming ingestion of bulk synthesis orders in FASTA or CSV format.
+
+The order is parsed line by line as it arrives, validated in batches and inserted into the
+synthesis queue one transaction per batch, so the whole file is never held in memory.
+"""
+import codecs
+import csv
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from openoligo.api.alphabet import alphabet_registry
+from openoligo.api.db import DB_CONNECTION
+from openoligo.api.models import (
+    MAX_SEQ_LENGTH,
+    MIN_SEQ_LENGTH,
+    SynthesisQueue,
+    TaskStatus,
+    content_hash,
+)
+from openoligo.hal.board import Pinout
+from openoligo.seq import SeqCategory, validate_many
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class OrderFormat(str, Enum):
+    """Formats accepted for bulk orders."""
+
+    FASTA = "fasta"
+    CSV = "csv"
+
+
+@dataclass
+class OrderRecord:
+    """One sequence of a bulk order."""
+
+    index: int  # Position of the record in the order, starting at 1
+    name: str  # Name of the record, eg. the FASTA header
+    sequence: str
+    category: SeqCategory = SeqCategory.DNA
+    rank: int = 0  # Rank of the synthesis task in the queue
+    error: Optional[str] = None  # Why the record can not be queued, None if it can
+
+
+class _LineFeed:
+    """Lines fed one at a time to a single csv.reader, as they arrive."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 encoded chunks into lines, without the line endings.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    remainder = ""
+    async for chunk in chunks:
+        lines = (remainder + decoder.decode(chunk)).splitlines(keepends=True)
+        remainder = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line.rstrip("\r\n")
+    remainder += decoder.decode(b"", final=True)
+    if remainder:
+        yield remainder
+
+
+async def parse_fasta(
+    lines: AsyncIterable[str], category: SeqCategory = SeqCategory.DNA, rank: int = 0
+) -> AsyncIterator[OrderRecord]:
+    """
+    Parse FASTA records, the sequence of a record may span multiple lines.
+
+    Empty lines and comment lines starting with ';' are ignored.
+    """
+    index = 0
+    name: Optional[str] = None
+    parts: list[str] = []
+    async for line in lines:
+        line = line.strip()
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith(">"):
+            if name is not None:
+                yield OrderRecord(index, name, "".join(parts), category, rank)
+            index, name, parts = index + 1, line[1:].strip(), []
+        elif name is None:
+            index += 1
+            yield OrderRecord(index, "", line, category, rank, "Sequence without a FASTA header")
+        else:
+            parts.append(line)
+    if name is not None:
+        yield OrderRecord(index, name, "".join(parts), category, rank)
+
+
+async def parse_csv(
+    lines: AsyncIterable[str], category: SeqCategory = SeqCategory.DNA, rank: int = 0
+) -> AsyncIterator[OrderRecord]:
+    """
+    Parse CSV rows with a header row.
+
+    The header must have a 'sequence' column, and may have 'name', 'category' and 'rank'
+    columns, which override the given defaults row by row.
+
+    raises:
+        ValueError: If the header has no 'sequence' column.
+    """
+    columns: Optional[dict[str, int]] = None
+    index = 0
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    async for line in lines:
+        if not line.strip():
+            continue
+        feed.lines.append(line)
+        row = next(reader, [])
+        if columns is None:
+            columns = {column.strip().lower(): i for i, column in enumerate(row)}
+            if "sequence" not in columns:
+                raise ValueError("CSV header must have a 'sequence' column")
+            continue
+
+        index += 1
+        values = {column: row[i].strip() for column, i in columns.items() if i < len(row)}
+        record = OrderRecord(index, values.get("name", ""), values.get("sequence", ""))
+        try:
+            record.category = SeqCategory(values.get("category") or category)
+            record.rank = int(values.get("rank") or rank)
+        except ValueError as exc:
+            record.error = str(exc)
+        yield record
+
+
+async def batched(
+    records: AsyncIterable[OrderRecord], size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[list[OrderRecord]]:
+    """Group records into lists of at most size records."""
+    batch: list[OrderRecord] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def validate_batch(batch: list[OrderRecord], pinout: Optional[Pinout] = None) -> None:
+    """
+    Validate the records of a batch that have no error yet, setting the error of the invalid
+    ones. A record with an amidite the pinout has no valve for, if given, is invalid.
+    """
+    pending = [record for record in batch if record.error is None]
+    errors = validate_many(
+        [record.sequence for record in pending],
+        [record.category for record in pending],
+        min_length=MIN_SEQ_LENGTH,
+        max_length=MAX_SEQ_LENGTH,
+        alphabet=await alphabet_registry.get(pinout),
+    )
+    for record, error in zip(pending, errors):
+        record.error = error
+
+
+async def _queued_tasks(digests: set[Optional[str]]) -> dict[Optional[str], SynthesisQueue]:
+    """The oldest queued task with each content hash."""
+    tasks: dict[Optional[str], SynthesisQueue] = {}
+    for task in await SynthesisQueue.filter(
+        content_hash__in=digests, status=TaskStatus.QUEUED
+    ).order_by("created_at"):
+        tasks.setdefault(task.content_hash, task)  # type: ignore
+    return tasks
+
+
+async def _insert_records(records: list[OrderRecord]) -> tuple[dict[int, int], set[int]]:
+    """
+    Add valid records to the queue in one transaction, merging the identical ones.
+
+    returns:
+        The id of the task of each record, by the index of the record, and the indexes of the
+        records merged into an existing task.
+    """
+    digests = [content_hash(record.sequence, record.category) for record in records]
+    tasks = await _queued_tasks(set(digests))
+    ids: dict[int, int] = {}
+    merged: set[int] = set()
+    merges: dict[int, list[int]] = {}  # Task id to the ranks of the merged records
+    async with in_transaction(DB_CONNECTION) as connection:
+        for record, digest in zip(records, digests):
+            task = tasks.get(digest)
+            if task is None:
+                tasks[digest] = task = await SynthesisQueue.create(
+                    sequence=record.sequence,
+                    category=record.category,
+                    rank=record.rank,
+                    using_db=connection,
+                )
+            else:
+                merges.setdefault(task.id, [task.rank]).append(record.rank)
+                merged.add(record.index)
+            ids[record.index] = task.id
+
+        for task_id, ranks in merges.items():
+            await SynthesisQueue.filter(id=task_id).using_db(connection).update(
+                multiplicity=F("multiplicity") + len(ranks) - 1, rank=max(ranks)
+            )
+    return ids, merged
+
+
+async def queue_batch(batch: list[OrderRecord], pinout: Optional[Pinout] = None) -> list[dict]:
+    """
+    Validate a batch of records and add the valid ones to the queue in one transaction.
+
+    A record identical to a queued task, or to an earlier record, is merged into that task
+    by increasing its multiplicity instead of being queued again. A record with an amidite
+    the pinout has no valve for, if given, is rejected.
+
+    returns:
+        One result per record, with the id of its task and whether it was merged into an
+        existing one, or the reason it was rejected.
+    """
+    await validate_batch(batch, pinout)
+    valid = [record for record in batch if record.error is None]
+    ids, merged = await _insert_records(valid) if valid else ({}, set())
+    return [
+        {
+            "record": record.index,
+            "name": record.name,
+            "id": ids[record.index],
+            "merged": record.index in merged,
+        }
+        if record.error is None
+        else {"record": record.index, "name": record.name, "error": record.error}
+        for record in batch
+    ]
+
+
+async def ingest_order(
+    chunks: AsyncIterable[bytes],
+    order_format: OrderFormat,
+    *,
+    category: SeqCategory = SeqCategory.DNA,
+    rank: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pinout: Optional[Pinout] = None,
+) -> AsyncIterator[dict]:
+    """
+    Add every sequence in a FASTA or CSV order to the synthesis queue.
+
+    args:
+        chunks: The order as a stream of UTF-8 encoded chunks.
+        order_format: Format of the order.
+        category: Category of the sequences, unless a CSV row says otherwise.
+        rank: Rank of the synthesis tasks, unless a CSV row says otherwise.
+        batch_size: Number of records validated and inserted together.
+        pinout: Pinout of the instrument, to reject the amidites it has no valve for.
+
+    yields:
+        One result per record in the order, see queue_batch.
+    """
+    parse = parse_fasta if order_format == OrderFormat.FASTA else parse_csv
+    records = parse(iter_lines(chunks), category, rank)
+    async for batch in batched(records, batch_size):
+        for result in await queue_batch(batch, pinout):
+            yield result
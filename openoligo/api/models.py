@@ -1,9 +1,12 @@
 """
 Tortoise ORM Models for the OpenOligo API
 """
+import hashlib
 import re
 from enum import Enum
+from typing import Optional, Sequence
 
+from pydantic import BaseModel
 from tortoise import fields
 from tortoise.contrib.pydantic import pydantic_model_creator
 from tortoise.exceptions import ValidationError
@@ -16,7 +19,10 @@ from tortoise.validators import (
     Validator,
 )
 
-from openoligo.seq import Seq, SeqCategory
+from openoligo.seq import Alphabet, Seq, SeqCategory, builtin_alphabet, validate_many
+
+MIN_SEQ_LENGTH = 3
+MAX_SEQ_LENGTH = 100
 
 
 class TaskStatus(str, Enum):
@@ -41,16 +47,52 @@ class ReactantType(str, Enum):
 class ValidSeq(Validator):  # pylint: disable=too-few-public-methods
     """Validate that the value is a valid NA sequence"""
 
+    def __init__(
+        self, category: SeqCategory = SeqCategory.DNA, alphabet: Alphabet = builtin_alphabet
+    ) -> None:
+        """Validate sequences of the given category, made of the amidites of the alphabet."""
+        self.category = category
+        self.alphabet = alphabet
+
+    def validate_many(
+        self, values: Sequence[str], category: Optional[SeqCategory] = None
+    ) -> list[Optional[str]]:
+        """
+        Validate a batch of values at once.
+
+        returns:
+            One entry per value, None if it is valid, otherwise the reason why not.
+        """
+        return validate_many(
+            values,
+            category or self.category,
+            min_length=MIN_SEQ_LENGTH,
+            max_length=MAX_SEQ_LENGTH,
+            alphabet=self.alphabet,
+        )
+
     def __call__(self, value: str) -> None:
         """Validate the value."""
-        try:
-            Seq(value)
-            assert len(value) >= 3, "Sequence must be at least 3 bases long"
-            assert len(value) <= 100, "Sequence must be at most 100 bases long"
-        except ValueError as exc:
-            raise ValidationError(str(exc)) from exc
-        except AssertionError as exc:
-            raise ValidationError(str(exc)) from exc
+        error = self.validate_many([value])[0]
+        if error is not None:
+            raise ValidationError(error)
+
+
+def content_hash(sequence: str, category: SeqCategory) -> Optional[str]:
+    """
+    Hash identifying what a synthesis task makes, whichever way its sequence is written.
+
+    The sequence is normalized through Seq first, so eg. 'atcg' and 'ATCG', or 'M5C' and
+    '5mC', hash the same. Modifications are amidites of the sequence, so they are included.
+
+    returns:
+        The hex digest, or None if the sequence is not made of known amidites.
+    """
+    try:
+        canonical = Seq(sequence).seq
+    except ValueError:
+        return None
+    return hashlib.sha256(f"{category.value}:{canonical}".encode("utf-8")).hexdigest()
 
 
 class SynthesisQueue(Model):
@@ -59,8 +101,8 @@ class SynthesisQueue(Model):
     id = fields.IntField(pk=True, autoincrement=True, description="Synthesis ID")
 
     sequence = fields.TextField(
-        validators=[ValidSeq()],
-        description="Sequence of the Nucliec Acid to synthesize",
+        validators=[ValidSeq(SeqCategory.MODIFIED)],
+        description="Sequence of the Nucliec Acid to synthesize, made of known amidites",
     )
     category = fields.CharEnumField(
         SeqCategory,
@@ -69,6 +111,18 @@ class SynthesisQueue(Model):
     )
     status = fields.CharEnumField(TaskStatus, default=TaskStatus.QUEUED)
 
+    content_hash = fields.CharField(
+        max_length=64,
+        null=True,
+        index=True,
+        description="Hash of the category and the normalized sequence, to find identical tasks",
+    )
+    multiplicity = fields.IntField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        description="Number of identical requests served by this synthesis task",
+    )
+
     rank = fields.IntField(
         default=0,
         description="""Rank of the synthesis task in the queue.
@@ -87,9 +141,14 @@ class SynthesisQueue(Model):
     class PydanticMeta:  # pylint: disable=too-few-public-methods
         """Pydantic configuration"""
 
-        exclude = ["log_file"]
+        exclude = ["log_file", "content_hash"]
         ordering = ["-rank", "-created_at"]
 
+    async def save(self, *args, **kwargs) -> None:  # pylint: disable=signature-differs
+        """Keep the content hash in step with the sequence and the category on every save."""
+        self.content_hash = content_hash(self.sequence, SeqCategory(self.category))  # type: ignore
+        await super().save(*args, **kwargs)
+
 
 class Settings(Model):
     """Settings for this particular instrument."""
@@ -134,8 +193,76 @@ class Reactant(Model):
         ordering = ["current_volume", "-updated_at", "-inserted_at"]
 
 
+class SeqValidationModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """Result of validating one sequence."""
+
+    sequence: str
+    valid: bool
+    error: Optional[str] = None
+
+
+class SeqPropertiesModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """A task in the synthesis queue along with the properties of its sequence."""
+
+    id: int
+    sequence: str
+    category: SeqCategory
+    status: TaskStatus
+    rank: int
+    cycle_count: int
+    amidite_counts: dict[str, int]
+    gc_content: float
+    melting_temperature: float
+    molecular_weight: Optional[float]
+
+
 SynthesisQueueModel = pydantic_model_creator(SynthesisQueue, name="SynthesisQueue")
 
 SettingsModel = pydantic_model_creator(Settings, name="Settings")
 
 ReactantModel = pydantic_model_creator(Reactant, name="ReactantModel")
+
+
+class ColumnGroupModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """Queued tasks planned to be synthesized together, one per column."""
+
+    task_ids: list[int]
+    sequences: list[str]
+    shared_cycles: int
+    cycles: int
+    cycle_savings: int
+
+
+class SynthesisPlanModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """The queued tasks grouped onto parallel columns, with the cycles saved by doing so."""
+
+    columns: int
+    solo_cycles: int
+    planned_cycles: int
+    cycle_savings: int
+    groups: list[ColumnGroupModel]
+
+
+class TaskEstimateModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """Estimated run time and reagent use of a synthesis task, times are in seconds."""
+
+    id: int
+    sequence: str
+    duration: float
+    steps: dict[str, float]
+    actuations: dict[str, int]
+    open_time: dict[str, float]
+    reagent_time: dict[str, float]
+
+
+class TaskEtaModel(BaseModel):  # pylint: disable=too-few-public-methods
+    """
+    When a queued task is expected to start and finish, in seconds from now, or why it can
+    not be run.
+    """
+
+    id: int
+    sequence: str
+    start: Optional[float] = None
+    finish: Optional[float] = None
+    error: Optional[str] = None
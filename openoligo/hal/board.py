@@ -1,9 +1,9 @@
 """
 Pins in the Raspberry Pi GPIO header.
 """
-from typing import Dict, TypedDict
+from typing import Dict, NamedTuple, Optional, TypedDict
 
-from openoligo.hal.devices import DigitalSensor, Switch, Valve
+from openoligo.hal.devices import DigitalSensor, Switch, Valve, setup_devices
 from openoligo.hal.types import Board, NoSuchPinInPinout, Switchable, ValveRole, board
 from openoligo.utils.singleton import Singleton
 
@@ -64,26 +64,103 @@ def list_configurable_pins() -> dict[str, Board]:
     return [pin for pin in board if pin not in fixed_pins]  # type: ignore
 
 
-class Pinout(metaclass=Singleton):
+def parse_columns(spec: str) -> Dict[str, Valve]:
+    """
+    Parse the outlet valves of the reaction columns besides the first one.
+
+    args:
+        spec: Name of each column and the board pin of its outlet, eg. "col2=P32,col3=P35".
+
+    raises:
+        ValueError: If a column is not given as name=pin, or the pin is not on the board.
+    """
+    columns: Dict[str, Valve] = {}
+    for column in filter(None, (column.strip() for column in spec.split(","))):
+        name, _, pin = (part.strip() for part in column.partition("="))
+        if not name or not hasattr(board, pin):
+            raise ValueError(f"Invalid column '{column}', expected eg. col2=P32")
+        columns[name] = Valve(gpio_pin=getattr(board, pin), role=ValveRole.TRANSIT)
+    return columns
+
+
+class _PinoutIndex(NamedTuple):
+    """Indexes of a pinout, built once, the pinout does not change after construction."""
+
+    devices: tuple[Switchable, ...]  # Device handles, by their dense integer index
+    index: dict[str, int]  # Index of each device, by name
+    valves: dict[str, Valve]
+    roles: dict[ValveRole, tuple[str, ...]]  # Names of the valves with each role
+    role_indexes: dict[ValveRole, tuple[int, ...]]  # Indexes of the valves with each role
+
+
+class PinoutMeta(Singleton):
+    """
+    Singleton metaclass of the pinout, which refuses columns that the pinout, already built,
+    would otherwise ignore.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        columns = kwargs.get("columns", args[1] if len(args) > 1 else None)
+        if columns and cls in cls._instances:
+            raise ValueError(
+                "The pinout is already built, its columns are set when it is first built, "
+                "eg. with OO_COLUMNS"
+            )
+        return super().__call__(*args, **kwargs)
+
+
+class Pinout(metaclass=PinoutMeta):
     """
     Pinout for the instrument.
+
+    The pinout is built once, the columns of the default pinout are configured through the
+    OO_COLUMNS environment variable, see parse_columns.
     """
 
     def __init__(
         self,
         phosphoramidites: Dict[str, Valve],
+        columns: Optional[Dict[str, Valve]] = None,
     ):
         """
         Initialize the pinout.
+
+        args:
+            phosphoramidites: Valve of each phosphoramidite, by its name in a sequence.
+            columns: Outlet valves of the reaction columns besides the first one, whose outlet
+                is rxn_out. They must be transit valves, between the column and waste_rxn.
         """
         self.fixed = fixed_pinout
         self.reactants = reactants
 
         self.phosphoramidites = phosphoramidites
+        self.columns = columns or {}
+        for name, valve in self.columns.items():
+            if valve.role != ValveRole.TRANSIT:
+                raise ValueError(f"Column outlet {name} must be a transit valve")
 
         self.__pinout: Dict[str, Switchable] = {}
+        self.__used: set[Switchable] = set()
         self.init_pinout()
 
+        self.__indexes = self.__build_indexes()
+
+    def __build_indexes(self) -> _PinoutIndex:
+        """Give each device a dense integer index, and index the valves by role."""
+        index = {name: index for index, name in enumerate(self.__pinout)}
+        valves = {k: v for k, v in self.__pinout.items() if isinstance(v, Valve)}
+        roles = {
+            role: tuple(name for name, valve in valves.items() if valve.role == role)
+            for role in ValveRole
+        }
+        return _PinoutIndex(
+            devices=tuple(self.__pinout.values()),
+            index=index,
+            valves=valves,
+            roles=roles,
+            role_indexes={role: tuple(index[name] for name in roles[role]) for role in roles},
+        )
+
     def __add_pinout_safe(self, pin: Switchable, category: str, sub_category: str):
         """
         Check for duplicate pin usage.
@@ -93,8 +170,9 @@ class Pinout(metaclass=Singleton):
             category: Category of the pin. (Just for logging)
             sub_category: Sub category of the pin. (the name of the pin)
         """
-        if pin in self.__pinout.values():
+        if pin in self.__used:  # Devices are equal if they are on the same pin
             raise ValueError(f"Pin {pin} is used twice in {category}.{sub_category}.")
+        self.__used.add(pin)
         self.__pinout[sub_category.lower()] = pin
 
     def init_pinout(self):
@@ -111,6 +189,15 @@ class Pinout(metaclass=Singleton):
             else:
                 self.__add_pinout_safe(switchables, self.__class__.__name__, key)
 
+    def setup(self) -> None:
+        """
+        Set up the pins of every device, all at once.
+
+        Building a pinout never touches the GPIO, so that processes that only read it, such as
+        the API server, never drive the pins of the instrument, see Instrument.setup.
+        """
+        setup_devices(self.__indexes.devices)
+
     def pins(self) -> dict[str, Switchable]:
         """
         Return a list of all pins in the pinout.
@@ -119,9 +206,47 @@ class Pinout(metaclass=Singleton):
 
     def valves(self) -> dict[str, Valve]:
         """
-        Return a list of all valves in the pinout.
+        Return a list of all valves in the pinout, built once, not to be modified.
+        """
+        return self.__indexes.valves
+
+    def with_role(self, role: ValveRole) -> tuple[str, ...]:
+        """
+        Return the names of the valves with a role, eg. the inlets.
+        """
+        return self.__indexes.roles[role]
+
+    def indexes_with_role(self, role: ValveRole) -> tuple[int, ...]:
+        """
+        Return the indexes of the valves with a role, eg. the inlets, see device.
+        """
+        return self.__indexes.role_indexes[role]
+
+    def index(self, name: str) -> int:
+        """
+        Return the index of a pin, its position in the pinout, see device.
+
+        raises:
+            NoSuchPinInPinout: If the pin is not found.
+        """
+        index = self.__indexes.index.get(name)
+        if index is None:
+            index = self.__indexes.index.get(name.lower())
+        if index is None:
+            self.get(name)  # Raises
+        return index  # type: ignore[return-value]
+
+    def device(self, index: int) -> Switchable:
+        """
+        Return the switch/valve at an index, see index.
+        """
+        return self.__indexes.devices[index]
+
+    def column_outlets(self) -> list[str]:
+        """
+        Return the names of the outlet valves of every reaction column, the first is rxn_out.
         """
-        return {k: v for k, v in self.__pinout.items() if isinstance(v, Valve)}
+        return ["rxn_out", *(name.lower() for name in self.columns)]
 
     def get(self, name: str) -> Switchable:
         """
@@ -136,6 +261,9 @@ class Pinout(metaclass=Singleton):
         raises:
             KeyError: If the pin is not found.
         """
+        pin = self.__pinout.get(name)  # Names are stored in lower case, as they mostly are given
+        if pin is not None:
+            return pin
         try:
             return self.__pinout[name.lower()]
         except KeyError as exc:
@@ -2,32 +2,103 @@
 Switches can be used to control devices that can be turned on and off.
 """
 import logging
-from dataclasses import dataclass, field
-from typing import Callable
+import time
+from typing import Any, Callable, Iterable, Optional
 
-from openoligo.hal.gpio import GpioEdge, GpioMode, get_gpio
+from openoligo.hal.gpio import GpioEdge, GpioMode, GPIOInterface, get_gpio
 from openoligo.hal.types import Switchable, Valvable, ValveRole, ValveState, ValveType
+from openoligo.utils.trace import tracer
 
 
-@dataclass
-class Switch(Switchable):
+def _traced_set(controller: GPIOInterface, gpio_pin: str, state: bool) -> None:
+    """Write a GPIO pin, traced as a span of the gpio category when tracing."""
+    if not tracer.enabled:
+        controller.set(gpio_pin, state)
+        return
+    start = time.perf_counter_ns()
+    controller.set(gpio_pin, state)
+    tracer.record(gpio_pin, "gpio", start, time.perf_counter_ns(), args={"state": state})
+
+
+class _Device(Switchable):
+    """
+    A device on a GPIO pin. Devices have no instance dict, and are equal if they are of the
+    same kind and on the same pin, so that a pin can not be used twice in a pinout.
+
+    Devices share the controller of the platform, looked up when their pin is first used, so
+    that describing a device never touches the GPIO. Their pins are set up by the instrument
+    that drives them, all at once, see setup_devices.
+
+    Each kind of device sets its pin its own way, and keeps its state as last set or read.
+    """
+
+    __slots__ = ("gpio_pin", "_controller", "_state")
+    mode = GpioMode.OUT
+
+    def __init__(self, gpio_pin: str):  # pylint: disable=super-init-not-called
+        self.gpio_pin = gpio_pin
+        self._controller: Optional[GPIOInterface] = None
+        self._state: Any = None
+
+    @property
+    def controller(self) -> GPIOInterface:
+        """GPIO controller of the platform."""
+        if self._controller is None:
+            self._controller = get_gpio()
+        return self._controller
+
+    @controller.setter
+    def controller(self, controller: GPIOInterface) -> None:
+        self._controller = controller
+
+    def set(self, state: bool):
+        """Set the state of the device."""
+        raise NotImplementedError
+
+    @property
+    def value(self) -> bool:
+        """Read the current value of the device from its pin, the state as last set is kept."""
+        return self.controller.value(self.gpio_pin)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.gpio_pin == other.gpio_pin
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.gpio_pin))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(gpio_pin={self.gpio_pin!r}, _state={self._state!r})"
+
+
+def setup_devices(devices: Iterable[Switchable]) -> None:
+    """Set up the pins of devices, with one bulk setup per controller and mode."""
+    groups: dict[tuple[int, GpioMode], tuple[GPIOInterface, list[str]]] = {}
+    for device in devices:
+        if isinstance(device, _Device):
+            controller = device.controller
+            key = (id(controller), device.mode)
+            groups.setdefault(key, (controller, []))[1].append(device.gpio_pin)
+    for (_, mode), (controller, pins) in groups.items():
+        controller.setup_pins(pins, mode)
+
+
+class Switch(_Device):
     """
     A switch that actually controls a GPIO pin on the Raspberry Pi.
 
     Attributes:
-        name: Name of the switch.
         gpio_pin: GPIO pin number.
-        board: Board object to access the GPIO pins.
     """
 
-    gpio_pin: str
-    _state: bool = field(default=False, init=False)
-    _switch_count: int = field(default=0, init=False, repr=False)
+    __slots__ = ("_switch_count",)
 
-    def __post_init__(self):
+    def __init__(self, gpio_pin: str):
         """Initialize the switch."""
-        self.controller = get_gpio()
-        self.controller.setup_pin(self.gpio_pin)
+        super().__init__(gpio_pin)
+        self._state = False
+        self._switch_count = 0
 
     def set(self, state: bool):
         """Set state of the switch ON or OFF."""
@@ -39,7 +110,7 @@ class Switch(Switchable):
             return
 
         self._state = __new_state
-        self.controller.set(self.gpio_pin, state)
+        _traced_set(self.controller, self.gpio_pin, state)
         self._switch_count += 1
 
         logging.debug(
@@ -55,27 +126,23 @@ class Switch(Switchable):
         self.set(not self._state)
 
     @property
-    def value(self) -> bool:
-        """
-        Get the current value of the switch.
-        """
-        self._state = self.controller.value(self.gpio_pin)
+    def state(self) -> bool:
+        """State of the switch as last set, without reading the pin."""
         return self._state
 
 
-@dataclass
-class DigitalSensor(Switchable):
+class DigitalSensor(_Device):
     """
     A digital sensor that actually controls a GPIO pin on the Raspberry Pi.
     """
 
-    gpio_pin: str
-    _state: bool = field(default=False, init=False)
+    __slots__ = ()
+    mode = GpioMode.IN
 
-    def __post_init__(self):
-        """Initialize the switch."""
-        self.controller = get_gpio()
-        self.controller.setup_pin(self.gpio_pin, GpioMode.IN)
+    def __init__(self, gpio_pin: str):
+        """Initialize the sensor."""
+        super().__init__(gpio_pin)
+        self._state = False
 
     def set(self, _: bool):
         """A digital sensor cannot be set"""
@@ -100,23 +167,24 @@ class DigitalSensor(Switchable):
         self.controller.on_edge(pin=self.gpio_pin, edge=edge, callback=callback)
 
 
-@dataclass
-class Valve(Valvable):
+class Valve(_Device, Valvable):
     """
     A valve that actually controls a GPIO pin on the Raspberry Pi.
     """
 
-    gpio_pin: str
-    role: ValveRole = field(default=ValveRole.INLET)
-    valve_type: ValveType = field(default=ValveType.NORMALLY_OPEN)
-    _switch_count: int = field(init=False, default=0)
-    _state: ValveState = field(init=False)
+    __slots__ = ("role", "valve_type", "_switch_count")
 
-    def __post_init__(self):
+    def __init__(
+        self,
+        gpio_pin: str,
+        role: ValveRole = ValveRole.INLET,
+        valve_type: ValveType = ValveType.NORMALLY_OPEN,
+    ):
         """Initialize the valve."""
-        self.controller = get_gpio()
-        self.controller.setup_pin(self.gpio_pin)
-
+        super().__init__(gpio_pin)
+        self.role = role
+        self.valve_type = valve_type
+        self._switch_count = 0
         self._state = (
             ValveState.CLOSED_FLOW
             if self.valve_type == ValveType.NORMALLY_CLOSED
@@ -141,7 +209,7 @@ class Valve(Valvable):
                 logging.debug("Valve (%s) is already %s", self.gpio_pin, __old_state)
             return
 
-        self.controller.set(self.gpio_pin, state)
+        _traced_set(self.controller, self.gpio_pin, state)
         self._state = __new_state
 
         self._switch_count += 1
@@ -153,15 +221,71 @@ class Valve(Valvable):
             extra={"markup": True},
         )
 
+    @staticmethod
+    def set_many(states: Iterable[tuple["Valve", bool]], force: bool = False) -> float:
+        """
+        Set the state of many valves at once, with one bulk write per GPIO controller rather
+        than one write per valve. Valves already in their state are not written, unless forced.
+
+        args:
+            states: Pairs of a valve and whether to open it.
+            force: Write every valve, eg. when their pins may have been reset since.
+
+        returns:
+            Skew of the switch, the seconds from the first write starting to the last ending.
+        """
+        writes: dict[int, tuple[GPIOInterface, dict[str, bool]]] = {}
+        switched: list[tuple[Valve, bool]] = []
+        for valve, state in states:
+            if valve.is_open == state and not force:
+                continue
+            controller = valve.controller
+            writes.setdefault(id(controller), (controller, {}))[1][valve.gpio_pin] = state
+            switched.append((valve, state))
+        if not switched:
+            return 0.0
+
+        start = time.perf_counter_ns()
+        for controller, values in writes.values():
+            controller.set_many(values)
+        end = time.perf_counter_ns()
+        if tracer.enabled:
+            tracer.record("set_many", "gpio", start, end, args={"pins": len(switched)})
+
+        for valve, state in switched:
+            valve.record_switch(state)
+        logging.debug(
+            "Switched %d valves with %d writes, in %.1fus",
+            len(switched),
+            len(writes),
+            (end - start) / 1000,
+        )
+        return (end - start) / 1e9
+
+    def record_switch(self, state: bool) -> None:
+        """
+        Record the state of the valve once its pin was written, eg. in bulk by set_many.
+
+        args:
+            state: Whether the valve was opened.
+        """
+        new_state = ValveState.OPEN_FLOW if state else ValveState.CLOSED_FLOW
+        if self._state != new_state:
+            self._state = new_state
+            self._switch_count += 1
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the valve was last set open, without reading the pin."""
+        return self._state == ValveState.OPEN_FLOW
+
     @property
     def value(self) -> bool:
-        """Get the current value of the valve."""
+        """Read whether the valve is open from its pin, the state as last set is kept."""
         val = self.controller.value(self.gpio_pin)
         if self.valve_type == ValveType.NORMALLY_CLOSED:
-            self._state = ValveState.OPEN_FLOW if val else ValveState.CLOSED_FLOW
-        else:
-            self._state = ValveState.CLOSED_FLOW if val else ValveState.OPEN_FLOW
-        return self._state == ValveState.OPEN_FLOW
+            return bool(val)
+        return not val
 
     @property
     def get_type(self) -> ValveType:
@@ -169,4 +293,4 @@ class Valve(Valvable):
         return self.valve_type
 
     def __repr__(self) -> str:
-        return f"{self.gpio_pin}[{self.value}]"
+        return f"{self.gpio_pin}[{self.is_open}]"  # Never reads the pin, repr is used in logs
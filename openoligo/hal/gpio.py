@@ -3,18 +3,34 @@ GPIO access abstraction: RPi.GPIO on Raspberry Pi, MockGPIO otherwise.
 """
 import importlib
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Callable, Iterable, Mapping, Sequence
 
 from openoligo.hal.platform import Platform, __platform__
 from openoligo.hal.types import GpioEdge, GpioMode, board
 
 
-def get_gpio():
-    """Get the GPIO module."""
-    if __platform__ == Platform.BB:
+# One controller per platform, shared by every device, see get_gpio
+_controllers: dict[Platform, "GPIOInterface"] = {}
+
+
+def get_gpio(platform: Platform = __platform__) -> "GPIOInterface":
+    """
+    Get the GPIO controller of a platform, created on first use and shared afterwards.
+
+    args:
+        platform: Platform to get the controller of, the one we run on by default.
+    """
+    controller = _controllers.get(platform)
+    if controller is None:
+        controller = _controllers[platform] = _new_gpio(platform)
+    return controller
+
+
+def _new_gpio(platform: Platform) -> "GPIOInterface":
+    if platform == Platform.BB:
         gpio = importlib.import_module("Adafruit_BBIO.GPIO")
         return BbGPIO(gpio)
-    if __platform__ == Platform.RPI:
+    if platform == Platform.RPI:
         gpio = importlib.import_module("RPi.GPIO")
         return RPiGPIO(gpio)
     return MockGPIO()
@@ -27,10 +43,27 @@ class GPIOInterface(ABC):
     def setup_pin(self, pin: str, mode: GpioMode) -> None:
         """Set up a GPIO pin."""
 
+    def setup_pins(self, pins: Iterable[str], mode: GpioMode = GpioMode.OUT) -> None:
+        """Set up many GPIO pins in the same mode, one after the other unless in bulk."""
+        for pin in pins:
+            self.setup_pin(pin, mode)
+
     @abstractmethod
     def set(self, pin: str, value: bool) -> None:
         """Set the output value of a GPIO pin."""
 
+    def set_many(self, values: Mapping[str, bool]) -> None:
+        """
+        Set the output values of many GPIO pins, as close together in time as the backend
+        allows. One pin after the other, unless the backend writes them in bulk.
+        """
+        for pin, value in values.items():
+            self.set(pin, value)
+
+    def write_mask(self, pins: Sequence[str], mask: int) -> None:
+        """Set pins[i] high if bit i of mask is set, and low otherwise, see set_many."""
+        self.set_many({pin: bool(mask >> bit & 1) for bit, pin in enumerate(pins)})
+
     @abstractmethod
     def value(self, pin: str) -> bool:
         """Get the value of a GPIO pin."""
@@ -61,10 +94,25 @@ class RPiGPIO(GPIOInterface):
         """Set up a GPIO pin."""
         self.gpio.setup(pin, self.gpio.OUT if mode == GpioMode.OUT else self.gpio.IN)
 
+    def setup_pins(self, pins: Iterable[str], mode: GpioMode = GpioMode.OUT) -> None:
+        """Set up many GPIO pins in the same mode, in a single call to RPi.GPIO."""
+        channels = [int(pin) for pin in pins]
+        if channels:
+            self.gpio.setup(channels, self.gpio.OUT if mode == GpioMode.OUT else self.gpio.IN)
+
     def set(self, pin: str, value: bool) -> None:
         """Set the output value of a GPIO pin."""
         self.gpio.output(int(pin), self.gpio.HIGH if value else self.gpio.LOW)
 
+    def set_many(self, values: Mapping[str, bool]) -> None:
+        """Set the output values of many GPIO pins, in a single call to RPi.GPIO."""
+        if not values:
+            return
+        high, low = self.gpio.HIGH, self.gpio.LOW
+        self.gpio.output(
+            [int(pin) for pin in values], [high if value else low for value in values.values()]
+        )
+
     def value(self, pin: str) -> bool:
         """Get the value of a GPIO pin."""
         return self.gpio.input(pin)
@@ -100,6 +148,20 @@ class BbGPIO(GPIOInterface):
             pin, self.gpio.HIGH if value else self.gpio.LOW, pull_up_down=self.gpio.PUD_UP
         )
 
+    def set_many(self, values: Mapping[str, bool]) -> None:
+        """
+        Set the output values of many GPIO pins back to back, Adafruit_BBIO has no bulk write,
+        so the lookups are hoisted out of the loop to keep the writes close together.
+        """
+        output, high, low, pull_up = (
+            self.gpio.output,
+            self.gpio.HIGH,
+            self.gpio.LOW,
+            self.gpio.PUD_UP,
+        )
+        for pin, value in values.items():
+            output(pin, high if value else low, pull_up_down=pull_up)
+
     def value(self, pin: str) -> bool:
         """Get the value of a GPIO pin."""
         return self.gpio.input(pin)
@@ -133,7 +195,11 @@ class MockGPIO(GPIOInterface):
         self, pin: str, _: GpioMode = GpioMode.OUT
     ) -> None:  # pylint: disable=unused-argument
         """Set up a GPIO pin."""
-        self.state[pin] = False
+        self.state[pin if pin.startswith("P") else f"P{pin}"] = False
+
+    def setup_pins(self, pins: Iterable[str], _: GpioMode = GpioMode.OUT) -> None:
+        """Set up many GPIO pins, in a single update of the state."""
+        self.state.update({pin if pin.startswith("P") else f"P{pin}": False for pin in pins})
 
     def set(self, pin: str, value: bool) -> None:
         """Set the output value of a GPIO pin."""
@@ -142,6 +208,12 @@ class MockGPIO(GPIOInterface):
         else:
             self.state[f"P{pin}"] = value
 
+    def set_many(self, values: Mapping[str, bool]) -> None:
+        """Set the output values of many GPIO pins, in a single update of the state."""
+        self.state.update(
+            {pin if pin.startswith("P") else f"P{pin}": value for pin, value in values.items()}
+        )
+
     def value(self, pin: str) -> bool:
         """Get the value of a GPIO pin."""
         if pin.startswith("P"):
@@ -1,17 +1,23 @@
 """
 Unified access to configuring and using the instrument.
 """
+import asyncio
 import logging
-from typing import Callable
+import os
+import time
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Iterable, Iterator, Mapping, NamedTuple, Optional
 
-from openoligo.hal.board import Pinout
-from openoligo.hal.devices import DigitalSensor, Valve
-from openoligo.hal.gpio import get_gpio
+from openoligo.hal.board import Pinout, parse_columns
+from openoligo.hal.devices import DigitalSensor, Switch, Valve
 from openoligo.hal.types import OneDestinationException, OneSourceException, ValveRole, board
 from openoligo.utils.singleton import Singleton
+from openoligo.utils.trace import tracer
 
 # import anyio
 
+ROUTE_CACHE_SIZE = 256
+
 
 default_pinout = Pinout(
     phosphoramidites={
@@ -20,9 +26,22 @@ default_pinout = Pinout(
         "G": Valve(gpio_pin=board.P15),
         "T": Valve(gpio_pin=board.P16),
     },
+    columns=parse_columns(os.getenv("OO_COLUMNS", "")),
 )
 
 
+class Snapshot(NamedTuple):
+    """States of the valves and switches of an instrument as last set, without reading pins."""
+
+    valves: tuple[str, ...]  # Names of the valves, in the order of the bits of the mask
+    mask: int  # Bit i is set if valve i is open
+    switches: Mapping[str, bool]  # Whether each switch is on
+
+    def open_valves(self) -> list[str]:
+        """Names of the open valves."""
+        return [name for bit, name in enumerate(self.valves) if self.mask >> bit & 1]
+
+
 class Instrument(metaclass=Singleton):
     """
     Unified access to the instrument. Hide the details of the hardware.
@@ -34,7 +53,40 @@ class Instrument(metaclass=Singleton):
         """
         self.pinout = pinout
         logging.info("Initializing instrument with pinout: %s", self.pinout)
-        self.controller = get_gpio()
+        self.skew = 0.0  # Seconds the last switch of the valves took, see Valve.set_many
+        # Bit i is set if valve i was last set open by the instrument, None before the first set
+        self._shadow: Optional[int] = None
+        self._route_masks = lru_cache(maxsize=ROUTE_CACHE_SIZE)(self._compile_route)
+
+    def setup(self) -> None:
+        """
+        Set up the pins of the instrument, and close every valve, so that the pins are as the
+        instrument last set them.
+
+        Only the process that drives the instrument, the runner, sets it up. Others may route
+        and compile protocols on an instrument that is not set up, without touching the GPIO.
+        """
+        self.pinout.setup()
+        self.close_all()
+
+    @cached_property
+    def valve_names(self) -> tuple[str, ...]:
+        """Names of the valves of the pinout, bit i of a mask stands for valve i."""
+        return tuple(self.pinout.valves())
+
+    @cached_property
+    def _valves(self) -> tuple[Valve, ...]:
+        return tuple(self.pinout.valves().values())
+
+    @cached_property
+    def _switches(self) -> tuple[tuple[str, Switch], ...]:
+        return tuple(
+            (name, pin) for name, pin in self.pinout.pins().items() if isinstance(pin, Switch)
+        )
+
+    @cached_property
+    def _bits(self) -> dict[str, int]:
+        return {name.lower(): bit for bit, name in enumerate(self.valve_names)}
 
     def __get_valve(self, name: str) -> Valve:
         """
@@ -90,29 +142,131 @@ class Instrument(metaclass=Singleton):
                 "Make sure that the transit valve(s) are in the route you expect"
             )  # pragma: no cover
 
+    def route_mask(self, name: Iterable[str]) -> int:
+        """
+        Mask of the valves of a route, validated and compiled on first use, then cached.
+
+        args:
+            name: Names of the valves of the route, case insensitive.
+
+        raises:
+            OneSourceException: If there is not exactly one source valve.
+            OneDestinationException: If there is not exactly one destination valve.
+        """
+        return self._route_masks(frozenset(name))
+
+    def _compile_route(self, route: frozenset[str]) -> int:
+        self.validate_valve_set(sorted(route))
+        mask = 0
+        for _name in route:
+            mask |= 1 << self._bits[_name.lower()]  # Valve names are case insensitive
+        return mask
+
+    def set_mask(self, mask: int) -> None:
+        """
+        Open the valves whose bit is set in mask, and close all others. Only the valves that
+        differ from the last mask set are written, all of them the first time.
+
+        Valves switched directly, rather than through the instrument, are not tracked.
+        """
+        valves, shadow = self._valves, self._shadow
+        changed = (1 << len(valves)) - 1 if shadow is None else mask ^ shadow
+        self.skew = Valve.set_many(
+            ((valves[bit], bool(mask >> bit & 1)) for bit in _set_bits(changed)),
+            force=shadow is None,
+        )
+        self._shadow = mask
+
     def all_except(self, name: list[str]) -> None:
         """
-        Set the state of a pin on the instrument.
+        Open the valves of a route, and close all others.
 
         Args:
             name: A list of valve names
-            state: The state of the pin.
 
         raises:
             OneSourceException: If there is not exactly one source valve.
             OneDestinationException: If there is not exactly one destination valve.
         """
-        self.validate_valve_set(name)
-
-        all_valves_in_pinout = self.pinout.valves()
-        for _name in all_valves_in_pinout:
-            if _name in name:
-                all_valves_in_pinout[_name].open()
-            else:
-                all_valves_in_pinout[_name].close()
+        start = time.perf_counter_ns() if tracer.enabled else None
+        self.set_mask(self.route_mask(name))
         logging.debug(
-            "Set %s to [bold]open[/] and all others to close.", name, extra={"markup": True}
+            "Set %s to [bold]open[/] and all others to close, with a skew of %.1fus.",
+            name,
+            self.skew * 1e6,
+            extra={"markup": True},
+        )
+        if start is not None:
+            tracer.record(
+                "all_except", "instrument", start, time.perf_counter_ns(), args={"route": name}
+            )
+
+    def close_all(self) -> None:
+        """
+        Close every valve, eg. to seal the reaction columns while they incubate.
+        """
+        self.set_mask(0)
+        logging.debug("Set all valves to [bold]close[/].", extra={"markup": True})
+
+    def snapshot(self) -> Snapshot:
+        """
+        States of the valves and switches as last set, from memory, without reading any pin.
+        """
+        mask = self._shadow
+        if mask is None:  # No valve set through the instrument yet
+            mask = sum(1 << bit for bit, valve in enumerate(self._valves) if valve.is_open)
+        return Snapshot(
+            self.valve_names, mask, {name: switch.state for name, switch in self._switches}
+        )
+
+    def _read_back(self) -> set[str]:
+        """Names of the valves and switches whose pin differs from the snapshot."""
+        snapshot = self.snapshot()
+        mismatches: set[str] = set()
+        if self._shadow is not None:  # Valves are not written before the first mask is set
+            mismatches.update(
+                name
+                for bit, (name, valve) in enumerate(zip(self.valve_names, self._valves))
+                if bool(valve.controller.value(valve.gpio_pin)) != bool(snapshot.mask >> bit & 1)
+            )
+        mismatches.update(
+            name for name, switch in self._switches if switch.value != snapshot.switches[name]
         )
+        return mismatches
+
+    def verify(self) -> list[str]:
+        """
+        Read back every valve and switch, and compare the pins with the snapshot.
+
+        A pin that differs is read again before it is reported, as the valves may have been
+        switching while they were read. The valves are only verified once the instrument has
+        set them, until then their pins are as the platform left them.
+
+        returns:
+            Names of the valves and switches whose pin differs from their state as last set.
+        """
+        mismatches = self._read_back()
+        if mismatches:
+            mismatches &= self._read_back()
+        if mismatches:
+            logging.warning("Pins of %s differ from how they were last set", sorted(mismatches))
+        return sorted(mismatches)
+
+    async def verify_periodically(
+        self, interval: float, on_mismatch: Optional[Callable[[list[str]], Any]] = None
+    ) -> None:
+        """
+        Verify the pins every interval seconds, until cancelled, see verify.
+
+        args:
+            interval: Seconds between two read backs.
+            on_mismatch: Called with the names of the devices whose pins differ, if any.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            mismatches = self.verify()
+            if mismatches and on_mismatch is not None:
+                on_mismatch(mismatches)
 
     def register_error_handler(self, handler: Callable[[None], None]) -> None:
         """
@@ -160,3 +314,11 @@ class Instrument(metaclass=Singleton):
         Return a string representation of the instrument.
         """
         return f"Instrument({self.pinout})"  # pragma: no cover
+
+
+def _set_bits(mask: int) -> Iterator[int]:
+    """Indices of the bits set in a mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -93,6 +93,8 @@ class Switchable(Protocol):
     be able to set, get the current value and toggle the state of the switch.
     """
 
+    __slots__ = ()
+
     def __init__(self, pin: int, name: str):
         """Initialize the switchable device."""
         raise NotImplementedError
@@ -117,6 +119,8 @@ class Valvable(Switchable, Protocol):
     A semantic wrapper around a switchable device. This class is used to represent a valve.
     """
 
+    __slots__ = ()
+
     def __init__(self, pin: int, name: str, valve_type: ValveType = ValveType.NORMALLY_OPEN):
         """Initialize the valve."""
         raise NotImplementedError
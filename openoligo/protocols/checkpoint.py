@@ -0,0 +1,165 @@
+"""
+Checkpoint syntheses at the end of every cycle, to resume them after a crash.
+
+Checkpoints are appended to a journal of JSON lines, flushed to the operating system on
+every write so that they survive the runner crashing, and synced to the disk in batches so
+that the SD card of the instrument is not synced after every single cycle. The checkpoints of
+a task are dropped once it is over, so the journal only holds the tasks that can be resumed.
+"""
+import json
+import logging
+import os
+import time
+from typing import IO, Any, Iterator, NamedTuple, Optional
+
+from openoligo.hal.instrument import Instrument
+
+JOURNAL_NAME = "checkpoints.jsonl"
+
+
+def journal_path() -> str:
+    """
+    Get the path to the checkpoint journal
+    """
+    tmp_dir = os.getenv("OO_TMP_DIR", os.path.expanduser("~/.openoligo/"))
+    os.makedirs(tmp_dir, exist_ok=True)
+    return os.path.join(tmp_dir, JOURNAL_NAME)
+
+
+class Checkpoint(NamedTuple):
+    """Where a synthesis task was at the end of a cycle."""
+
+    task_id: int
+    cycle: int  # Number of cycles completed
+    step: Optional[str]  # Last step of the cycle
+    valves: tuple[str, ...]  # Valves open at the end of the cycle
+    time: float  # Seconds since the epoch
+
+
+class CheckpointJournal:
+    """
+    Journal of checkpoints, appended to while a task runs, and compacted once it is over.
+
+    A checkpoint is lost only if the instrument loses power before it is synced, which is at
+    most sync_every checkpoints, or sync_interval seconds, after it is written.
+    """
+
+    def __init__(self, path: str, sync_every: int = 8, sync_interval: float = 60.0):
+        """
+        args:
+            path: Path to the journal, created if needed.
+            sync_every: Sync after this many checkpoints.
+            sync_interval: Sync when the last sync is older than this many seconds.
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file: Optional[IO[str]] = None
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def append(self, checkpoint: Checkpoint) -> None:
+        """Write a checkpoint, syncing the journal if the batch is full or old enough."""
+        if self._file is None:
+            torn = not _ends_a_line(self.path)
+            # pylint: disable-next=consider-using-with
+            self._file = open(self.path, "a", encoding="utf-8")
+            if torn:  # Keep the line cut short by a crash apart from the next checkpoint
+                self._file.write("\n")
+        self._file.write(json.dumps(checkpoint._asdict()) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if (
+            self._pending >= self.sync_every
+            or time.monotonic() - self._synced_at >= self.sync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Sync the checkpoints written so far to the disk."""
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def close(self) -> None:
+        """Sync and close the journal, it is opened again by the next append."""
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def last(self, task_id: int) -> Optional[Checkpoint]:
+        """
+        The last checkpoint of a task, if any.
+
+        A line cut short by a crash is ignored.
+        """
+        last: Optional[Checkpoint] = None
+        for record in self._records():
+            if record["task_id"] == task_id:
+                record["valves"] = tuple(record["valves"])
+                last = Checkpoint(**record)
+        return last
+
+    def forget(self, task_id: int) -> None:
+        """
+        Drop the checkpoints of a task that is over, complete or failed.
+
+        The journal is written again to another file, which then replaces it, so that a crash
+        leaves one of them whole.
+        """
+        if not os.path.exists(self.path):
+            return
+        self.close()
+        kept = [record for record in self._records() if record["task_id"] != task_id]
+        compacted = f"{self.path}.tmp"
+        with open(compacted, "w", encoding="utf-8") as journal:
+            journal.writelines(json.dumps(record) + "\n" for record in kept)
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(compacted, self.path)
+
+    def _records(self) -> Iterator[dict[str, Any]]:
+        """The checkpoints of the journal, a line cut short by a crash is ignored."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning("Ignoring a corrupt checkpoint in %s", self.path)
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+def _ends_a_line(path: str) -> bool:
+    """Whether a file is empty, missing, or ends with a new line."""
+    try:
+        with open(path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return True
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+    except FileNotFoundError:
+        return True
+
+
+def restore_valves(instrument: Instrument, checkpoint: Checkpoint) -> None:
+    """Set the valves of the instrument as they were at a checkpoint."""
+    if checkpoint.valves:
+        instrument.all_except(list(checkpoint.valves))
+    else:
+        instrument.close_all()
+    logging.info(
+        "Restored the valves of task %d after cycle %d: %s",
+        checkpoint.task_id,
+        checkpoint.cycle,
+        checkpoint.valves,
+    )
@@ -0,0 +1,258 @@
+"""
+Compile a protocol for a sequence into a flat plan of valve states and hold durations.
+
+Running a protocol directly logs every step and valve change, and awaits every wait through
+the protocol's coroutines. Compiling runs the protocol once against a recording instrument
+instead, which records what the valves are set to and for how long. The plan is then replayed
+on the real instrument with one bitmask comparison per step.
+"""
+import logging
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Coroutine, Iterator, Mapping, NamedTuple, Optional
+
+from openoligo.hal.instrument import Instrument
+from openoligo.seq import Seq
+from openoligo.steps.types import current_step, listen_cycles
+from openoligo.utils.scheduler import DeadlineScheduler, scheduling
+from openoligo.utils.trace import tracer
+from openoligo.utils.wait import record_waits, wait_async
+
+Protocol = Callable[[Instrument, Seq], Coroutine[Any, Any, None]]
+
+PLAN_CACHE_SIZE = 256
+
+# Step of the time spent outside of any step, eg. washing and drying between steps
+OTHER_STEP = "other"
+
+
+class Instruction(NamedTuple):
+    """Set the valves, then hold them for some time."""
+
+    mask: Optional[int]  # Bit i opens valve i of the plan, None leaves the valves as they are
+    hold: float  # Seconds
+    step: Optional[str] = None  # Step the instruction belongs to
+
+
+class Plan(NamedTuple):
+    """A protocol compiled for a sequence, on an instrument."""
+
+    valves: tuple[str, ...]  # Names of the valves, in the order of the bits of the masks
+    instructions: tuple[Instruction, ...]
+    # Number of instructions before the end of each cycle, where the plan can be resumed
+    cycles: tuple[int, ...] = ()
+
+    @property
+    def duration(self) -> float:
+        """Total time the plan holds the valves for, in seconds."""
+        return sum(instruction.hold for instruction in self.instructions)
+
+    def open_valves(self, mask: int) -> list[str]:
+        """Names of the valves a mask opens."""
+        return [name for bit, name in enumerate(self.valves) if mask >> bit & 1]
+
+
+class _Recorder:
+    """Stands in for the instrument while a protocol is compiled."""
+
+    def __init__(self, instrument: Instrument):
+        self.instrument = instrument
+        self.pinout = instrument.pinout
+        self.valves = instrument.valve_names
+        self._instructions: list[Instruction] = []
+        self._cycles: list[int] = []
+        self._pending: Optional[Instruction] = None  # Instruction being recorded, if any
+
+    def all_except(self, name: list[str]) -> None:
+        """Open the valves of a route, and close all others, see Instrument.all_except."""
+        self._set(self.instrument.route_mask(name))
+
+    def close_all(self) -> None:
+        """Close every valve, see Instrument.close_all."""
+        self._set(0)
+
+    def _set(self, mask: int) -> None:
+        self._flush()
+        self._pending = Instruction(mask, 0.0, current_step.get())
+
+    def hold(self, seconds: float) -> None:
+        """Hold the valves as they are."""
+        pending = self._pending or Instruction(None, 0.0, current_step.get())
+        self._pending = pending._replace(hold=pending.hold + seconds)
+
+    def end_cycle(self, _cycles: int) -> None:
+        """Mark the end of a cycle, later holds leave the valves as they are."""
+        self._flush()
+        self._cycles.append(len(self._instructions))
+
+    def _flush(self) -> None:
+        if self._pending is not None:
+            self._instructions.append(self._pending)
+        self._pending = None
+
+    def plan(self) -> Plan:
+        """The plan recorded so far."""
+        self._flush()
+        return Plan(self.valves, tuple(self._instructions), tuple(self._cycles))
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_protocol(protocol: Protocol, instrument: Instrument, seq: Seq) -> Plan:
+    """
+    Compile a protocol for a sequence into a plan, cached so that repeated sequences skip
+    compilation.
+
+    args:
+        protocol: Coroutine function taking an instrument and a sequence, eg. synthesize_ssdna,
+            or partial(synthesize_ssdna, timings=...) to run it with other timings.
+        instrument: Instrument whose pinout the plan is for.
+        seq: Sequence to synthesize.
+
+    raises:
+        OneSourceException: If a route does not have exactly one source valve.
+        OneDestinationException: If a route does not have exactly one destination valve.
+        RuntimeError: If the protocol awaits anything but wait_async, or valve changes.
+    """
+    name = getattr(protocol, "__name__", repr(protocol))  # Partials have no name
+    recorder = _Recorder(instrument)
+    with record_waits(recorder.hold), listen_cycles(recorder.end_cycle):
+        coroutine = protocol(recorder, seq)  # type: ignore
+        try:
+            coroutine.send(None)
+        except StopIteration:
+            pass
+        else:
+            coroutine.close()
+            raise RuntimeError(f"Protocol {name} can not be compiled")
+    plan = recorder.plan()
+    logging.debug("Compiled %s for '%s' into %d instructions", name, seq, len(plan.instructions))
+    return plan
+
+
+class RunReport(NamedTuple):
+    """How a run of a plan kept to it."""
+
+    planned: float  # Seconds the run should have taken
+    elapsed: float  # Seconds it took
+    lateness: Mapping[str, float]  # Most seconds a hold of each step woke up late
+
+
+async def run_plan(
+    instrument: Instrument,
+    plan: Plan,
+    start_cycle: int = 0,
+    on_cycle: Optional[Callable[[int, Optional[str], list[str]], Any]] = None,
+) -> RunReport:
+    """
+    Replay a plan on the instrument.
+
+    Only the valves whose state differs from the previous instruction are switched. Each hold
+    ends at its deadline from the start of the run, so the time spent switching valves or
+    checkpointing is caught up on, rather than adding up over the run.
+
+    args:
+        start_cycle: Number of cycles already completed, to resume the plan after them.
+        on_cycle: Called with the number of cycles completed, the last step and the open
+            valves at the end of every cycle, eg. to checkpoint.
+
+    raises:
+        ValueError: If the plan does not have start_cycle cycles, or is for another pinout.
+    """
+    if plan.valves != instrument.valve_names:
+        raise ValueError("The plan was compiled for another pinout")
+    if not 0 <= start_cycle <= len(plan.cycles):
+        raise ValueError(f"Can not resume a plan of {len(plan.cycles)} cycles at {start_cycle}")
+    start = plan.cycles[start_cycle - 1] if start_cycle else 0
+    ends = {end: cycle for cycle, end in enumerate(plan.cycles, 1) if cycle > start_cycle}
+    step: Optional[str] = None
+    lateness: dict[str, float] = {}
+    cycle_start = time.perf_counter_ns()
+    with scheduling() as scheduler:
+        for index in range(start, len(plan.instructions)):
+            mask, hold, _step = plan.instructions[index]
+            if _step != step:
+                step = _step
+                if step is not None:
+                    logging.info("Starting step [bold]%s[/]", step, extra={"markup": True})
+            if mask is not None:
+                instrument.set_mask(mask)
+            if hold:
+                await _hold(hold, step or OTHER_STEP, scheduler, lateness)
+            if index + 1 in ends:
+                cycle_start = _end_cycle(plan, index + 1, cycle_start, ends[index + 1], on_cycle)
+
+    report = RunReport(scheduler.planned, scheduler.elapsed, MappingProxyType(lateness))
+    _log_report(plan, report)
+    return report
+
+
+async def _hold(
+    seconds: float, label: str, scheduler: DeadlineScheduler, lateness: dict[str, float]
+) -> None:
+    """Hold the valves, and keep the worst lateness of the holds of each step."""
+    waits = len(scheduler.lateness)
+    start = time.perf_counter_ns() if tracer.enabled else None
+    await wait_async(seconds)
+    if start is not None:
+        tracer.record(label, "hold", start, time.perf_counter_ns(), args={"planned": seconds})
+    if len(scheduler.lateness) > waits:  # Unless the wait was only recorded
+        lateness[label] = max(lateness.get(label, 0.0), scheduler.lateness[-1])
+
+
+def _end_cycle(
+    plan: Plan,
+    end: int,
+    start: int,
+    cycle: int,
+    on_cycle: Optional[Callable[[int, Optional[str], list[str]], Any]],
+) -> int:
+    """
+    Trace a cycle that started at start, and call on_cycle with the last named step and the
+    valves open at its end, the instruction end. Returns when the next cycle starts.
+    """
+    now = time.perf_counter_ns()
+    if tracer.enabled:
+        tracer.record(f"cycle {cycle}", "cycle", start, now)
+    if on_cycle is not None:
+        last_step = next((i.step for i in _backwards(plan, end) if i.step is not None), None)
+        mask = next((i.mask for i in _backwards(plan, end) if i.mask is not None), 0)
+        on_cycle(cycle, last_step, plan.open_valves(mask))
+    return now
+
+
+def _backwards(plan: Plan, end: int) -> Iterator[Instruction]:
+    """The instructions of a plan before end, from the last one back."""
+    return map(plan.instructions.__getitem__, range(end - 1, -1, -1))
+
+
+def _log_report(plan: Plan, report: RunReport) -> None:
+    logging.info(
+        "Plan of %d instructions complete in %s minutes, %.3fs behind the plan",
+        len(plan.instructions),
+        report.elapsed / 60,
+        report.elapsed - report.planned,
+    )
+    if report.lateness:
+        late_step = max(report.lateness, key=report.lateness.__getitem__)
+        logging.info(
+            "Holds woke up at most %.3fs late, in %s", report.lateness[late_step], late_step
+        )
+
+
+async def run_protocol(
+    protocol: Protocol,
+    instrument: Instrument,
+    seq: Seq,
+    start_cycle: int = 0,
+    on_cycle: Optional[Callable[[int, Optional[str], list[str]], Any]] = None,
+) -> RunReport:
+    """
+    Compile a protocol for a sequence, or reuse the cached plan, and run it.
+
+    args:
+        start_cycle: Number of cycles already completed, see run_plan.
+        on_cycle: Called at the end of every cycle, see run_plan.
+    """
+    plan = compile_protocol(protocol, instrument, seq)
+    return await run_plan(instrument, plan, start_cycle, on_cycle)
@@ -0,0 +1,115 @@
+"""
+Estimate how long a protocol takes and what it uses, without running it.
+
+Estimates are computed from the compiled plan of the protocol, so they are exact for the
+protocol as written, never touch the valves, and are cached per sequence, which keeps the
+estimated time of arrival of a whole queue cheap to recompute.
+"""
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+from openoligo.hal.instrument import Instrument
+from openoligo.hal.types import NoSuchPinInPinout, ValveRole
+from openoligo.protocols.compiler import OTHER_STEP, Plan, Protocol, compile_protocol
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+
+ESTIMATE_CACHE_SIZE = 4096
+
+
+class Estimate(NamedTuple):
+    """What running a protocol for a sequence takes."""
+
+    duration: float  # Seconds
+    steps: Mapping[str, float]  # Seconds spent in each step, in the order they first run
+    actuations: Mapping[str, int]  # Number of times each valve is switched
+    open_time: Mapping[str, float]  # Seconds each valve is open for
+    reagent_time: Mapping[str, float]  # Seconds each reagent (inlet) valve is open for
+
+
+def estimate_plan(plan: Plan, roles: Optional[Mapping[str, ValveRole]] = None) -> Estimate:
+    """
+    Estimate a compiled plan.
+
+    The valves are assumed to all be closed before the plan starts.
+
+    args:
+        plan: The compiled plan.
+        roles: Role of each valve of the plan, no valve is a reagent valve if None.
+    """
+    steps: dict[str, float] = {}
+    switches = [0] * len(plan.valves)
+    opened = [0.0] * len(plan.valves)
+    previous = mask = 0
+    for instruction in plan.instructions:
+        if instruction.mask is not None:
+            mask = instruction.mask
+            changed = mask ^ previous
+            while changed:
+                bit = changed & -changed
+                switches[bit.bit_length() - 1] += 1
+                changed ^= bit
+            previous = mask
+
+        if instruction.hold:
+            step = instruction.step or OTHER_STEP
+            steps[step] = steps.get(step, 0.0) + instruction.hold
+            opening = mask
+            while opening:
+                bit = opening & -opening
+                opened[bit.bit_length() - 1] += instruction.hold
+                opening ^= bit
+
+    open_time = {name: time for name, time in zip(plan.valves, opened) if time}
+    reagents = {name for name, role in (roles or {}).items() if role == ValveRole.INLET}
+    return Estimate(
+        duration=plan.duration,
+        steps=MappingProxyType(steps),
+        actuations=MappingProxyType(
+            {name: count for name, count in zip(plan.valves, switches) if count}
+        ),
+        open_time=MappingProxyType(open_time),
+        reagent_time=MappingProxyType(
+            {name: time for name, time in open_time.items() if name in reagents}
+        ),
+    )
+
+
+@lru_cache(maxsize=ESTIMATE_CACHE_SIZE)
+def estimate(seq: Seq, instrument: Instrument, protocol: Protocol = synthesize_ssdna) -> Estimate:
+    """
+    Estimate running a protocol for a sequence on an instrument, cached per sequence.
+
+    raises:
+        NoSuchPinInPinout: If the instrument has no valve for an amidite of the sequence.
+    """
+    plan = compile_protocol(protocol, instrument, seq)
+    valves = instrument.pinout.valves()
+    return estimate_plan(plan, {name: valves[name].role for name in plan.valves})
+
+
+def estimate_queue(
+    seqs: Iterable[Seq], instrument: Instrument, protocol: Protocol = synthesize_ssdna
+) -> list[Optional[tuple[float, float]]]:
+    """
+    When each sequence of a queue starts and finishes, one after the other.
+
+    A sequence with an amidite the instrument has no valve for can not be run, so it takes
+    no time in the queue.
+
+    returns:
+        The start and finish of each sequence, in seconds from the start of the queue, or
+        None for a sequence that can not be run.
+    """
+    times: list[Optional[tuple[float, float]]] = []
+    start = 0.0
+    for seq in seqs:
+        try:
+            finish = start + estimate(seq, instrument, protocol).duration
+        except NoSuchPinInPinout:
+            times.append(None)
+            continue
+        times.append((start, finish))
+        start = finish
+    return times
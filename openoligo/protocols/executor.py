@@ -0,0 +1,217 @@
+"""
+Run plans on a dedicated thread, away from the database, logging and API work of the runner.
+
+The timing thread runs its own event loop, which only switches valves and waits. Whatever
+else has to happen meanwhile, eg. writing a checkpoint at the end of a cycle, is handed off
+to the loop of the runner through a SimpleQueue. Log records are handed off to a listener
+thread through another one. A slow SQLite write or log flush then never delays the next
+valve transition.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager, suppress
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Thread
+from typing import Any, Callable, Coroutine, Iterator, NamedTuple, Optional, TypeVar
+
+from openoligo.hal.instrument import Instrument
+from openoligo.protocols.compiler import Plan, RunReport, run_plan
+from openoligo.utils.clock import Clock, VirtualClock, get_clock, run_virtual
+from openoligo.utils.scheduler import DeadlineScheduler
+
+T = TypeVar("T")
+
+
+def _raise_priority() -> None:
+    """Ask for real time scheduling of the calling thread, where the platform allows it."""
+    try:
+        policy = os.SCHED_FIFO  # type: ignore[attr-defined]
+        priority = os.sched_get_priority_min(policy)  # type: ignore[attr-defined]
+        os.sched_setscheduler(0, policy, os.sched_param(priority))  # type: ignore[attr-defined]
+    except (AttributeError, OSError) as exc:  # Not on Linux, or not allowed to
+        logging.debug("The timing thread runs at normal priority: %s", exc)
+
+
+def _run_on_new_loop(function: Callable[[], Coroutine[Any, Any, T]]) -> T:
+    """Run a coroutine function on a new event loop, virtual if the current clock is."""
+    if isinstance(get_clock(), VirtualClock):
+        return run_virtual(function())
+    return asyncio.run(function())
+
+
+class PlanExecutor:
+    """
+    Runs coroutines on a dedicated timing thread, one at a time, while the calling loop stays
+    free for everything else.
+    """
+
+    def __init__(self) -> None:
+        self.events: SimpleQueue[Callable[[], Any]] = SimpleQueue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: list[asyncio.Future] = []
+
+    def hand_off(self, callback: Callable[..., Any], *args: Any) -> None:
+        """
+        Call a function on the loop of the caller of run, from the timing thread, without
+        waiting for it. Coroutine functions are scheduled as tasks, awaited before run returns.
+        """
+        self.events.put(lambda: callback(*args))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        while not self.events.empty():
+            result = self.events.get_nowait()()
+            if asyncio.iscoroutine(result):
+                self._pending.append(asyncio.ensure_future(result))
+
+    async def run(self, function: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """
+        Run a coroutine function on the timing thread, in the context of the caller.
+
+        raises:
+            Whatever the coroutine raises.
+        """
+        loop = self._loop = asyncio.get_running_loop()
+        done: asyncio.Future = loop.create_future()
+        context = contextvars.copy_context()
+
+        def target() -> None:
+            _raise_priority()
+            try:
+                result = context.run(_run_on_new_loop, function)
+            except BaseException as exc:  # pylint: disable=broad-except
+                loop.call_soon_threadsafe(done.set_exception, exc)
+            else:
+                loop.call_soon_threadsafe(done.set_result, result)
+
+        Thread(target=target, name="openoligo-timing", daemon=True).start()
+        try:
+            return await done
+        finally:
+            self._drain()
+            pending, self._pending = self._pending, []
+            await asyncio.gather(*pending)
+            self._loop = None
+
+    async def run_plan(
+        self,
+        instrument: Instrument,
+        plan: Plan,
+        start_cycle: int = 0,
+        on_cycle: Optional[Callable[[int, Optional[str], list[str]], Any]] = None,
+    ) -> RunReport:
+        """
+        Run a plan on the timing thread, see compiler.run_plan.
+
+        on_cycle is handed off to the loop of the caller, rather than called on the timing
+        thread, so it may be slow, or a coroutine function.
+        """
+        handed_off = partial(self.hand_off, on_cycle) if on_cycle is not None else None
+        return await self.run(lambda: run_plan(instrument, plan, start_cycle, handed_off))
+
+
+@contextmanager
+def queued_logging(logger: Optional[logging.Logger] = None) -> Iterator[QueueListener]:
+    """
+    Within the context, the handlers of a logger (the root logger if None) run on a listener
+    thread, and logging only puts the records on a SimpleQueue.
+    """
+    logger = logger or logging.getLogger()
+    handlers = logger.handlers[:]
+    records: SimpleQueue[logging.LogRecord] = SimpleQueue()
+    queue_handler = QueueHandler(records)  # type: ignore[arg-type]
+    listener = QueueListener(records, *handlers, respect_handler_level=True)  # type: ignore
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield listener
+    finally:
+        logger.removeHandler(queue_handler)
+        listener.stop()
+        for handler in handlers:
+            logger.addHandler(handler)
+
+
+class _WallClock(Clock):
+    """The monotonic clock, not sped up, to measure jitter in real seconds."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class JitterReport(NamedTuple):
+    """How late valve switches were, in seconds."""
+
+    samples: int
+    mean: float
+    p99: float
+    worst: float
+
+
+async def synthetic_io_load(block: float = 0.005, interval: float = 0.001) -> None:
+    """
+    Keep the calling loop busy like the runner can be, until cancelled.
+
+    args:
+        block: Seconds each burst blocks the loop for, like a slow SQLite write.
+        interval: Seconds between bursts.
+    """
+    while True:
+        time.sleep(block)
+        logging.debug("Synthetic I/O burst of %.3fs", block)
+        await asyncio.sleep(interval)
+
+
+async def measure_jitter(
+    instrument: Instrument,
+    valve: str,
+    period: float = 0.01,
+    samples: int = 500,
+    load: Optional[Callable[[], Coroutine[Any, Any, None]]] = synthetic_io_load,
+) -> JitterReport:
+    """
+    Switch a valve every period on the timing thread, while load runs on the calling loop,
+    and measure how late each switch is.
+
+    args:
+        valve: Name of the valve to switch.
+        period: Seconds between switches.
+        samples: Number of switches.
+        load: Coroutine function to keep the calling loop busy with, none if None.
+    """
+    device = instrument.pinout.get(valve)
+
+    async def switch() -> list[float]:
+        scheduler = DeadlineScheduler(_WallClock())
+        for sample in range(samples):
+            device.set(not sample % 2)
+            await scheduler.wait(period)
+        return scheduler.lateness
+
+    load_task = asyncio.ensure_future(load()) if load is not None else None
+    try:
+        lateness = await PlanExecutor().run(switch)
+    finally:
+        if load_task is not None:
+            load_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await load_task
+
+    ordered = sorted(lateness)
+    return JitterReport(
+        samples=len(ordered),
+        mean=sum(ordered) / len(ordered) if ordered else 0.0,
+        p99=ordered[int(0.99 * (len(ordered) - 1))] if ordered else 0.0,
+        worst=ordered[-1] if ordered else 0.0,
+    )
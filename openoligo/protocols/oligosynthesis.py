@@ -2,124 +2,195 @@
 DNA Snthesis Protocol
 """
 import logging
-from time import time
+from typing import Mapping, NamedTuple, Sequence
 
 from tqdm import tqdm
 
 from openoligo import utils
 from openoligo.hal.instrument import Instrument
+from openoligo.protocols.timing import DEFAULT_TIMINGS, TimingTable, seq_category
 from openoligo.seq import Seq
-from openoligo.steps.flow import dry_all, send_to_waste_rxn, solvent_wash_all
-from openoligo.steps.types import step
-from openoligo.utils import wait_async
+from openoligo.steps.flow import (
+    BranchOperation,
+    PrimedLines,
+    clean_reaction_branch,
+    clean_reagent_branch,
+    dry_all,
+    incubate,
+    send_to_waste_rxn,
+    solvent_wash_all,
+)
+from openoligo.steps.types import cycle_completed, step
+from openoligo.utils import get_clock, wait_async
+
+
+class StepOptions(NamedTuple):
+    """Where a step delivers its reagents, and what runs on the reagent branch meanwhile."""
+
+    columns: Sequence[str] = ()  # Outlet valves of the columns, the first column if empty
+    meanwhile: Sequence[BranchOperation] = ()  # Run on the reagent branch while incubating
+    fill: float = 10  # Seconds each reagent flows through the columns before they are sealed
 
 
 @step
-async def detritylate(instrument: Instrument) -> None:
+async def detritylate(
+    instrument: Instrument, options: StepOptions = StepOptions(), duration: float = 50
+) -> None:
     """
-    Add 3% trichloroacetic acid in dichloromethane to the reactor
+    Add 3% trichloroacetic acid in dichloromethane, the deblocking reagent, to the reactor
     """
-    await send_to_waste_rxn(instrument, "act")
-    await wait_async(50)
+    await send_to_waste_rxn(instrument, "deb", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
 @step
-async def activate(instrument: Instrument) -> None:
+async def couple(
+    instrument: Instrument, amidite: str, options: StepOptions = StepOptions(), duration: float = 50
+) -> None:
     """
-    Add 0.1 M phosphoramidite monomer and 0.5 M tetrazole to the reactor
+    Add a phosphoramidite monomer and then the activator to the reactor
     """
-    await send_to_waste_rxn(instrument, "act")
-    await wait_async(50)
+    await send_to_waste_rxn(instrument, amidite, options.columns)
+    await wait_async(options.fill)
+    await send_to_waste_rxn(instrument, "act", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
 @step
-async def cap(instrument: Instrument) -> None:
+async def cap(
+    instrument: Instrument, options: StepOptions = StepOptions(), duration: float = 30
+) -> None:
     """
     Add acetic anhydride/pyridine/THF and N-methyl imidazole to the reactor
     """
-    await send_to_waste_rxn(instrument, "cap1")
-    await send_to_waste_rxn(instrument, "cap2")
-    await wait_async(30)
+    await send_to_waste_rxn(instrument, "cap1", options.columns)
+    await wait_async(options.fill)
+    await send_to_waste_rxn(instrument, "cap2", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
 @step
-async def oxidize(instrument: Instrument) -> None:
+async def oxidize(
+    instrument: Instrument, options: StepOptions = StepOptions(), duration: float = 45
+) -> None:
     """
     Add 0.015 M iodine in water/pyridine/THF to the reactor
     """
-    await send_to_waste_rxn(instrument, "oxi")
-    await wait_async(45)
+    await send_to_waste_rxn(instrument, "oxi", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
 @step
-async def cleave(instrument: Instrument) -> None:
+async def cleave(
+    instrument: Instrument, options: StepOptions = StepOptions(), duration: float = 180
+) -> None:
     """
     Cleave the DNA sequence from the solid support.
     """
-    await send_to_waste_rxn(instrument, "clde")
-    await wait_async(180)
+    await send_to_waste_rxn(instrument, "clde", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
 @step
-async def deprotect(instrument: Instrument) -> None:
+async def deprotect(
+    instrument: Instrument, options: StepOptions = StepOptions(), duration: float = 45
+) -> None:
     """
     Remove the protecting groups from the DNA sequence.
     """
-    await send_to_waste_rxn(instrument, "deb")
-    await wait_async(45)
+    await send_to_waste_rxn(instrument, "deb", options.columns)
+    await incubate(instrument, duration, options.meanwhile, options.fill)
 
 
-async def synthesize_ssdna(instrument: Instrument, seq: Seq) -> None:
+async def _cycle(
+    instrument: Instrument,
+    couplings: Mapping[str, tuple[Sequence[str], float]],
+    following: str,
+    timings: TimingTable,
+    lines: PrimedLines,
+) -> None:
     """
-    Synthesize a DNA sequence.
+    Add a base to the columns of a synthesis cycle.
+
+    The reagent branch is cleaned, and the next reagent primed unless its line still is (eg.
+    for a repeated base), while the columns incubate.
 
     args:
-        seq: DNA sequence to synthesize.
+        couplings: Columns to couple each base to and for how long, in the order they couple.
+        following: Reagent of the step after the cycle, primed while the columns oxidize.
     """
-    logging.info("Initiating synthesis of DNA sequence: '%s'", seq)
-    start_time = time()  # start timer
-    with tqdm(total=len(seq) + 2) as pbar:
-        await solvent_wash_all(instrument)
-        await dry_all(instrument)
 
-        pbar.update(1)
+    def options(columns: Sequence[str], prime_next: str) -> StepOptions:
+        meanwhile = clean_reagent_branch(prime_next, timings.prime, lines)
+        return StepOptions(columns, meanwhile, timings.fill)
 
-        for base_index, base in enumerate(seq):
-            logging.info("Adding %sth base '%s' to growing DNA strand", base_index, base)
-
-            await detritylate(instrument)
+    active = [column for columns, _ in couplings.values() for column in columns]
+    bases = list(couplings)
+    await detritylate(instrument, options(active, bases[0]), timings.steps["detritylate"])
+    await clean_reaction_branch(instrument, active)
 
-            await solvent_wash_all(instrument)
-            await dry_all(instrument)
+    for base, prime_next in zip(bases, [*bases[1:], "cap1"]):
+        columns, coupling_time = couplings[base]
+        await couple(instrument, base, options(columns, prime_next), coupling_time)
+        await clean_reaction_branch(instrument, columns)
 
-            await activate(instrument)
+    await cap(instrument, options(active, "oxi"), timings.steps["cap"])
+    await clean_reaction_branch(instrument, active)
 
-            await solvent_wash_all(instrument)
-            await dry_all(instrument)
+    await oxidize(instrument, options(active, following), timings.steps["oxidize"])
+    await clean_reaction_branch(instrument, active)
 
-            await cap(instrument)
+    await wait_async(1)
+    lines.next_cycle()
 
-            await solvent_wash_all(instrument)
-            await dry_all(instrument)
 
-            await oxidize(instrument)
+async def _finish(
+    instrument: Instrument, columns: Sequence[str], timings: TimingTable, lines: PrimedLines
+) -> None:
+    """Cleave the sequences from the columns, then remove their protecting groups."""
+    meanwhile = clean_reagent_branch("deb", timings.prime, lines)
+    await cleave(instrument, StepOptions(columns, meanwhile, timings.fill), timings.steps["cleave"])
+    await clean_reaction_branch(instrument, columns)
+    await deprotect(instrument, StepOptions(columns, fill=timings.fill), timings.steps["deprotect"])
 
-            await solvent_wash_all(instrument)
-            await dry_all(instrument)
 
-            await wait_async(1)
-            pbar.update(1)
+async def synthesize_ssdna(
+    instrument: Instrument, seq: Seq, timings: TimingTable = DEFAULT_TIMINGS
+) -> None:
+    """
+    Synthesize a DNA sequence.
 
-        await cleave(instrument)
+    args:
+        seq: DNA sequence to synthesize.
+        timings: Durations of the steps, and coupling time of each base.
+    """
+    logging.info("Initiating synthesis of DNA sequence: '%s'", seq)
+    clock = get_clock()
+    start_time = clock.now()  # start timer
+    category = seq_category(seq.amidites)
+    lines = PrimedLines()
 
+    with tqdm(total=len(seq) + 2, disable=utils.recording_waits()) as pbar:
         await solvent_wash_all(instrument)
         await dry_all(instrument)
 
-        await deprotect(instrument)
+        pbar.update(1)
+
+        for base_index, (base, amidite) in enumerate(zip(seq, seq.amidites)):
+            logging.info("Adding %sth base '%s' to growing DNA strand", base_index, base)
+            following = "clde" if base_index == len(seq) - 1 else "deb"
+            coupling_time = timings.coupling_time(amidite, category)
+            await _cycle(instrument, {base: ((), coupling_time)}, following, timings, lines)
+            cycle_completed(base_index + 1)
+            pbar.update(1)
+
+        await _finish(instrument, (), timings, lines)
 
         pbar.update(1)
-    end_time = time()  # end timer
-    elapsed_time_in_minutes = ((end_time - start_time) / 60) * utils.SIMULATION_SPEEDUP_FACTOR
+    if utils.recording_waits():
+        return  # Nothing was synthesized yet, the protocol is being compiled
+    end_time = clock.now()  # end timer
+    elapsed_time_in_minutes = (end_time - start_time) / 60
     logging.info(
         "Synthesis complete for DNA sequence: '%s' in %s minutes", seq, elapsed_time_in_minutes
     )
@@ -132,14 +203,75 @@ async def synthesize_dsdna(instrument: Instrument, seq: Seq) -> None:
         instrument (Instrument): Instrument object.
         seq (Seq): DNA sequence to synthesize.
     """
+    reverse = seq.reverse_complement()
     logging.info("Synthesizing the positive strand of DNA sequence: '%s'", seq)
     await synthesize_ssdna(instrument, seq)
     logging.info(
-        "Synthesizing the negative strand of DNA sequence: '%s' which is '%s'",
-        seq,
-        seq.reverse_complement(),
-    )
-    await synthesize_ssdna(instrument, seq.reverse_complement())
-    logging.info(
-        "Synthesis complete for both strands: '%s' and '%s'", seq, seq.reverse_complement()
+        "Synthesizing the negative strand of DNA sequence: '%s' which is '%s'", seq, reverse
     )
+    await synthesize_ssdna(instrument, reverse)
+    logging.info("Synthesis complete for both strands: '%s' and '%s'", seq, reverse)
+
+
+def _coupling_schedule(seq: Seq, timings: TimingTable) -> list[tuple[str, float]]:
+    """Each base of a sequence, with the time to couple it for."""
+    category = seq_category(seq.amidites)
+    return [
+        (base, timings.coupling_time(amidite, category)) for base, amidite in zip(seq, seq.amidites)
+    ]
+
+
+def _cycle_couplings(
+    columns: Sequence[str], schedules: Sequence[list[tuple[str, float]]], cycle: int
+) -> dict[str, tuple[list[str], float]]:
+    """
+    Columns to couple each base to in a cycle, in the order the bases first come, and for the
+    longest coupling time of those columns. Columns whose sequence is complete are left out.
+    """
+    couplings: dict[str, tuple[list[str], float]] = {}
+    for column, schedule in zip(columns, schedules):
+        if cycle < len(schedule):
+            base, coupling_time = schedule[cycle]
+            base_columns, longest = couplings.get(base, ([], 0.0))
+            couplings[base] = ([*base_columns, column], max(longest, coupling_time))
+    return couplings
+
+
+async def synthesize_batch(
+    instrument: Instrument, seqs: Sequence[Seq], timings: TimingTable = DEFAULT_TIMINGS
+) -> None:
+    """
+    Synthesize one sequence per reaction column, all at the same time.
+
+    Every cycle, the steps whose reagents are the same for every sequence are delivered to
+    all the columns that still have bases to add at once, and coupling is delivered once per
+    distinct base, to the columns that need that base, for the longest coupling time of them.
+
+    args:
+        seqs: Sequences to synthesize, the first one on the first column and so on.
+        timings: Durations of the steps, and coupling time of each base.
+
+    raises:
+        ValueError: If there are more sequences than reaction columns.
+    """
+    outlets = instrument.pinout.column_outlets()
+    if len(seqs) > len(outlets):
+        raise ValueError(f"Can not synthesize {len(seqs)} sequences on {len(outlets)} columns")
+    columns = outlets[: len(seqs)]
+    schedules = [_coupling_schedule(seq, timings) for seq in seqs]
+    lines = PrimedLines()
+    logging.info("Initiating synthesis of %d sequences on columns %s", len(seqs), columns)
+
+    await solvent_wash_all(instrument, columns)
+    await dry_all(instrument, columns)
+
+    cycles = max(map(len, schedules), default=0)
+    for cycle in range(cycles):
+        couplings = _cycle_couplings(columns, schedules, cycle)
+        logging.info("Adding base %d to columns %s", cycle, couplings)
+        following = "deb" if cycle < cycles - 1 else "clde"
+        await _cycle(instrument, couplings, following, timings, lines)
+        cycle_completed(cycle + 1)
+
+    await _finish(instrument, columns, timings, lines)
+    logging.info("Synthesis complete for the sequences on columns %s", columns)
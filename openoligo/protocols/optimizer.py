@@ -0,0 +1,177 @@
+"""
+Optimize compiled plans by fusing and dropping redundant valve states.
+
+Protocols wash and dry after every step, which sets routes that are often identical to the
+current state of the valves, and washes between reagents that may not need one. The optimizer
+rewrites a plan to merge identical consecutive states, and skip the washes between reagents
+that are declared compatible. On request, it also drops the states held for no time that
+deliver nothing, those that open no inlet. Reagent routes are never dropped, even if held for no
+time, as the valves still switch through them.
+"""
+from dataclasses import dataclass, field
+from typing import Mapping, NamedTuple, Optional
+
+from openoligo.hal.instrument import Instrument
+from openoligo.hal.types import ValveRole
+from openoligo.protocols.compiler import Instruction, Plan, Protocol, compile_protocol
+from openoligo.seq import Seq
+
+# Inlets that clean the lines rather than deliver a reagent
+WASH_VALVES = frozenset({"sol", "gas"})
+
+
+@dataclass(frozen=True)
+class OptimizerOptions:
+    """Which optimizations to apply to a plan."""
+
+    merge_identical: bool = True  # Merge consecutive instructions that set the same valves
+    # Drop valve states left as soon as they are set, if they open no inlet or change nothing
+    drop_zero_holds: bool = False
+    # Pairs of reagents that may follow each other without a wash between, by the names of their
+    # inlet valves, in any case (eg. ("deb", "T"))
+    compatible: frozenset[tuple[str, str]] = field(default_factory=frozenset)
+
+
+class OptimizationReport(NamedTuple):
+    """What optimizing a plan saved."""
+
+    instructions_before: int
+    instructions_after: int
+    time_saved: float  # Seconds
+    time_saved_per_base: float  # Seconds per coupling cycle
+
+
+def _drop_zero_holds(
+    instructions: list[Instruction], inlets: Mapping[int, str]
+) -> list[Instruction]:
+    """
+    Drop the instructions whose valve state is replaced straight away, if they set the valves
+    to the state they are already in, or open no inlet.
+    """
+    kept: list[Instruction] = []
+    current: Optional[int] = None
+    for instruction, following in zip(instructions, [*instructions[1:], None]):
+        mask = instruction.mask
+        replaced = not instruction.hold and following is not None and following.mask is not None
+        if replaced and (mask is None or mask == current or _inlet(mask, inlets) is None):
+            continue
+        kept.append(instruction)
+        if mask is not None:
+            current = mask
+    return kept
+
+
+def _merge_identical(instructions: list[Instruction]) -> list[Instruction]:
+    """Merge the instructions that set the valves to the state they are already in."""
+    merged: list[Instruction] = []
+    for instruction in instructions:
+        if merged and instruction.mask in (None, merged[-1].mask):
+            previous = merged[-1]
+            merged[-1] = previous._replace(hold=previous.hold + instruction.hold)
+        else:
+            merged.append(instruction)
+    return merged
+
+
+def _skip_compatible_washes(
+    instructions: list[Instruction],
+    inlets: Mapping[int, str],
+    compatible: frozenset[tuple[str, str]],
+) -> list[Instruction]:
+    """
+    Drop the washes between two reagents that are compatible.
+
+    Only the washes between steps are dropped, those that open a wash inlet outside of any
+    step. The states that open no inlet, such as the sealed columns incubating, and the washes
+    that run during a step, whose holds time the step, are always kept.
+    """
+    dropped: set[int] = set()
+    washes: list[int] = []
+    reagent: Optional[str] = None
+    for index, instruction in enumerate(instructions):
+        inlet = _inlet(instruction.mask, inlets)
+        if inlet in WASH_VALVES:
+            if instruction.step is None:
+                washes.append(index)
+        elif inlet is not None:
+            if (reagent, inlet) in compatible:
+                dropped.update(washes)
+            washes = []
+            reagent = inlet
+    return [instruction for index, instruction in enumerate(instructions) if index not in dropped]
+
+
+def _inlet(mask: Optional[int], inlets: Mapping[int, str]) -> Optional[str]:
+    """Name of the inlet valve a mask opens, if any."""
+    if mask is None:
+        return None
+    for bit, name in inlets.items():
+        if mask & bit:
+            return name
+    return None
+
+
+def optimize_plan(
+    plan: Plan,
+    roles: Mapping[str, ValveRole],
+    options: OptimizerOptions = OptimizerOptions(),
+) -> Plan:
+    """
+    Optimize a compiled plan.
+
+    args:
+        plan: The plan to optimize.
+        roles: Role of each valve of the plan, to tell reagents from the other valves.
+        options: Which optimizations to apply.
+
+    Each cycle is optimized apart from the others, so the optimized plan can still be resumed
+    at the end of any cycle.
+    """
+    inlets = {
+        1 << bit: name for bit, name in enumerate(plan.valves) if roles.get(name) == ValveRole.INLET
+    }
+    instructions: list[Instruction] = []
+    cycles: list[int] = []
+    start = 0
+    for end in [*plan.cycles, len(plan.instructions)]:  # Each cycle apart, to keep its end
+        instructions.extend(_optimize(list(plan.instructions[start:end]), inlets, options))
+        cycles.append(len(instructions))
+        start = end
+    return plan._replace(instructions=tuple(instructions), cycles=tuple(cycles[:-1]))
+
+
+def _optimize(
+    instructions: list[Instruction], inlets: Mapping[int, str], options: OptimizerOptions
+) -> list[Instruction]:
+    if options.compatible:
+        compatible = frozenset((first.lower(), then.lower()) for first, then in options.compatible)
+        instructions = _skip_compatible_washes(instructions, inlets, compatible)
+    if options.drop_zero_holds:
+        instructions = _drop_zero_holds(instructions, inlets)
+    if options.merge_identical:
+        instructions = _merge_identical(instructions)
+    return instructions
+
+
+def optimize(
+    protocol: Protocol,
+    instrument: Instrument,
+    seq: Seq,
+    options: OptimizerOptions = OptimizerOptions(),
+) -> tuple[Plan, OptimizationReport]:
+    """
+    Compile a protocol for a sequence and optimize the plan.
+
+    returns:
+        The optimized plan, and what the optimization saved.
+    """
+    plan = compile_protocol(protocol, instrument, seq)
+    valves = instrument.pinout.valves()
+    optimized = optimize_plan(plan, {name: valves[name].role for name in plan.valves}, options)
+    time_saved = plan.duration - optimized.duration
+    return optimized, OptimizationReport(
+        instructions_before=len(plan.instructions),
+        instructions_after=len(optimized.instructions),
+        time_saved=time_saved,
+        time_saved_per_base=time_saved / len(seq) if len(seq) else 0.0,
+    )
@@ -0,0 +1,186 @@
+"""
+Plan a batch of sequences onto parallel synthesis columns.
+
+Sequences whose first coupling cycles are identical can run in lockstep on separate
+columns, sharing every step of those cycles, from detritylation to oxidation. The
+planner builds a trie over the sequences in synthesis order, where every node is one
+coupling cycle, groups the sequences of the deepest subtries onto the columns first, and
+schedules each group as a walk over its own trie.
+"""
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence, Union
+
+from openoligo.seq import Phosphoramidite, Seq
+
+_AMIDITES = tuple(Phosphoramidite)
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """A coupling cycle in the trie, shared by every sequence below it."""
+
+    __slots__ = ("children", "ends", "through")
+
+    def __init__(self):
+        self.children: dict[int, "_Node"] = {}
+        self.ends: list[int] = []
+        self.through: list[int] = []
+
+
+class PrefixTrie:
+    """
+    Trie of sequences keyed by amidite, in the order the amidites are coupled.
+    """
+
+    def __init__(self, seqs: Iterable[Seq] = ()):
+        self._root = _Node()
+        self._seqs: list[Seq] = []
+        for seq in seqs:
+            self.insert(seq)
+
+    def insert(self, seq: Seq) -> int:
+        """
+        Add a sequence to the trie.
+
+        returns:
+            The index of the sequence in the trie.
+        """
+        index = len(self._seqs)
+        node = self._root
+        for code in seq.codes:
+            node = node.children.setdefault(code, _Node())
+            node.through.append(index)
+        node.ends.append(index)
+        self._seqs.append(seq)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._seqs)
+
+    def __getitem__(self, index: int) -> Seq:
+        return self._seqs[index]
+
+    def groups(self, size: int) -> list[list[int]]:
+        """
+        Split the sequences into groups of at most size sequences that share long prefixes.
+
+        Groups are filled from the deepest nodes up, so sequences are only grouped under a
+        node when its subtries have too few sequences left to fill a group on their own.
+        """
+        groups: list[list[int]] = []
+
+        def leftover(node: _Node) -> list[int]:
+            pending = list(node.ends)
+            for code in sorted(node.children):
+                pending.extend(leftover(node.children[code]))
+            while len(pending) >= size:
+                groups.append(pending[:size])
+                del pending[:size]
+            return pending
+
+        remainder = leftover(self._root)
+        if remainder:
+            groups.append(remainder)
+        return groups
+
+    def cycles(self) -> list["PlannedCycle"]:
+        """
+        Schedule the coupling cycles of every sequence, in depth first order.
+
+        Every cycle is run once for all the sequences that share it, and the cycles of any one
+        sequence come out in the order that sequence needs them.
+        """
+        cycles: list[PlannedCycle] = []
+        stack: list[tuple[Optional[int], _Node]] = [(None, self._root)]
+        while stack:
+            code, node = stack.pop()
+            if code is not None:
+                cycles.append(PlannedCycle(_AMIDITES[code].value, tuple(node.through)))
+            stack.extend((c, node.children[c]) for c in sorted(node.children, reverse=True))
+        return cycles
+
+
+@dataclass(frozen=True)
+class PlannedCycle:
+    """One coupling cycle, run at once on every listed column."""
+
+    amidite: str
+    columns: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class ColumnGroup:
+    """Sequences synthesized together, one per column."""
+
+    indices: tuple[int, ...]
+    seqs: tuple[Seq, ...]
+    cycles: tuple[PlannedCycle, ...]
+
+    @property
+    def shared_cycles(self) -> int:
+        """Number of cycles run in lockstep on every column, from the start."""
+        shared = 0
+        for cycle in self.cycles:
+            if len(cycle.columns) < len(self.seqs):
+                break
+            shared += 1
+        return shared
+
+    @property
+    def solo_cycles(self) -> int:
+        """Number of cycles needed to make the sequences one after the other."""
+        return sum(map(len, self.seqs))
+
+    @property
+    def cycle_savings(self) -> int:
+        """Number of cycles saved by sharing them between the columns."""
+        return self.solo_cycles - len(self.cycles)
+
+
+@dataclass(frozen=True)
+class BatchPlan:
+    """Every sequence of a batch, grouped onto the columns."""
+
+    columns: int
+    groups: tuple[ColumnGroup, ...]
+
+    @property
+    def solo_cycles(self) -> int:
+        """Number of cycles needed to make every sequence on its own."""
+        return sum(group.solo_cycles for group in self.groups)
+
+    @property
+    def planned_cycles(self) -> int:
+        """Number of cycles needed to make every sequence with this plan."""
+        return sum(len(group.cycles) for group in self.groups)
+
+    @property
+    def cycle_savings(self) -> int:
+        """Number of cycles saved by this plan."""
+        return self.solo_cycles - self.planned_cycles
+
+
+def plan_batch(seqs: Sequence[Union[Seq, str]], columns: int) -> BatchPlan:
+    """
+    Group a batch of sequences onto parallel columns, so that sequences that start the same
+    way are made together.
+
+    args:
+        seqs: Sequences to synthesize, in order of priority when it does not matter.
+        columns: Number of columns that can be run in parallel.
+
+    returns:
+        The plan, whose groups refer back to the sequences by their index in seqs.
+
+    raises:
+        ValueError: If there is not at least one column, or a sequence is invalid.
+    """
+    if columns < 1:
+        raise ValueError("There must be at least one column")
+    trie = PrefixTrie(seq if isinstance(seq, Seq) else Seq(seq) for seq in seqs)
+
+    groups: list[ColumnGroup] = []
+    for indices in trie.groups(columns):
+        group_seqs = tuple(map(trie.__getitem__, indices))
+        cycles = tuple(PrefixTrie(group_seqs).cycles())
+        groups.append(ColumnGroup(tuple(indices), group_seqs, cycles))
+    return BatchPlan(columns, tuple(groups))
@@ -0,0 +1,68 @@
+"""
+Timing tables that the synthesis protocols read when they are compiled.
+
+Coupling times depend on the chemistry: RNA amidites, with their protected 2' hydroxyl, and
+bulky modifications couple much slower than DNA amidites. Every base is coupled for the time
+of its amidite if it has one, or else for the time of the category of its sequence.
+"""
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Mapping, Union
+
+from openoligo.seq import Phosphoramidite, SeqCategory
+
+_RNA_AMIDITES = frozenset({Phosphoramidite.U})
+_MODIFIED_AMIDITES = frozenset({Phosphoramidite.M5C, Phosphoramidite.GALNAC})
+
+
+def seq_category(amidites: Iterable[Phosphoramidite]) -> SeqCategory:
+    """
+    Category of a sequence from its amidites, RNA if it has any RNA amidite, else MODIFIED
+    if it has any modified amidite, else DNA.
+    """
+    present = set(amidites)
+    if present & _RNA_AMIDITES:
+        return SeqCategory.RNA
+    if present & _MODIFIED_AMIDITES:
+        return SeqCategory.MODIFIED
+    return SeqCategory.DNA
+
+
+@dataclass(frozen=True, eq=False)
+class TimingTable:
+    """
+    Durations of the steps of a synthesis cycle, in seconds.
+
+    Tables compare by identity, so that compiled plans are cached per table.
+    """
+
+    # Incubation time of each step, by its name
+    steps: Mapping[str, float] = field(
+        default_factory=lambda: MappingProxyType(
+            {"detritylate": 50, "cap": 30, "oxidize": 45, "cleave": 180, "deprotect": 45}
+        )
+    )
+    # Coupling time of the bases of each category of sequence, and of the amidites that
+    # differ from the time of their category
+    coupling: Mapping[Union[SeqCategory, Phosphoramidite], float] = field(
+        default_factory=lambda: MappingProxyType(
+            {
+                SeqCategory.DNA: 50,
+                SeqCategory.RNA: 360,
+                SeqCategory.MODIFIED: 50,
+                Phosphoramidite.GALNAC: 300,
+            }
+        )
+    )
+    prime: float = 5  # Time to fill a reagent line, only when it is not primed already
+    fill: float = 10  # Time each reagent flows through the columns before they are sealed
+
+    def coupling_time(self, amidite: Phosphoramidite, category: SeqCategory) -> float:
+        """Seconds to couple an amidite, in a sequence of the given category."""
+        time = self.coupling.get(amidite)
+        if time is not None:
+            return time
+        return self.coupling.get(category, self.coupling[SeqCategory.DNA])
+
+
+DEFAULT_TIMINGS = TimingTable()
@@ -5,22 +5,35 @@ This script runs the infinite loop that checks for new tasks and executes them.
 """
 import asyncio
 import os
+import time
+from typing import Optional
 
 from openoligo.api.db import db_init, get_db_url
-from openoligo.api.helpers import get_next_task  # set_failed_now,
 from openoligo.api.helpers import (
+    get_next_task,
+    get_tasks_in_progress,
     set_completed_now,
+    set_failed_now,
     set_log_file,
     set_started_now,
     set_task_in_progress,
     update_task_status,
 )
-from openoligo.api.models import TaskStatus
+from openoligo.api.models import SynthesisQueue, TaskStatus
 from openoligo.hal.instrument import Instrument
 from openoligo.hal.platform import __platform__
+from openoligo.protocols.checkpoint import (
+    Checkpoint,
+    CheckpointJournal,
+    journal_path,
+    restore_valves,
+)
+from openoligo.protocols.compiler import compile_protocol
+from openoligo.protocols.executor import PlanExecutor, queued_logging
 from openoligo.protocols.oligosynthesis import synthesize_ssdna
 from openoligo.seq import Seq
-from openoligo.utils.logger import OligoLogger
+from openoligo.utils.logger import OligoLogger, trace_path
+from openoligo.utils.trace import tracer
 
 ol = OligoLogger(name="runner", rotates=True)
 logger = ol.get_logger()
@@ -29,17 +42,87 @@ logger = ol.get_logger()
 rl = OligoLogger(rotates=False)
 root_logger = rl.get_logger()
 
+# Seconds between two read backs of the pins, to catch valves not as they were set, 0 disables
+READBACK_INTERVAL = float(os.getenv("OO_READBACK_INTERVAL", "60"))
+
+
+def report_mismatches(names: list[str]) -> None:
+    """Report the valves and switches whose pins are not as they were last set."""
+    logger.error("Pins of %s are not as they were last set", names)
+
+
+async def run_task(
+    inst: Instrument,
+    task: SynthesisQueue,
+    journal: CheckpointJournal,
+    executor: PlanExecutor,
+    checkpoint: Optional[Checkpoint] = None,
+) -> None:
+    """
+    Run a synthesis task on the timing thread of the executor, checkpointing it at the end of
+    every cycle, and logging through a queue so that log handlers never delay the valves.
+    A task that raises is marked as failed, so that the queue moves on to the next one.
+
+    The run is traced, and the trace exported next to the log of the task, to open in
+    https://ui.perfetto.dev.
+
+    args:
+        checkpoint: Last checkpoint of the task, to resume it after the cycles it completed.
+    """
+
+    def on_cycle(cycle: int, step: Optional[str], valves: list[str]) -> None:
+        journal.append(Checkpoint(task.id, cycle, step, tuple(valves), time.time()))
+
+    start_cycle = 0
+    if checkpoint is not None:
+        restore_valves(inst, checkpoint)
+        start_cycle = checkpoint.cycle
+        logger.info("Resuming task %d after cycle %d", task.id, start_cycle)
+
+    tracer.start()
+    try:
+        plan = compile_protocol(synthesize_ssdna, inst, Seq(task.sequence))
+        inst.pressure_on()
+        with queued_logging(root_logger):
+            await executor.run_plan(inst, plan, start_cycle, on_cycle)
+        inst.pressure_off()
+        journal.forget(task.id)
+
+        await set_completed_now(task.id)
+        await update_task_status(task.id, TaskStatus.COMPLETE)
+        logger.info("Task %d complete", task.id)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Task %d failed", task.id)
+        inst.pressure_off()
+        journal.forget(task.id)
+        await set_failed_now(task.id)
+    finally:
+        tracer.stop()
+        tracer.export(trace_path(f"task_{task.id}"))
+
 
 async def worker():
     """
     This is the actual worker.
 
     Essentially, it will loop forever, checking for new tasks in the database and executing them.
+    Tasks left in progress by a previous run are resumed first, from their last checkpoint.
     """
     logger.info("OpenOligo Runner: Worker process started")
     await db_init(get_db_url(__platform__))
     inst = Instrument()
+    inst.setup()
     inst.register_error_handler(logger.error)
+    journal = CheckpointJournal(journal_path())
+    executor = PlanExecutor()
+    background = []  # The loop only keeps weak references to its tasks
+    if READBACK_INTERVAL > 0:
+        verify = inst.verify_periodically(READBACK_INTERVAL, report_mismatches)
+        background.append(asyncio.ensure_future(verify))
+
+    for task in await get_tasks_in_progress():
+        rl.change_log_file(f"task_{task.id}")
+        await run_task(inst, task, journal, executor, journal.last(task.id))
 
     while True:
         task = await get_next_task()
@@ -61,13 +144,7 @@ async def worker():
         logger.info("Starting task %d", task.id)
 
         # Execute the task
-        inst.pressure_on()
-        await synthesize_ssdna(inst, Seq(task.sequence))
-        inst.pressure_off()
-
-        await set_completed_now(task.id)
-        await update_task_status(task.id, TaskStatus.COMPLETE)
-        logger.info("Task %d complete", task.id)
+        await run_task(inst, task, journal, executor)
 
 
 def main():
@@ -1,30 +1,47 @@
 """
 Script to start the REST API server for OpenOligo.
 """
+import json
 import uuid
+from tempfile import SpooledTemporaryFile
 from typing import Optional
 
 import requests
 import uvicorn
-from fastapi import Body, FastAPI, HTTPException, Query, status
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from tortoise.exceptions import ValidationError
 
+from openoligo.api.alphabet import alphabet_registry
 from openoligo.api.db import db_init, get_db_url
+from openoligo.api.helpers import add_or_merge_task, find_identical_tasks
+from openoligo.api.ingest import OrderFormat, ingest_order
 
 # from openoligo.api.models import Settings  # pylint: disable=unused-import
 from openoligo.api.models import (  # EssentialReagentsModel,; SequencePartReagentsModel,
+    ColumnGroupModel,
     Reactant,
     ReactantModel,
     ReactantType,
+    SeqPropertiesModel,
+    SeqValidationModel,
     Settings,
     SettingsModel,
     SynthesisQueue,
+    SynthesisPlanModel,
     SynthesisQueueModel,
+    TaskEstimateModel,
+    TaskEtaModel,
     TaskStatus,
     ValidSeq,
 )
+from openoligo.hal.instrument import Instrument
 from openoligo.hal.platform import __platform__
-from openoligo.seq import SeqCategory
+from openoligo.hal.types import NoSuchPinInPinout
+from openoligo.protocols.estimator import estimate, estimate_queue
+from openoligo.protocols.planner import plan_batch
+from openoligo.seq import Seq, SeqCategory, sequence_properties
 from openoligo.utils.logger import OligoLogger
 
 ol = OligoLogger(name="server", rotates=True)
@@ -33,6 +50,9 @@ logger = ol.get_logger()
 rl = OligoLogger(rotates=True)
 root_logger = rl.get_logger()
 
+# Why a queued task can not be estimated
+UNROUTABLE = "The instrument has no valve for an amidite of the sequence"
+
 DESCRIPTION = """
 OpenOligo API for the synthesis of oligonucleotides.
 
@@ -46,6 +66,7 @@ You can
 You will be able to:
 
 * **Add a Sequence** to the Synthesis Queue.
+* **Upload an order** of many sequences as FASTA or CSV.
 * **Update the sequence and order of synthesis**.
 * **Check the status** of a Sequence in the Queue.
 * **Remove a Sequence** from the Queue.
@@ -136,6 +157,15 @@ async def shutdown_event():
     logger.info("Shutting down the API server...")
 
 
+def get_instrument() -> Instrument:
+    """
+    The instrument that runs the queued tasks, whose protocols are validated and estimated.
+
+    It is never set up here, only the runner drives its pins.
+    """
+    return Instrument()
+
+
 @app.get("/health", status_code=200, tags=["Utilities"])
 def get_health_status():
     """Health check."""
@@ -149,16 +179,87 @@ def get_health_status():
     tags=["Synthesis Queue"],
 )
 async def add_a_task_to_synthesis_queue(
-    sequence: str, category: SeqCategory = SeqCategory.DNA, rank: int = 0
+    sequence: str,
+    category: SeqCategory = SeqCategory.DNA,
+    rank: int = 0,
+    instrument: Instrument = Depends(get_instrument),
 ):
-    """Add a synthesis task to the synthesis task queue by providing a sequence and its category."""
+    """
+    Add a synthesis task to the synthesis task queue by providing a sequence and its category.
+
+    If an identical task is still queued, the request is merged into it instead, and its
+    multiplicity is increased. A sequence with an amidite the instrument has no valve for is
+    rejected.
+    """
     try:
-        return await SynthesisQueue.create(sequence=sequence, category=category, rank=rank)
+        ValidSeq(category, await alphabet_registry.get(instrument.pinout))(sequence)
+        task, merged = await add_or_merge_task(sequence, category, rank)
     except ValidationError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     finally:
         logger.info("Added sequence '%s' to the synthesis queue.", sequence)
 
+    if merged:
+        logger.info("Merged sequence '%s' into identical task %d.", sequence, task.id)
+    return task
+
+
+@app.post("/queue/upload", status_code=status.HTTP_200_OK, tags=["Synthesis Queue"])
+async def upload_an_order_to_synthesis_queue(
+    request: Request,
+    order_format: OrderFormat = Query(OrderFormat.FASTA, alias="format"),
+    category: SeqCategory = SeqCategory.DNA,
+    rank: int = 0,
+    instrument: Instrument = Depends(get_instrument),
+):
+    """
+    Add every sequence of a FASTA or CSV order, sent as the request body, to the queue.
+
+    The order is processed as it is received. The response has one JSON line per record, with
+    the id of the new synthesis task or the reason the record was rejected.
+    """
+    results = SpooledTemporaryFile(max_size=1024 * 1024)  # pylint: disable=consider-using-with
+    count = 0
+    try:
+        async for result in ingest_order(
+            request.stream(),
+            order_format,
+            category=category,
+            rank=rank,
+            pinout=instrument.pinout,
+        ):
+            results.write(json.dumps(result).encode("utf-8") + b"\n")
+            count += 1
+    except ValueError as exc:
+        results.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    logger.info("Processed an order of %d sequences.", count)
+
+    results.seek(0)
+    return StreamingResponse(
+        results, media_type="application/x-ndjson", background=BackgroundTask(results.close)
+    )
+
+
+@app.post(
+    "/queue/validate",
+    response_model=list[SeqValidationModel],  # type: ignore
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def validate_sequences(
+    sequences: list[str] = Body(..., min_items=1),
+    category: SeqCategory = SeqCategory.DNA,
+    instrument: Instrument = Depends(get_instrument),
+):
+    """Validate a batch of sequences without adding them to the queue."""
+    alphabet = await alphabet_registry.get(instrument.pinout)
+    errors = ValidSeq(category, alphabet).validate_many(sequences)
+    return [
+        SeqValidationModel(sequence=sequence, valid=error is None, error=error)
+        for sequence, error in zip(sequences, errors)
+    ]
+
 
 @app.get(
     "/queue",
@@ -180,6 +281,131 @@ async def clear_all_queued_tasks_in_task_queue():
     return await SynthesisQueue.filter(status=TaskStatus.QUEUED).delete()
 
 
+@app.get(
+    "/queue/identical",
+    response_model=list[SynthesisQueueModel],  # type: ignore
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def get_identical_tasks(sequence: str, category: SeqCategory = SeqCategory.DNA):
+    """Get every task, queued or past, that synthesizes the same sequence, oldest first."""
+    return await find_identical_tasks(sequence, category)
+
+
+@app.get(
+    "/queue/properties",
+    response_model=list[SeqPropertiesModel],  # type: ignore
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def get_properties_of_tasks_in_synthesis_queue(filter_by: Optional[TaskStatus] = None):
+    """Get the synthesis task queue along with the properties of each sequence."""
+    tasks = SynthesisQueue.all().order_by("-rank", "-created_at")
+    if filter_by:
+        tasks = tasks.filter(status=filter_by)
+
+    projection = []
+    for task in await tasks:
+        properties = sequence_properties(task.sequence)
+        projection.append(
+            SeqPropertiesModel(
+                id=task.id,
+                sequence=task.sequence,
+                category=task.category,
+                status=task.status,
+                rank=task.rank,
+                cycle_count=properties.cycle_count,
+                amidite_counts={
+                    amidite.value: count for amidite, count in properties.amidite_counts.items()
+                },
+                gc_content=properties.gc_content,
+                melting_temperature=properties.melting_temperature,
+                molecular_weight=properties.molecular_weight,
+            )
+        )
+    return projection
+
+
+@app.get(
+    "/queue/plan",
+    response_model=SynthesisPlanModel,
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def plan_queued_tasks_onto_columns(columns: int = Query(default=1, ge=1)):
+    """
+    Group the queued tasks onto parallel columns, so that tasks whose sequences start the same
+    way share their first coupling cycles.
+    """
+    tasks = await SynthesisQueue.filter(status=TaskStatus.QUEUED).order_by("-rank", "created_at")
+    plan = plan_batch([task.sequence for task in tasks], columns)
+    return SynthesisPlanModel(
+        columns=plan.columns,
+        solo_cycles=plan.solo_cycles,
+        planned_cycles=plan.planned_cycles,
+        cycle_savings=plan.cycle_savings,
+        groups=[
+            ColumnGroupModel(
+                task_ids=[tasks[i].id for i in group.indices],
+                sequences=[seq.seq for seq in group.seqs],
+                shared_cycles=group.shared_cycles,
+                cycles=len(group.cycles),
+                cycle_savings=group.cycle_savings,
+            )
+            for group in plan.groups
+        ],
+    )
+
+
+@app.get(
+    "/queue/eta",
+    response_model=list[TaskEtaModel],  # type: ignore
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def get_eta_of_queued_tasks(instrument: Instrument = Depends(get_instrument)):
+    """
+    Estimate when each queued task starts and finishes, in the order the runner takes them,
+    assuming the next one starts now.
+
+    A task with an amidite the instrument has no valve for has no times, but an error instead.
+    """
+    tasks = await SynthesisQueue.filter(status=TaskStatus.QUEUED).order_by("-rank", "created_at")
+    times = estimate_queue((Seq(task.sequence) for task in tasks), instrument)
+    return [
+        TaskEtaModel(id=task.id, sequence=task.sequence, start=when[0], finish=when[1])
+        if when is not None
+        else TaskEtaModel(id=task.id, sequence=task.sequence, error=UNROUTABLE)
+        for task, when in zip(tasks, times)
+    ]
+
+
+@app.get(
+    "/queue/{task_id}/estimate",
+    response_model=TaskEstimateModel,
+    status_code=status.HTTP_200_OK,
+    tags=["Synthesis Queue"],
+)
+async def estimate_a_task(task_id: int, instrument: Instrument = Depends(get_instrument)):
+    """Estimate the run time, valve actuations and reagent use of a synthesis task."""
+    task = await SynthesisQueue.get_or_none(id=task_id)
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sythesis task not found")
+    try:
+        result = estimate(Seq(task.sequence), instrument)
+    except NoSuchPinInPinout as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=UNROUTABLE) from exc
+    return TaskEstimateModel(
+        id=task.id,
+        sequence=task.sequence,
+        duration=result.duration,
+        steps=dict(result.steps),
+        actuations=dict(result.actuations),
+        open_time=dict(result.open_time),
+        reagent_time=dict(result.reagent_time),
+    )
+
+
 @app.get("/queue/{task_id}", response_model=SynthesisQueueModel, tags=["Synthesis Queue"])
 async def get_task_by_id(task_id: int):
     """Get a synthesis task from the queue."""
@@ -196,7 +422,10 @@ async def get_task_by_id(task_id: int):
     tags=["Synthesis Queue"],
 )
 async def update_a_synthesis_task(
-    task_id: int, sequence: Optional[str] = Body(None), rank: Optional[int] = Body(None)
+    task_id: int,
+    sequence: Optional[str] = Body(None),
+    rank: Optional[int] = Body(None),
+    instrument: Instrument = Depends(get_instrument),
 ):
     """Update a particular task in the queue."""
     task = await SynthesisQueue.get_or_none(id=task_id)
@@ -218,7 +447,8 @@ async def update_a_synthesis_task(
 
     if sequence is not None:
         try:
-            seq_validator = ValidSeq()
+            alphabet = await alphabet_registry.get(instrument.pinout)
+            seq_validator = ValidSeq(task.category, alphabet)
             seq_validator(sequence)
             task.sequence = sequence  # type: ignore
         except ValidationError as exc:
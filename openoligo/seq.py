@@ -1,18 +1,55 @@
 """
 Sequence class for DNA, RNA and modified Nucleic Acid sequences.
 """
-import re
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import (
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+
+_TOKEN_END = None  # Trie key that marks the end of a token, never a character
+
+
+class SeqCategory(str, Enum):
+    """
+    Enum for the different sequence categories.
+    """
+
+    DNA = "DNA"
+    RNA = "RNA"
+    MODIFIED = "MODIFIED"
+
+
+# Bases allowed in each single letter category, used as bytes.translate deletion tables
+_CATEGORY_BASES: dict[SeqCategory, bytes] = {
+    SeqCategory.DNA: b"ATCGatcg",
+    SeqCategory.RNA: b"AUCGaucg",
+}
+
+_ROW_SEPARATOR = "\n"
+
+
+def _has_only(sequence: str, bases: bytes) -> bool:
+    """Check that a sequence is made up of the given single byte bases only."""
+    return sequence.isascii() and not sequence.encode("ascii").translate(None, bases)
 
 
 def is_valid_dna(sequence):
     """
     Check if a sequence is a valid DNA sequence.
     """
-    pattern = r"^[ATCGatcg]*$"
-    if re.match(pattern, sequence):
-        return True
-    return False
+    return _has_only(sequence, _CATEGORY_BASES[SeqCategory.DNA])
 
 
 class Phosphoramidite(Enum):
@@ -38,13 +75,118 @@ phosphoramidite_dict = {
 }
 
 
-# def parse_sequence(sequence: str) -> list[Phosphoramidite]:
-#    """
-#    Given a sequence in str, return a list of Phosphoramidite in the correct order.
-#
-#    Example:
-#        AAT5mC5mCAT5mC-GalNAc -> [A, A, T, M5C, M5C, A, T, M5C, GALNAC]
-#    """
+class Tokenizer(Generic[T]):
+    """
+    Longest-match tokenizer over a fixed alphabet.
+
+    The alphabet is compiled into a trie once, so tokenizing a sequence is a single left to
+    right scan with no string concatenation, no matter how many multi-character tokens the
+    alphabet contains.
+    """
+
+    def __init__(self, alphabet: Mapping[str, T]) -> None:
+        """
+        Compile the alphabet into a trie.
+
+        args:
+            alphabet: Mapping from the textual form of a token to the value it parses to.
+
+        raises:
+            ValueError: If the alphabet contains an empty token.
+        """
+        self._root: dict = {}
+        for token, value in alphabet.items():
+            if not token:
+                raise ValueError("Tokens in an alphabet can not be empty")
+            node = self._root
+            for char in token:
+                node = node.setdefault(char, {})
+            node[_TOKEN_END] = value
+
+    def tokenize(self, sequence: str) -> list[T]:
+        """
+        Split a sequence into tokens, always preferring the longest matching token.
+
+        raises:
+            ValueError: If some part of the sequence is not a token of the alphabet.
+        """
+        tokens: list[T] = []
+        append = tokens.append
+        root = self._root
+        pos, end = 0, len(sequence)
+        while pos < end:
+            node = root
+            match, match_end = None, pos
+            i = pos
+            while i < end:
+                node = node.get(sequence[i])
+                if node is None:
+                    break
+                i += 1
+                if _TOKEN_END in node:
+                    match, match_end = node[_TOKEN_END], i
+            if match_end == pos:
+                raise ValueError(f"Invalid sequence: '{sequence[pos:]}' at position {pos}")
+            append(match)  # type: ignore
+            pos = match_end
+        return tokens
+
+    def tokenize_many(self, sequences: Iterable[str]) -> list[list[T]]:
+        """Tokenize a batch of sequences."""
+        tokenize = self.tokenize
+        return [tokenize(sequence) for sequence in sequences]
+
+
+def phosphoramidite_alphabet() -> dict[str, Phosphoramidite]:
+    """
+    The textual forms of every Phosphoramidite.
+
+    This includes the values (eg. 5mC), the enum names (eg. M5C), lower case single bases,
+    and the names used in phosphoramidite_dict (eg. GalNAc).
+    """
+    alphabet: dict[str, Phosphoramidite] = {}
+    for amidite in Phosphoramidite:
+        alphabet[amidite.value] = amidite
+        alphabet[amidite.name] = amidite
+        if len(amidite.value) == 1:
+            alphabet[amidite.value.lower()] = amidite
+    alphabet["GalNAc"] = Phosphoramidite.GALNAC
+    return alphabet
+
+
+class Alphabet:  # pylint: disable=too-few-public-methods
+    """
+    The amidites that sequences may use, compiled into the lookup tables that the tokenizer
+    and the validator need, so none of them is rebuilt per sequence.
+    """
+
+    __slots__ = ("accronyms", "amidites", "tokenizer", "bases")
+
+    def __init__(self, accronyms: Mapping[Phosphoramidite, str]) -> None:
+        """
+        args:
+            accronyms: Accronym of each available amidite, as it is named in the inventory.
+        """
+        self.accronyms: Mapping[Phosphoramidite, str] = MappingProxyType(dict(accronyms))
+        self.amidites = frozenset(self.accronyms)
+        self.tokenizer: Tokenizer[Phosphoramidite] = Tokenizer(
+            {token: amidite for token, amidite in _TOKENS.items() if amidite in self.amidites}
+        )
+        values = {amidite.value for amidite in self.amidites}
+        self.bases: dict[SeqCategory, bytes] = {
+            category: bytes(base for base in bases if chr(base).upper() in values)
+            for category, bases in _CATEGORY_BASES.items()
+        }
+
+    def __repr__(self) -> str:
+        return f"Alphabet({', '.join(amidite.value for amidite in self.accronyms)})"
+
+
+_TOKENS = phosphoramidite_alphabet()
+
+builtin_alphabet = Alphabet({amidite: amidite.value for amidite in Phosphoramidite})
+
+default_tokenizer: Tokenizer[Phosphoramidite] = builtin_alphabet.tokenizer
 
 
 def parse_sequence(sequence: str) -> list[Phosphoramidite]:
@@ -54,50 +196,265 @@ def parse_sequence(sequence: str) -> list[Phosphoramidite]:
     Example:
         AAT5mC5mCAT5mC-GalNAc -> [A, A, T, M5C, M5C, A, T, M5C, GALNAC]
     """
-    parsed_sequence = []
-    buffer = ""
-    for char in sequence:
-        buffer += char
-        if buffer in Phosphoramidite.__members__:
-            parsed_sequence.append(Phosphoramidite[buffer])
-            buffer = ""
-    if buffer:
-        raise ValueError(f"Invalid sequence: {buffer}")
-    return parsed_sequence
+    return default_tokenizer.tokenize(sequence)
+
+
+def parse_many(sequences: Iterable[str]) -> list[list[Phosphoramidite]]:
+    """
+    Parse a batch of sequences, see parse_sequence.
+    """
+    return default_tokenizer.tokenize_many(sequences)
+
+
+# Mass of each amidite once coupled into the strand as a monophosphate residue, in g/mol
+residue_weights: dict[Phosphoramidite, float] = {
+    Phosphoramidite.A: 313.21,
+    Phosphoramidite.T: 304.2,
+    Phosphoramidite.G: 329.21,
+    Phosphoramidite.C: 289.18,
+    Phosphoramidite.U: 306.17,
+    Phosphoramidite.M5C: 303.21,
+}
+
+# Removed from the sum of the residues for the missing 5' phosphate, in g/mol
+FIVE_PRIME_HYDROXYL_CORRECTION = 61.96
+
+# Sequences shorter than this use the Wallace rule for their melting temperature
+WALLACE_RULE_MAX_LENGTH = 14
+
+_GC_AMIDITES = (Phosphoramidite.G, Phosphoramidite.C, Phosphoramidite.M5C)
+_AT_AMIDITES = (Phosphoramidite.A, Phosphoramidite.T, Phosphoramidite.U)
+
+
+class SeqProperties(NamedTuple):
+    """
+    Physical properties of a sequence.
+
+    attributes:
+        cycle_count: Number of coupling cycles needed to synthesize the sequence.
+        amidite_counts: Number of times each Phosphoramidite is used.
+        gc_content: Fraction of the nucleotides that are G or C (including 5mC).
+        melting_temperature: Estimated melting temperature in degree Celsius.
+        molecular_weight: Molecular weight in g/mol, None if an amidite has no known weight.
+    """
+
+    cycle_count: int
+    amidite_counts: Mapping[Phosphoramidite, int]
+    gc_content: float
+    melting_temperature: float
+    molecular_weight: Optional[float]
+
+
+def _properties(counts: dict[Phosphoramidite, int]) -> SeqProperties:
+    """Compute the properties of a sequence from the number of each amidite in it."""
+    length = sum(counts.values())
+    gc_count = sum(counts[amidite] for amidite in _GC_AMIDITES)
+    at_count = sum(counts[amidite] for amidite in _AT_AMIDITES)
+    nucleotides = gc_count + at_count
+
+    if nucleotides < WALLACE_RULE_MAX_LENGTH:
+        melting_temperature = 2.0 * at_count + 4.0 * gc_count
+    else:
+        melting_temperature = 64.9 + 41.0 * (gc_count - 16.4) / nucleotides
+
+    molecular_weight: Optional[float] = 0.0
+    if any(counts[amidite] for amidite in counts if amidite not in residue_weights):
+        molecular_weight = None
+    elif length:
+        molecular_weight = round(
+            sum(residue_weights[amidite] * count for amidite, count in counts.items() if count)
+            - FIVE_PRIME_HYDROXYL_CORRECTION,
+            2,
+        )
+
+    return SeqProperties(
+        cycle_count=length,
+        amidite_counts=MappingProxyType(counts),
+        gc_content=gc_count / nucleotides if nucleotides else 0.0,
+        melting_temperature=melting_temperature,
+        molecular_weight=molecular_weight,
+    )
+
+
+# Amidites are packed by their position in Phosphoramidite, A, T, G and C fit in 2 bits
+_AMIDITES: tuple[Phosphoramidite, ...] = tuple(Phosphoramidite)
+_AMIDITE_CODES: dict[Phosphoramidite, int] = {amidite: i for i, amidite in enumerate(_AMIDITES)}
+_CODE_VALUES: tuple[str, ...] = tuple(amidite.value for amidite in _AMIDITES)
+
+_DNA_WIDTH = 2
+_MODIFIED_WIDTH = 4
+
+# Translation tables between DNA bases and their 2 bit codes
+_DNA_TO_CODES = bytes.maketrans(b"ATGCatgc", bytes([0, 1, 2, 3, 0, 1, 2, 3]))
+_CODES_TO_DNA = bytes.maketrans(bytes([0, 1, 2, 3]), b"ATGC")
+
+# For every byte value, the codes packed in it in order, per code width
+_UNPACK: dict[int, tuple[bytes, ...]] = {
+    width: tuple(
+        bytes((byte >> shift) & ((1 << width) - 1) for shift in range(0, 8, width))
+        for byte in range(256)
+    )
+    for width in (_DNA_WIDTH, _MODIFIED_WIDTH)
+}
+
+
+# Code of the complement of each amidite, for DNA and for RNA (where A pairs with U)
+_DNA_COMPLEMENTS = (1, 0, 3, 2, 0, 2)
+_RNA_COMPLEMENTS = (4, 0, 3, 2, 0, 2)
+_U_CODE = _AMIDITE_CODES[Phosphoramidite.U]
+_T_CODE = _AMIDITE_CODES[Phosphoramidite.T]
+
+
+def _reverse_complement_table(width: int, complements: tuple[int, ...]) -> bytes:
+    """
+    A bytes.translate table that complements every code packed in a byte and reverses
+    their order inside the byte. Codes without a complement are mapped to 0.
+    """
+    mask = (1 << width) - 1
+    shifts = range(0, 8, width)
+    table = bytearray(256)
+    for byte in range(256):
+        codes = [(byte >> shift) & mask for shift in shifts]
+        for shift, code in zip(shifts, reversed(codes)):
+            table[byte] |= (complements[code] if code < len(complements) else 0) << shift
+    return bytes(table)
+
+
+_REVERSE_COMPLEMENT_TABLES: dict[tuple[int, bool], bytes] = {
+    (_DNA_WIDTH, False): _reverse_complement_table(_DNA_WIDTH, _DNA_COMPLEMENTS),
+    (_MODIFIED_WIDTH, False): _reverse_complement_table(_MODIFIED_WIDTH, _DNA_COMPLEMENTS),
+    (_MODIFIED_WIDTH, True): _reverse_complement_table(_MODIFIED_WIDTH, _RNA_COMPLEMENTS),
+}
+
+
+def _shift_out(packed: bytes, width: int, start: int, length: int) -> bytes:
+    """Drop the codes before start and after start + length from a packed buffer."""
+    value = int.from_bytes(packed, "little") >> (start * width)
+    value &= (1 << (length * width)) - 1
+    return value.to_bytes(-(-length * width // 8), "little")
+
+
+def _pack(codes: bytes, width: int) -> bytes:
+    """Pack one code per byte into width bits per code, first code in the lowest bits."""
+    if width == _DNA_WIDTH:
+        padded = codes + bytes(-len(codes) % 4)
+        return bytes(
+            a | b << 2 | c << 4 | d << 6
+            for a, b, c, d in zip(padded[0::4], padded[1::4], padded[2::4], padded[3::4])
+        )
+    padded = codes + bytes(-len(codes) % 2)
+    return bytes(a | b << 4 for a, b in zip(padded[0::2], padded[1::2]))
 
 
 class Seq:
     """
-    Representation of the sequence as a string.
+    Immutable, hashable representation of a nucleic acid sequence.
+
+    The amidites are packed 2 bits each when the sequence is made of A, T, G and C only,
+    and 4 bits each otherwise. Slices share the packed buffer of the sequence they are
+    taken from through a memoryview instead of copying it.
+
+    A sequence that owns its buffer (a bytes object) always starts at the first code and
+    has zeroed padding, so two of them can be compared byte for byte.
     """
 
+    __slots__ = (
+        "_packed",
+        "_width",
+        "_start",
+        "_length",
+        "_hash",
+        "_reverse_complement",
+        "_properties",
+    )
+
+    _packed: Union[bytes, memoryview]
+    _width: int
+    _start: int
+    _length: int
+    _hash: Optional[int]
+    _reverse_complement: Optional["Seq"]
+    _properties: Optional[SeqProperties]
+
     def __init__(self, seq: str) -> None:
         """
         Initialize the sequence.
-        """
-        self.seq = seq
-        if not is_valid_dna(self.seq):
-            raise ValueError("Invalid DNA sequence")
-        self.index = 0
 
-    def __iter__(self):
-        """
-        Allows iteration over the sequence.
+        raises:
+            ValueError: if the sequence contains anything that is not a Phosphoramidite.
         """
-        return self
+        if is_valid_dna(seq):
+            codes = seq.encode("ascii").translate(_DNA_TO_CODES)
+            width = _DNA_WIDTH
+        else:
+            codes = bytes(_AMIDITE_CODES[amidite] for amidite in parse_sequence(seq))
+            width = _DNA_WIDTH if max(codes) < 4 else _MODIFIED_WIDTH
+        self._init(_pack(codes, width), width, 0, len(codes))
 
-    def __next__(self) -> str:
-        """
-        Returns the next base in the sequence.
+    @classmethod
+    def _from_packed(
+        cls, packed: Union[bytes, memoryview], width: int, start: int, length: int
+    ) -> "Seq":
+        """Create a sequence from the length codes of a packed buffer from start on."""
+        seq = object.__new__(cls)
+        seq._init(packed, width, start, length)
+        return seq
 
-        raises:
-            StopIteration: if the end of the sequence is reached.
+    def _init(self, packed: Union[bytes, memoryview], width: int, start: int, length: int):
+        """Set the slots of a new sequence."""
+        object.__setattr__(self, "_packed", packed)
+        object.__setattr__(self, "_width", width)
+        object.__setattr__(self, "_start", start)
+        object.__setattr__(self, "_length", length)
+        object.__setattr__(self, "_hash", None)
+        object.__setattr__(self, "_reverse_complement", None)
+        object.__setattr__(self, "_properties", None)
+
+    @classmethod
+    def _from_codes(cls, codes: bytes) -> "Seq":
+        """Create a sequence from one amidite code per byte."""
+        width = _DNA_WIDTH if not codes or max(codes) < 4 else _MODIFIED_WIDTH
+        return cls._from_packed(_pack(codes, width), width, 0, len(codes))
+
+    def __setattr__(self, name, value):
+        """Sequences can not be modified."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name):
+        """Sequences can not be modified."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self):
+        """Pickle as the string form of the sequence."""
+        return (self.__class__, (self.seq,))
+
+    @property
+    def codes(self) -> bytes:
+        """The code of each amidite (its position in Phosphoramidite), one per byte."""
+        table = _UNPACK[self._width]
+        codes = b"".join(map(table.__getitem__, self._packed))
+        start, end = self._start, self._start + self._length
+        if start == 0 and len(codes) == end:
+            return codes
+        return codes[start:end]
+
+    @property
+    def seq(self) -> str:
+        """The sequence as a string."""
+        if self._width == _DNA_WIDTH:
+            return self.codes.translate(_CODES_TO_DNA).decode("ascii")
+        return "".join(map(_CODE_VALUES.__getitem__, self.codes))
+
+    @property
+    def amidites(self) -> list[Phosphoramidite]:
+        """The Phosphoramidites of the sequence in order."""
+        return list(map(_AMIDITES.__getitem__, self.codes))
+
+    def __iter__(self) -> Iterator[str]:
         """
-        if self.index < len(self.seq):
-            result = self.seq[self.index]
-            self.index += 1
-            return result
-        raise StopIteration
+        Allows iteration over the sequence, any number of times.
+        """
+        return map(_CODE_VALUES.__getitem__, self.codes)
 
     def __repr__(self) -> str:
         """
@@ -109,25 +466,211 @@ class Seq:
         """
         get the length of the sequence.
         """
-        return len(self.seq)
+        return self._length
 
-    def __getitem__(self, key) -> str:
+    def __getitem__(self, key):
         """
         Allows indexing of the sequence.
+
+        An index returns the amidite at that position as a string, a slice returns a Seq.
+        Contiguous slices share the packed buffer of this sequence.
         """
-        return self.seq[key]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return Seq._from_codes(self.codes[key])
+            length = max(stop - start, 0)
+            per_byte = 8 // self._width
+            begin = self._start + start
+            first, last = begin // per_byte, -(-(begin + length) // per_byte)
+            return Seq._from_packed(
+                memoryview(self._packed)[first:last], self._width, begin % per_byte, length
+            )
+
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("Seq index out of range")
+        position = self._start + key
+        per_byte = 8 // self._width
+        code = self._packed[position // per_byte] >> (position % per_byte * self._width)
+        return _CODE_VALUES[code & ((1 << self._width) - 1)]
+
+    def __eq__(self, other) -> bool:
+        """Two sequences are equal if they have the same amidites in the same order."""
+        if not isinstance(other, Seq):
+            return NotImplemented
+        if self._length != other._length:
+            return False
+        if (
+            self._width == other._width
+            and isinstance(self._packed, bytes)
+            and isinstance(other._packed, bytes)
+        ):
+            return self._packed == other._packed
+        return self.codes == other.codes
+
+    def __hash__(self) -> int:
+        """Hash of the amidites of the sequence, computed once."""
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.codes))
+        return self._hash  # type: ignore
 
     def reverse_complement(self) -> "Seq":
-        """Return the reverse complement of the input sequence"""
-        complement = {"A": "T", "T": "A", "C": "G", "G": "C"}
-        return Seq("".join([complement[base] for base in self.seq[::-1]]))
+        """
+        Return the reverse complement of the sequence, computed once per sequence.
 
+        The packed buffer is reversed and complemented with a single bytes.translate call.
+        A sequence with U and no T is treated as RNA, so its A pairs with U.
 
-class SeqCategory(str, Enum):
+        raises:
+            ValueError: If the sequence has an amidite without a complement, eg. -GalNAc.
+        """
+        if self._reverse_complement is not None:
+            return self._reverse_complement
+
+        rna = False
+        if self._width == _MODIFIED_WIDTH:
+            codes = self.codes
+            if max(codes) >= len(_DNA_COMPLEMENTS):
+                raise ValueError(f"Can not complement {self}, it has a non-nucleotide amidite")
+            rna = _U_CODE in codes and _T_CODE not in codes
+
+        table = _REVERSE_COMPLEMENT_TABLES[(self._width, rna)]
+        packed = bytes(self._packed)[::-1].translate(table)
+        start = len(packed) * 8 // self._width - self._start - self._length
+
+        reverse = Seq._from_packed(
+            _shift_out(packed, self._width, start, self._length), self._width, 0, self._length
+        )
+        if self._width == _DNA_WIDTH:  # Only plain DNA is its own double complement
+            object.__setattr__(reverse, "_reverse_complement", self)
+        object.__setattr__(self, "_reverse_complement", reverse)
+        return reverse
+
+    @property
+    def properties(self) -> SeqProperties:
+        """Physical properties of the sequence, computed the first time they are needed."""
+        if self._properties is None:
+            codes = self.codes
+            counts = {amidite: codes.count(code) for code, amidite in enumerate(_AMIDITES)}
+            object.__setattr__(self, "_properties", _properties(counts))
+        return self._properties  # type: ignore
+
+    @property
+    def cycle_count(self) -> int:
+        """Number of coupling cycles needed to synthesize the sequence."""
+        return self.properties.cycle_count
+
+    @property
+    def amidite_counts(self) -> Mapping[Phosphoramidite, int]:
+        """Number of times each Phosphoramidite is used in the sequence."""
+        return self.properties.amidite_counts
+
+    @property
+    def gc_content(self) -> float:
+        """Fraction of the nucleotides that are G or C (including 5mC)."""
+        return self.properties.gc_content
+
+    @property
+    def melting_temperature(self) -> float:
+        """
+        Estimated melting temperature in degree Celsius.
+
+        Uses the Wallace rule below 14 nucleotides, and the GC content formula otherwise.
+        """
+        return self.properties.melting_temperature
+
+    @property
+    def molecular_weight(self) -> Optional[float]:
+        """Molecular weight in g/mol, None if the sequence has an amidite of unknown weight."""
+        return self.properties.molecular_weight
+
+
+@lru_cache(maxsize=4096)
+def sequence_properties(sequence: str) -> SeqProperties:
     """
-    Enum for the different sequence categories.
+    Properties of a sequence given as a string, cached across calls.
+
+    Used to list the properties of the synthesis queue without parsing every sequence in it
+    again on every request.
     """
+    return Seq(sequence).properties
 
-    DNA = "DNA"
-    RNA = "RNA"
-    MODIFIED = "MODIFIED"
+
+def _validate_one(
+    sequence: str,
+    category: SeqCategory,
+    min_length: int,
+    max_length: Optional[int],
+    alphabet: Alphabet,
+) -> Optional[str]:
+    """Validate one sequence, returns the reason it is invalid or None."""
+    bases = alphabet.bases.get(category)
+    if bases is not None:
+        if not _has_only(sequence, bases):
+            return f"Invalid {category.value} sequence"
+        length = len(sequence)
+    else:
+        try:
+            length = len(alphabet.tokenizer.tokenize(sequence))
+        except ValueError as exc:
+            return str(exc)
+
+    if length < min_length:
+        return f"Sequence must be at least {min_length} bases long"
+    if max_length is not None and length > max_length:
+        return f"Sequence must be at most {max_length} bases long"
+    return None
+
+
+def _all_valid(
+    sequences: Sequence[str], bases: bytes, min_length: int, max_length: Optional[int]
+) -> bool:
+    """Whether every sequence is within the bounds and only has the bases, in one pass."""
+    lengths = [len(sequence) for sequence in sequences]
+    if min(lengths) < min_length or (max_length is not None and max(lengths) > max_length):
+        return False
+    joined = _ROW_SEPARATOR.join(sequences)
+    if not joined.isascii() or joined.count(_ROW_SEPARATOR) != len(sequences) - 1:
+        return False  # A row with a separator in it must be checked on its own
+    return not joined.encode("ascii").translate(None, bases + _ROW_SEPARATOR.encode("ascii"))
+
+
+def validate_many(
+    sequences: Sequence[str],
+    category: Union[SeqCategory, Sequence[SeqCategory]] = SeqCategory.DNA,
+    *,
+    min_length: int = 0,
+    max_length: Optional[int] = None,
+    alphabet: Alphabet = builtin_alphabet,
+) -> list[Optional[str]]:
+    """
+    Validate the alphabet and length of a batch of sequences at once.
+
+    When every row is a single letter category, the whole batch is first checked with one
+    bytes.translate call over all the rows joined together, and only falls back to checking
+    row by row when something in the batch is wrong.
+
+    args:
+        sequences: Sequences to validate.
+        category: Category of all the sequences, or one category per sequence.
+        min_length: Minimum number of bases in a sequence.
+        max_length: Maximum number of bases in a sequence, unbounded if None.
+        alphabet: Amidites the sequences may use, every known amidite by default.
+
+    returns:
+        One entry per sequence, None if the sequence is valid, otherwise the reason why not.
+    """
+    categories = [category] * len(sequences) if isinstance(category, SeqCategory) else category
+    if len(categories) != len(sequences):
+        raise ValueError("There must be one category per sequence")
+
+    if sequences and len(set(categories)) == 1 and categories[0] in alphabet.bases:
+        if _all_valid(sequences, alphabet.bases[categories[0]], min_length, max_length):
+            return [None] * len(sequences)
+
+    return [
+        _validate_one(sequence, _category, min_length, max_length, alphabet)
+        for sequence, _category in zip(sequences, categories)
+    ]
@@ -3,10 +3,18 @@ Functions to create various flows from reagents to columns,
 and to clean columns.
 """
 import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional, Sequence
 
 from openoligo.hal.instrument import Instrument
 from openoligo.steps.types import FlowBranch, substep
-from openoligo.utils.wait import wait_async
+from openoligo.utils.wait import counting_waits, wait_async
+
+# An operation on a flow branch, called with the instrument, eg. partial(dry, branch=...)
+BranchOperation = Callable[[Instrument], Awaitable[None]]
+
+# Valves of the reaction branch, every route into it goes through the branch valve
+REACTION_BRANCH_VALVES = frozenset({"branch", "rxn_out", "waste_rxn", "prod"})
 
 
 @substep
@@ -21,30 +29,39 @@ async def send_to_prod(instrument: Instrument, src: str) -> None:
     logging.debug("Flowing %s to prod", src)
 
 
+def _outlets(columns: Sequence[str]) -> list[str]:
+    """Outlet valves of the given reaction columns, or of the first column if none."""
+    return list(columns) or ["rxn_out"]
+
+
 @substep
-async def send_to_waste_rxn(instrument: Instrument, src: str) -> None:
+async def send_to_waste_rxn(instrument: Instrument, src: str, columns: Sequence[str] = ()) -> None:
     """
-    Flow a reagent to the final product outlet.
+    Flow a reagent through the reaction columns to the reaction waste.
 
     args:
         src: Slot to flow reagents from.
+        columns: Outlet valves of the columns to flow through, the first column if empty.
     """
-    instrument.all_except([src, "branch", "rxn_out", "waste_rxn"])
+    instrument.all_except([src, "branch", *_outlets(columns), "waste_rxn"])
     logging.debug("Flowing %s to reaction waste", src)
 
 
 @substep
-async def solvent_wash(instrument: Instrument, branch: FlowBranch, duration: float = 10) -> None:
+async def solvent_wash(
+    instrument: Instrument, branch: FlowBranch, duration: float = 10, columns: Sequence[str] = ()
+) -> None:
     """
     Wash column with solvent.
 
     args:
         branch: FlowBranch to wash.
+        columns: Outlet valves of the columns to wash, the first column if empty.
     """
     logging.debug("Initiating washing flow branch %s with solvent", branch)
 
     if branch == FlowBranch.REACTION:
-        instrument.all_except(["sol", "rxn_out", "branch", "waste_rxn"])
+        instrument.all_except(["sol", *_outlets(columns), "branch", "waste_rxn"])
     elif branch == FlowBranch.REAGENTS:
         instrument.all_except(["sol", "waste"])
 
@@ -54,36 +71,183 @@ async def solvent_wash(instrument: Instrument, branch: FlowBranch, duration: flo
 
 
 @substep
-async def solvent_wash_all(instrument: Instrument) -> None:
+async def solvent_wash_all(instrument: Instrument, columns: Sequence[str] = ()) -> None:
     """
     Wash all flow branches with solvent.
+
+    args:
+        columns: Outlet valves of the columns to wash, the first column if empty.
     """
 
-    await solvent_wash(instrument, FlowBranch.REACTION)
+    await solvent_wash(instrument, FlowBranch.REACTION, columns=columns)
     await solvent_wash(instrument, FlowBranch.REAGENTS)
 
 
 @substep
-async def dry(instrument: Instrument, branch: FlowBranch) -> None:
+async def dry(instrument: Instrument, branch: FlowBranch, columns: Sequence[str] = ()) -> None:
     """
     Dry column.
 
     args:
         branch: FlowBranch to dry.
+        columns: Outlet valves of the columns to dry, the first column if empty.
     """
     logging.debug("Initiating drying of branch %s", branch)
     if branch == FlowBranch.REACTION:
-        instrument.all_except(["gas", "rxn_out", "branch", "waste_rxn"])
+        instrument.all_except(["gas", *_outlets(columns), "branch", "waste_rxn"])
     elif branch == FlowBranch.REAGENTS:
         instrument.all_except(["gas", "waste"])
     logging.debug("Drying of branch %s complete", branch)
 
 
 @substep
-async def dry_all(instrument: Instrument) -> None:
+async def dry_all(instrument: Instrument, columns: Sequence[str] = ()) -> None:
     """
     Dry all flow branches.
+
+    args:
+        columns: Outlet valves of the columns to dry, the first column if empty.
     """
 
-    await dry(instrument, FlowBranch.REACTION)
+    await dry(instrument, FlowBranch.REACTION, columns=columns)
     await dry(instrument, FlowBranch.REAGENTS)
+
+
+@substep
+async def clean_reaction_branch(instrument: Instrument, columns: Sequence[str] = ()) -> None:
+    """
+    Wash and dry the reaction branch.
+
+    args:
+        columns: Outlet valves of the columns to clean, the first column if empty.
+    """
+    await solvent_wash(instrument, FlowBranch.REACTION, columns=columns)
+    await dry(instrument, FlowBranch.REACTION, columns=columns)
+
+
+@substep
+async def prime(instrument: Instrument, src: str, duration: float = 0) -> None:
+    """
+    Fill the line of a reagent through the reagent branch, ready for its next delivery.
+
+    args:
+        src: Slot to prime.
+        duration: Seconds to flow the reagent for.
+    """
+    instrument.all_except([src, "waste"])
+    logging.debug("Priming %s", src)
+    if duration:
+        await wait_async(duration)
+
+
+class PrimedLines:
+    """
+    Tracks which reagent lines are primed while a protocol is planned.
+
+    A line stays primed as long as it is used every cycle, eg. the activator, or the amidite
+    of a run of identical bases. A line left unused for a whole cycle has to be primed again.
+    """
+
+    def __init__(self) -> None:
+        self._primed: set[str] = set()
+        self._used: set[str] = set()
+
+    def claim(self, src: str) -> bool:
+        """
+        Mark a line as used in the current cycle.
+
+        returns:
+            Whether the line has to be primed first.
+        """
+        self._used.add(src)
+        if src in self._primed:
+            return False
+        self._primed.add(src)
+        return True
+
+    def next_cycle(self) -> None:
+        """Start a new cycle, the lines unused during the last one are no longer primed."""
+        self._primed &= self._used
+        self._used = set()
+
+
+def clean_reagent_branch(
+    prime_next: Optional[str] = None,
+    prime_duration: float = 0,
+    lines: Optional[PrimedLines] = None,
+) -> list[BranchOperation]:
+    """
+    Operations that wash and dry the reagent branch, to run while the columns incubate.
+
+    args:
+        prime_next: Slot to prime for the next step once the branch is clean, if any.
+        prime_duration: Seconds to prime it for.
+        lines: Lines already primed, the slot is not primed again if it is one of them.
+    """
+    operations: list[BranchOperation] = [
+        partial(solvent_wash, branch=FlowBranch.REAGENTS),
+        partial(dry, branch=FlowBranch.REAGENTS),
+    ]
+    if prime_next is not None and (lines is None or lines.claim(prime_next)):
+        operations.append(partial(prime, src=prime_next, duration=prime_duration))
+    return operations
+
+
+class _ReagentBranch:
+    """
+    The instrument as seen by operations on the reagent branch while the columns incubate,
+    which may not open any valve of the reaction branch.
+    """
+
+    def __init__(self, instrument: Instrument):
+        self.instrument = instrument
+
+    def all_except(self, name: list[str]) -> None:
+        """Open the valves of a route on the reagent branch, see Instrument.all_except."""
+        conflicts = REACTION_BRANCH_VALVES.intersection(_name.lower() for _name in name)
+        if conflicts:
+            raise ValueError(f"{name} opens {sorted(conflicts)} of the incubating reaction branch")
+        self.instrument.all_except(name)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.instrument, name)
+
+
+@substep
+async def incubate(
+    instrument: Instrument,
+    duration: float,
+    meanwhile: Sequence[BranchOperation] = (),
+    fill: float = 0,
+) -> None:
+    """
+    Let the reaction columns incubate, running operations on the reagent branch meanwhile.
+
+    Without operations, the valves are left as they are, so the reagent keeps flowing through
+    the columns. Otherwise the reagent flows for fill seconds to fill the columns, then the
+    first operation seals them, the operations run one after the other, then every valve is
+    closed for the rest of the incubation.
+
+    args:
+        duration: Seconds to incubate for, the fill included.
+        meanwhile: Operations on the reagent branch, eg. clean_reagent_branch().
+        fill: Seconds the reagent flows through the columns before they are sealed.
+
+    raises:
+        ValueError: If an operation opens a valve of the reaction branch.
+    """
+    if not meanwhile:
+        await wait_async(duration)
+        return
+
+    await wait_async(fill)
+    reagent_branch = _ReagentBranch(instrument)
+    with counting_waits() as waits:
+        for operation in meanwhile:
+            await operation(reagent_branch)  # type: ignore
+    instrument.close_all()
+
+    remaining = duration - fill - sum(waits)
+    if remaining < 0:
+        logging.warning("Reagent branch operations overran the incubation by %.2fs", -remaining)
+    await wait_async(max(remaining, 0))
@@ -2,13 +2,51 @@
 Types for steps
 """
 import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import Enum
 from functools import wraps
+from typing import Callable, Iterator, Optional
+
+from openoligo.utils.trace import tracer
+from openoligo.utils.wait import recording_waits
 
 FlowWaitPair = tuple[int, float]
 FlowWaitPairs = list[FlowWaitPair]
 
 
+# Name of the step (not substep) being carried out, if any
+current_step: ContextVar[Optional[str]] = ContextVar("current_step", default=None)
+
+# Called with the number of cycles completed, every time a protocol completes a cycle
+_cycle_listener: ContextVar[Optional[Callable[[int], None]]] = ContextVar(
+    "cycle_listener", default=None
+)
+
+
+@contextmanager
+def listen_cycles(listener: Callable[[int], None]) -> Iterator[None]:
+    """Within the context, listener is called every time a protocol completes a cycle."""
+    token = _cycle_listener.set(listener)
+    try:
+        yield
+    finally:
+        _cycle_listener.reset(token)
+
+
+def cycle_completed(cycles: int) -> None:
+    """
+    Mark the end of a cycle of a protocol, after which it can be resumed, see listen_cycles.
+
+    args:
+        cycles: Number of cycles completed so far.
+    """
+    listener = _cycle_listener.get()
+    if listener is not None:
+        listener(cycles)
+
+
 class FlowBranch(Enum):
     """
     Flow branch enumeration.
@@ -22,19 +60,35 @@ def _step_decorator(coroutine, is_substep: bool = False):
     """
     Decorator for a step function (which carries out a reaction step).
     """
+    # Worked out once here, rather than on every call of the step
+    name = coroutine.__name__
+    doc = (coroutine.__doc__ or "").strip().split("\n")[0]
+    level = logging.DEBUG if is_substep else logging.INFO
+    category = "substep" if is_substep else "step"
 
     @wraps(coroutine)
     async def wrapper_coroutine(*args, **kwargs):
-        # instrument = Instrument()
-
-        name, doc = coroutine.__name__, coroutine.__doc__.strip().split("\n")[0]
-        level = logging.DEBUG if is_substep else logging.INFO
+        recorded = recording_waits()
         repr_args = args[1:]  # Remove instrument from args
-        logging.log(
-            level, "Starting step [bold]%s[/]%s: %s", name, repr_args, doc, extra={"markup": True}
-        )
+        if not recorded:  # Only log steps that are actually carried out
+            logging.log(
+                level,
+                "Starting step [bold]%s[/]%s: %s",
+                name,
+                repr_args,
+                doc,
+                extra={"markup": True},
+            )
 
-        return await coroutine(*args, **kwargs)
+        start = time.perf_counter_ns() if tracer.enabled and not recorded else None
+        token = None if is_substep else current_step.set(name)
+        try:
+            return await coroutine(*args, **kwargs)
+        finally:
+            if token is not None:
+                current_step.reset(token)
+            if start is not None:
+                tracer.record(name, category, start, time.perf_counter_ns())
 
     return wrapper_coroutine
 
@@ -1,7 +1,45 @@
 """
 Various unrelated modules and functions for logging, simulation, busy waiting, etc.
 """
+from openoligo.utils.clock import (
+    Clock,
+    RealClock,
+    VirtualClock,
+    VirtualTimeEventLoop,
+    get_clock,
+    run_virtual,
+    use_clock,
+)
+from openoligo.utils.scheduler import DeadlineScheduler, get_scheduler, scheduling
 from openoligo.utils.sim import SIMULATION_SPEEDUP_FACTOR
-from openoligo.utils.wait import ms, wait, wait_async
+from openoligo.utils.trace import Tracer, tracer
+from openoligo.utils.wait import (
+    counting_waits,
+    ms,
+    record_waits,
+    recording_waits,
+    wait,
+    wait_async,
+)
 
-__all__ = ["ms", "wait", "wait_async", "SIMULATION_SPEEDUP_FACTOR"]
+__all__ = [
+    "Clock",
+    "RealClock",
+    "VirtualClock",
+    "VirtualTimeEventLoop",
+    "get_clock",
+    "run_virtual",
+    "use_clock",
+    "DeadlineScheduler",
+    "get_scheduler",
+    "scheduling",
+    "counting_waits",
+    "ms",
+    "record_waits",
+    "recording_waits",
+    "wait",
+    "wait_async",
+    "SIMULATION_SPEEDUP_FACTOR",
+    "Tracer",
+    "tracer",
+]
@@ -0,0 +1,144 @@
+"""
+Clocks that protocols wait on, either the real one or a virtual one for simulations.
+
+With the virtual clock, a protocol runs on an event loop whose time only moves forward when
+every task is waiting on it, so a whole synthesis is simulated in milliseconds, and the same
+run always reports the same simulated durations.
+"""
+import asyncio
+import selectors
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Coroutine, Iterator, Optional, TypeVar
+
+from openoligo.utils import sim
+
+T = TypeVar("T")
+
+
+class Clock:
+    """Keeps the time of a protocol, in simulated seconds."""
+
+    def now(self) -> float:
+        """Current time in seconds, only meaningful relative to another reading."""
+        raise NotImplementedError
+
+    async def sleep(self, seconds: float) -> None:
+        """Wait for the given number of seconds."""
+        raise NotImplementedError
+
+    async def sleep_until(self, deadline: float) -> None:
+        """Wait until the time is deadline, as read by now, or just yield if it is past."""
+        await self.sleep(max(deadline - self.now(), 0.0))
+
+
+class RealClock(Clock):
+    """
+    The wall clock, sped up by the simulation speedup factor.
+
+    The factor is read on every call, so changing it takes effect immediately.
+    """
+
+    def now(self) -> float:
+        return time.monotonic() * sim.SIMULATION_SPEEDUP_FACTOR
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds / sim.SIMULATION_SPEEDUP_FACTOR)
+
+
+class VirtualClock(Clock):
+    """
+    The time of a VirtualTimeEventLoop, sleeping on it takes no wall clock time at all.
+    """
+
+    def now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    async def sleep(self, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        if not isinstance(loop, VirtualTimeEventLoop):
+            raise RuntimeError("The virtual clock needs a VirtualTimeEventLoop, see run_virtual")
+        await asyncio.sleep(seconds)
+
+
+class _VirtualTimeSelector:
+    """
+    Selector that polls for I/O without blocking, and instead of waiting for the next timer,
+    moves the time of its loop forward to it.
+    """
+
+    def __init__(self, selector: selectors.BaseSelector, loop: "VirtualTimeEventLoop"):
+        self._selector = selector
+        self._loop = loop
+
+    def select(self, timeout: Optional[float] = None) -> list:
+        """Return the ready I/O, or advance the time by timeout if there is none."""
+        if timeout is None:  # No timers, only I/O (eg. a thread) can wake the loop
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if not events and timeout > 0:
+            self._loop.advance(timeout)
+        return events
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._selector, name)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):  # pylint: disable=abstract-method
+    """
+    Event loop with a virtual time, that jumps straight to the next timer whenever no task is
+    ready to run and no I/O is ready.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        super().__init__()
+        self._time = start
+        self._selector = _VirtualTimeSelector(self._selector, self)  # type: ignore
+
+    def time(self) -> float:
+        """The virtual time, in seconds."""
+        return self._time
+
+    def advance(self, seconds: float) -> None:
+        """Move the time forward."""
+        self._time += seconds
+
+
+_clock: ContextVar[Clock] = ContextVar("clock", default=RealClock())
+
+
+def get_clock() -> Clock:
+    """The clock protocols currently wait on."""
+    return _clock.get()
+
+
+@contextmanager
+def use_clock(clock: Clock) -> Iterator[Clock]:
+    """Within the context, protocols wait on the given clock."""
+    token = _clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _clock.reset(token)
+
+
+def run_virtual(coroutine: Coroutine[Any, Any, T], start: float = 0.0) -> T:
+    """
+    Run a coroutine to completion on a VirtualTimeEventLoop, waiting on a VirtualClock.
+
+    Like asyncio.run, this can not be called while another event loop is running.
+
+    args:
+        coroutine: The coroutine to run, eg. synthesize_ssdna(instrument, seq).
+        start: Virtual time the loop starts at.
+    """
+    loop = VirtualTimeEventLoop(start)
+    try:
+        with use_clock(VirtualClock()):
+            return loop.run_until_complete(coroutine)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
@@ -27,6 +27,13 @@ def log_path(name: Optional[str]) -> str:
     return os.path.join(log_dir, f"{name}.log")
 
 
+def trace_path(name: str) -> str:
+    """
+    Get the path to the trace of a task, next to its log file
+    """
+    return os.path.splitext(log_path(name))[0] + ".trace.json"
+
+
 class OligoLogger:
     """
     Logger for OpenOligo
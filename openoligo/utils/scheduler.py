@@ -0,0 +1,69 @@
+"""
+Schedule waits on absolute deadlines, so that delays do not add up over a run.
+
+A wait of some seconds sleeps until the start of the run plus every second waited for so far,
+instead of sleeping for the seconds from whenever it is called. The time spent logging,
+writing to the database or switching valves between waits is then caught up on by the next
+wait, and how late each wait wakes up is recorded.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from openoligo.utils.clock import Clock, get_clock
+
+
+class DeadlineScheduler:
+    """Sleeps until deadlines counted from the start of a run, on a clock."""
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        """
+        args:
+            clock: Clock to wait on, the current clock if None, see use_clock.
+        """
+        self.clock = clock or get_clock()
+        self.start = self.clock.now()
+        self.planned = 0.0  # Seconds waited for so far, according to the plan
+        self.lateness: list[float] = []  # Seconds each wait woke up after its deadline
+
+    async def wait(self, seconds: float) -> float:
+        """
+        Wait until seconds after the previous deadline.
+
+        returns:
+            How late the wait woke up, in seconds.
+        """
+        self.planned += seconds
+        deadline = self.start + self.planned
+        await self.clock.sleep_until(deadline)
+        lateness = self.clock.now() - deadline
+        self.lateness.append(lateness)
+        return lateness
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the start of the run."""
+        return self.clock.now() - self.start
+
+    @property
+    def drift(self) -> float:
+        """Seconds the run is behind its plan."""
+        return self.elapsed - self.planned
+
+
+_scheduler: ContextVar[Optional[DeadlineScheduler]] = ContextVar("scheduler", default=None)
+
+
+def get_scheduler() -> Optional[DeadlineScheduler]:
+    """The scheduler wait_async waits on, if any, see scheduling."""
+    return _scheduler.get()
+
+
+@contextmanager
+def scheduling(clock: Optional[Clock] = None) -> Iterator[DeadlineScheduler]:
+    """Within the context, wait_async waits on the deadlines of a new scheduler."""
+    token = _scheduler.set(DeadlineScheduler(clock))
+    try:
+        yield _scheduler.get()  # type: ignore
+    finally:
+        _scheduler.reset(token)
@@ -0,0 +1,135 @@
+"""
+Low overhead tracing of where the time of a run goes, exported in the Chrome Trace Event
+format, to open in chrome://tracing or https://ui.perfetto.dev.
+
+Spans are written into a ring buffer allocated up front, so recording one is a clock read
+and a list store, and the oldest spans are overwritten once the buffer is full. Tracing is
+off until started, and then costs a single attribute check per traced call.
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_CAPACITY = 1 << 16
+
+# Name, category, start and end in nanoseconds, thread, arguments
+Span = tuple[str, str, int, int, int, Optional[dict]]
+
+
+class Tracer:
+    """Records spans into a ring buffer of a fixed capacity."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity = capacity
+        self.enabled = False
+        self._spans: list[Optional[Span]] = [None] * capacity
+        self._counter = itertools.count()  # next() on a count is atomic under the GIL
+
+    def start(self) -> None:
+        """Forget every span recorded so far, and start recording."""
+        self._spans = [None] * self.capacity
+        self._counter = itertools.count()
+        self.enabled = True
+
+    def stop(self) -> None:
+        """Stop recording, the spans recorded so far are kept."""
+        self.enabled = False
+
+    # The fields of a span are passed as they are, not packed by the caller, as recording is
+    # on the hot path of every traced call
+    def record(  # pylint: disable=too-many-arguments
+        self, name: str, category: str, start: int, end: int, *, args: Optional[dict] = None
+    ) -> None:
+        """Record a span, from start to end as read by time.perf_counter_ns."""
+        span = (name, category, start, end, threading.get_ident(), args)
+        self._spans[next(self._counter) % self.capacity] = span
+
+    def traced(self, category: str, name: Optional[str] = None) -> Callable[[F], F]:
+        """
+        Decorator recording a span for every call of a function or coroutine function.
+
+        args:
+            category: Category of the spans, eg. db.
+            name: Name of the spans, the qualified name of the function if None.
+        """
+
+        def decorator(function: F) -> F:
+            label = name or function.__qualname__
+
+            if asyncio.iscoroutinefunction(function):
+
+                @wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await function(*args, **kwargs)
+                    start = time.perf_counter_ns()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self.record(label, category, start, time.perf_counter_ns())
+
+                return async_wrapper  # type: ignore
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(label, category, start, time.perf_counter_ns())
+
+            return wrapper  # type: ignore
+
+        return decorator
+
+    def spans(self) -> list[Span]:
+        """The spans in the buffer, in the order they started."""
+        return sorted((span for span in self._spans if span is not None), key=lambda s: s[2])
+
+    def to_chrome_trace(self) -> dict:
+        """The spans in the buffer, in the Chrome Trace Event format."""
+        pid = os.getpid()
+        events: list[dict] = []
+        for name, category, start, end, thread, args in self.spans():
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": thread,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread in {event["tid"] for event in events} & threads.keys():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread,
+                    "args": {"name": threads[thread]},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> None:
+        """Write the spans in the buffer to a Chrome Trace Event JSON file."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+tracer = Tracer()
@@ -1,24 +1,79 @@
 """
 Utilities for waiting.
 """
-import asyncio
 import logging
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
 
-from openoligo.utils.sim import SIMULATION_SPEEDUP_FACTOR
+from openoligo.utils import sim
+from openoligo.utils.clock import get_clock
+from openoligo.utils.scheduler import get_scheduler
+
+_wait_recorder: ContextVar[Optional[Callable[[float], None]]] = ContextVar(
+    "wait_recorder", default=None
+)
+_wait_counters: ContextVar[tuple[list[float], ...]] = ContextVar("wait_counters", default=())
+
+
+@contextmanager
+def record_waits(recorder: Callable[[float], None]) -> Iterator[None]:
+    """
+    Within the context, wait_async passes each duration to recorder instead of sleeping.
+
+    Used to run a protocol without the hardware or the clock, eg. to compile it into a plan.
+    """
+    token = _wait_recorder.set(recorder)
+    try:
+        yield
+    finally:
+        _wait_recorder.reset(token)
+
+
+def recording_waits() -> bool:
+    """Whether waits are being recorded instead of waited for, see record_waits."""
+    return _wait_recorder.get() is not None
+
+
+@contextmanager
+def counting_waits() -> Iterator[list[float]]:
+    """
+    Within the context, every duration wait_async waits for, or records, is appended to the
+    yielded list, so that the time spent in the context is known even while compiling.
+    """
+    waits: list[float] = []
+    token = _wait_counters.set(_wait_counters.get() + (waits,))
+    try:
+        yield waits
+    finally:
+        _wait_counters.reset(token)
 
 
 async def wait_async(seconds: float) -> None:
-    """Wait for a given number of seconds."""
+    """
+    Wait for a given number of seconds, on the current clock, see use_clock, or until the next
+    deadline of the current scheduler, see scheduling.
+    """
+    for waits in _wait_counters.get():
+        waits.append(seconds)
+    recorder = _wait_recorder.get()
+    if recorder is not None:
+        recorder(seconds)
+        return
     logging.debug("Start waiting for %.2f seconds", seconds)  # pragma: no cover
-    await asyncio.sleep(seconds / SIMULATION_SPEEDUP_FACTOR)
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        await scheduler.wait(seconds)
+    else:
+        await get_clock().sleep(seconds)
     logging.debug("Done waiting for %.2f seconds", seconds)  # pragma: no cover
 
 
 def wait(seconds: float) -> None:
     """Wait for a given number of seconds."""
     logging.debug("Start waiting for %.2f seconds", seconds)
-    time.sleep(seconds / SIMULATION_SPEEDUP_FACTOR)
+    time.sleep(seconds / sim.SIMULATION_SPEEDUP_FACTOR)
     logging.debug("Done waiting for %.2f seconds", seconds)
 
 
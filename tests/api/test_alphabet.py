@@ -0,0 +1,75 @@
+import pytest
+
+from openoligo.api.alphabet import alphabet_registry, compile_alphabet, pinout_amidites
+from openoligo.api.models import Reactant, ReactantType
+from openoligo.hal.instrument import default_pinout
+from openoligo.seq import Phosphoramidite, SeqCategory, builtin_alphabet, validate_many
+
+
+def test_compile_alphabet():
+    alphabet = compile_alphabet(["A", "T", "M5C", "Cy5"])
+    assert alphabet.amidites == {Phosphoramidite.A, Phosphoramidite.T, Phosphoramidite.M5C}
+    assert alphabet.accronyms[Phosphoramidite.M5C] == "M5C"
+    assert alphabet.tokenizer.tokenize("AT5mC") == [
+        Phosphoramidite.A,
+        Phosphoramidite.T,
+        Phosphoramidite.M5C,
+    ]
+    assert alphabet.bases[SeqCategory.DNA] == b"ATat"
+
+    assert compile_alphabet([]) is builtin_alphabet
+    assert compile_alphabet(["Cy5"]) is builtin_alphabet
+
+
+def test_compile_alphabet_for_a_pinout():
+    available = pinout_amidites(default_pinout)
+    assert available == {
+        Phosphoramidite.A,
+        Phosphoramidite.C,
+        Phosphoramidite.G,
+        Phosphoramidite.T,
+    }
+    assert compile_alphabet([], available).amidites == available
+    alphabet = compile_alphabet(["A", "U", "5mC"], available)
+    assert alphabet.amidites == {Phosphoramidite.A}
+
+
+def test_validate_with_alphabet():
+    alphabet = compile_alphabet(["A", "T", "5mC"])
+    assert validate_many(["ATTA", "ATCG"], SeqCategory.DNA, alphabet=alphabet) == [
+        None,
+        "Invalid DNA sequence",
+    ]
+    assert validate_many(["AT5mC", "ATG"], SeqCategory.MODIFIED, alphabet=alphabet) == [
+        None,
+        "Invalid sequence: 'G' at position 2",
+    ]
+
+
+async def _add_reactant(accronym, reactant_type=ReactantType.NUCLEOTIDE):
+    await Reactant.create(
+        name=accronym,
+        accronym=accronym,
+        volume=10,
+        current_volume=10,
+        reactant_type=reactant_type,
+    )
+
+
+@pytest.mark.asyncio
+async def test_alphabet_registry(db):
+    assert await alphabet_registry.get() is builtin_alphabet
+
+    await _add_reactant("A")
+    await _add_reactant("T")
+    await _add_reactant("TCA", ReactantType.REACTANT)
+    alphabet = await alphabet_registry.get()
+    assert alphabet.amidites == {Phosphoramidite.A, Phosphoramidite.T}
+    assert await alphabet_registry.get() is alphabet
+
+    await _add_reactant("5mC", ReactantType.MODIFIED_NUCLEOTIDE)
+    assert Phosphoramidite.M5C in (await alphabet_registry.get()).amidites
+    assert Phosphoramidite.M5C not in (await alphabet_registry.get(default_pinout)).amidites
+
+    await (await Reactant.get(accronym="5mC")).delete()
+    assert Phosphoramidite.M5C not in (await alphabet_registry.get()).amidites
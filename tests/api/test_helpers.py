@@ -1,7 +1,10 @@
 import pytest
 
 from openoligo.api.helpers import (
+    add_or_merge_task,
+    find_identical_tasks,
     get_log_file,
+    get_tasks_in_progress,
     set_log_file,
     set_task_in_progress,
     update_task_status,
@@ -51,3 +54,41 @@ async def test_get_log_file(db):
     )
     log_file = await get_log_file(synthesis_queue.id)
     assert log_file == "Test log"
+
+
+@pytest.mark.asyncio
+async def test_add_or_merge_task(db):
+    task, merged = await add_or_merge_task("ATCG", SeqCategory.DNA, 1)
+    assert not merged and task.multiplicity == 1
+
+    same, merged = await add_or_merge_task("atcg", SeqCategory.DNA, 4)
+    assert merged and same.id == task.id
+    assert (same.multiplicity, same.rank) == (2, 4)
+
+    _, merged = await add_or_merge_task("ATCG", SeqCategory.MODIFIED)
+    assert not merged
+
+    await update_task_status(task.id, TaskStatus.COMPLETE)
+    again, merged = await add_or_merge_task("ATCG")
+    assert not merged and again.id != task.id
+
+
+@pytest.mark.asyncio
+async def test_find_identical_tasks(db):
+    first = await SynthesisQueue.create(sequence="A5mCG", category=SeqCategory.MODIFIED)
+    await update_task_status(first.id, TaskStatus.COMPLETE)
+    second = await SynthesisQueue.create(sequence="AM5CG", category=SeqCategory.MODIFIED)
+
+    found = await find_identical_tasks("A5mCG", SeqCategory.MODIFIED)
+    assert [task.id for task in found] == [first.id, second.id]
+    found = await find_identical_tasks("A5mCG", SeqCategory.MODIFIED, [TaskStatus.QUEUED])
+    assert [task.id for task in found] == [second.id]
+    assert await find_identical_tasks("A5mCG", SeqCategory.DNA) == []
+    assert await find_identical_tasks("AXG") == []
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_in_progress(db):
+    await SynthesisQueue.create(sequence="ATCG", status=TaskStatus.QUEUED)
+    running = await SynthesisQueue.create(sequence="GGCC", status=TaskStatus.IN_PROGRESS)
+    assert [task.id for task in await get_tasks_in_progress()] == [running.id]
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from openoligo.api.ingest import (
+    OrderFormat,
+    OrderRecord,
+    batched,
+    ingest_order,
+    iter_lines,
+    parse_csv,
+    parse_fasta,
+    queue_batch,
+)
+from openoligo.api.models import SynthesisQueue
+from openoligo.seq import SeqCategory
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_iter_lines():
+    chunks = [b"AT", b"CG\nGG", b"\r\n\nTT\xc3", b"\xa9A"]
+    lines = asyncio.run(_collect(iter_lines(_stream(*chunks))))
+    assert lines == ["ATCG", "GG", "", "TTéA"]
+
+
+def test_parse_fasta():
+    fasta = ["; comment", ">first", "ATCG", "GGCC", "", ">second one", "AAAT", ">empty"]
+    records = asyncio.run(_collect(parse_fasta(_stream(*fasta), SeqCategory.RNA, 2)))
+    assert [(r.index, r.name, r.sequence) for r in records] == [
+        (1, "first", "ATCGGGCC"),
+        (2, "second one", "AAAT"),
+        (3, "empty", ""),
+    ]
+    assert all(r.category == SeqCategory.RNA and r.rank == 2 for r in records)
+    assert all(r.error is None for r in records)
+
+
+def test_parse_fasta_without_header():
+    records = asyncio.run(_collect(parse_fasta(_stream("ATCG", ">named", "GGG"))))
+    assert records[0].error == "Sequence without a FASTA header"
+    assert (records[1].name, records[1].sequence, records[1].error) == ("named", "GGG", None)
+
+
+def test_parse_csv():
+    rows = [
+        "Name,Sequence,category,rank",
+        "first,ATCG,,",
+        '"second, quoted",AUCG,RNA,3',
+        "third,GGG,XNA,1",
+        "fourth,GGG,DNA,high",
+    ]
+    records = asyncio.run(_collect(parse_csv(_stream(*rows))))
+    assert [(r.index, r.name, r.sequence) for r in records] == [
+        (1, "first", "ATCG"),
+        (2, "second, quoted", "AUCG"),
+        (3, "third", "GGG"),
+        (4, "fourth", "GGG"),
+    ]
+    assert (records[0].category, records[0].rank) == (SeqCategory.DNA, 0)
+    assert (records[1].category, records[1].rank) == (SeqCategory.RNA, 3)
+    assert records[2].error is not None
+    assert records[3].error is not None
+
+
+def test_parse_csv_without_sequence_column():
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(parse_csv(_stream("name,seq", "a,ATCG"))))
+
+
+def test_batched():
+    records = [OrderRecord(i, "", "ATCG") for i in range(5)]
+    batches = asyncio.run(_collect(batched(_stream(*records), 2)))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_queue_batch(db):
+    batch = [
+        OrderRecord(1, "ok", "ATCG"),
+        OrderRecord(2, "bad", "ATXG"),
+        OrderRecord(3, "rna", "AUCG", SeqCategory.RNA),
+        OrderRecord(4, "short", "AT"),
+        OrderRecord(5, "broken", "ATCG", error="Bad row"),
+    ]
+    results = await queue_batch(batch)
+
+    assert [result["record"] for result in results] == [1, 2, 3, 4, 5]
+    assert "error" not in results[0] and "error" not in results[2]
+    assert results[1]["error"] == "Invalid DNA sequence"
+    assert results[3]["error"] == "Sequence must be at least 3 bases long"
+    assert results[4]["error"] == "Bad row"
+
+    task = await SynthesisQueue.get(id=results[2]["id"])
+    assert (task.sequence, task.category) == ("AUCG", SeqCategory.RNA)
+    assert await SynthesisQueue.all().count() == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_order(db):
+    fasta = b"".join(b">oligo%d\nATCG%s\n" % (i, b"A" * i) for i in range(25))
+    chunks = [fasta[i : i + 7] for i in range(0, len(fasta), 7)]
+
+    results = await _collect(ingest_order(_stream(*chunks), OrderFormat.FASTA, batch_size=10))
+    assert [result["name"] for result in results] == [f"oligo{i}" for i in range(25)]
+    assert await SynthesisQueue.all().count() == 25
+
+
+@pytest.mark.asyncio
+async def test_queue_batch_merges_identical_sequences(db):
+    queued = await SynthesisQueue.create(sequence="GGGCCC", category=SeqCategory.DNA, rank=1)
+    batch = [
+        OrderRecord(1, "a", "ATCG"),
+        OrderRecord(2, "b", "atcg", rank=3),
+        OrderRecord(3, "c", "gggccc"),
+        OrderRecord(4, "d", "AUCG", SeqCategory.RNA),
+        OrderRecord(5, "e", "AUCG", SeqCategory.RNA),
+    ]
+    results = await queue_batch(batch)
+
+    assert [result["merged"] for result in results] == [False, True, True, False, True]
+    assert results[0]["id"] == results[1]["id"]
+    assert results[2]["id"] == queued.id
+    assert await SynthesisQueue.all().count() == 3
+
+    task = await SynthesisQueue.get(id=results[0]["id"])
+    assert (task.multiplicity, task.rank) == (2, 3)
+    await queued.refresh_from_db()
+    assert (queued.multiplicity, queued.rank) == (2, 1)
@@ -3,7 +3,13 @@ from datetime import datetime
 import pytest
 from tortoise.exceptions import ValidationError
 
-from openoligo.api.models import SynthesisQueue, SynthesisQueueModel, TaskStatus
+from openoligo.api.models import (
+    SynthesisQueue,
+    SynthesisQueueModel,
+    TaskStatus,
+    ValidSeq,
+    content_hash,
+)
 from openoligo.seq import SeqCategory
 
 
@@ -62,3 +68,38 @@ async def test_pydantic_model_queue(db):
     assert model.rank == 0
     assert isinstance(model.created_at, datetime)
     assert model.created_at == t
+
+
+def test_valid_seq():
+    validator = ValidSeq()
+    validator("ATCG")
+
+    with pytest.raises(ValidationError):
+        validator("AT")
+    with pytest.raises(ValidationError):
+        validator("A" * 101)
+    with pytest.raises(ValidationError):
+        validator("AUCG")
+
+    assert ValidSeq(SeqCategory.RNA).validate_many(["AUCG", "AU", "ATCG"]) == [
+        None,
+        "Sequence must be at least 3 bases long",
+        "Invalid RNA sequence",
+    ]
+
+
+def test_content_hash():
+    assert content_hash("atcg", SeqCategory.DNA) == content_hash("ATCG", SeqCategory.DNA)
+    assert content_hash("A5mC", SeqCategory.MODIFIED) == content_hash("AM5C", SeqCategory.MODIFIED)
+    assert content_hash("ATCG", SeqCategory.DNA) != content_hash("ATCG", SeqCategory.MODIFIED)
+    assert content_hash("ATXG", SeqCategory.DNA) is None
+
+
+@pytest.mark.asyncio
+async def test_content_hash_is_kept_up_to_date(db):
+    task = await SynthesisQueue.create(sequence="ATCG", category=SeqCategory.DNA)
+    assert task.content_hash == content_hash("ATCG", SeqCategory.DNA)
+    task.sequence = "GGCC"
+    await task.save()
+    await task.refresh_from_db()
+    assert task.content_hash == content_hash("GGCC", SeqCategory.DNA)
@@ -1,3 +1,4 @@
+import json
 import os
 from unittest.mock import patch
 
@@ -6,12 +7,15 @@ from fastapi import HTTPException, status
 from fastapi.testclient import TestClient
 
 from openoligo.api.helpers import update_task_status
-from openoligo.api.models import TaskStatus
+from openoligo.api.models import SynthesisQueue, TaskStatus
+from openoligo.hal.instrument import Instrument, default_pinout
 from openoligo.hal.platform import Platform
-from openoligo.scripts.server import app, get_db_url
+from openoligo.scripts.server import UNROUTABLE, app, get_db_url, get_instrument
 from openoligo.seq import SeqCategory
 
 client = TestClient(app)
+_instrument = type.__call__(Instrument, default_pinout)
+app.dependency_overrides[get_instrument] = lambda: _instrument
 
 
 def test_get_health():
@@ -33,11 +37,71 @@ def test_add_task_to_synthesis_queue(db):
 
     response = client.post(f"/queue?sequence={sequence}&category=DNA&rank=-10")
     assert response.status_code == 201
+    assert response.json()["multiplicity"] == 2
 
     response = client.post(f"/queue?sequence=A&category=RNA&rank=0")
     assert response.status_code == 400
 
 
+def test_add_task_limited_to_the_pinout(db):
+    assert client.post("/queue?sequence=GGCC&category=RNA").status_code == 201
+    response = client.post("/queue?sequence=AUGCU&category=RNA")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid RNA sequence"
+
+    response = client.post("/queue/validate?category=RNA", json=["AUGCU"])
+    assert response.json()[0]["valid"] is False
+
+
+def test_add_task_limited_to_the_inventory(db):
+    for accronym in ["A", "T", "C"]:
+        response = client.post(
+            f"/reagents?name={accronym}&accronym={accronym}&reactant_type=nucleotide"
+        )
+        assert response.status_code == 201
+
+    assert client.post("/queue?sequence=ATCC&category=DNA").status_code == 201
+    response = client.post("/queue?sequence=ATCG&category=DNA")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid DNA sequence"
+
+
+def test_upload_an_order_to_synthesis_queue(db):
+    fasta = ">one\nATCG\nATCG\n>two\nATXG\n>three\nGGGCCC\n"
+    response = client.post("/queue/upload?format=fasta&rank=2", content=fasta)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["name"] for result in results] == ["one", "two", "three"]
+    assert results[1]["error"] == "Invalid DNA sequence"
+
+    task = client.get(f"/queue/{results[0]['id']}").json()
+    assert (task["sequence"], task["rank"]) == ("ATCGATCG", 2)
+
+    csv = "sequence,category\nGGCC,RNA\nAUCG,DNA\nAUCG,RNA\n"
+    response = client.post("/queue/upload?format=csv", content=csv)
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert "error" not in results[0]
+    assert results[1]["error"] == "Invalid DNA sequence"
+    assert results[2]["error"] == "Invalid RNA sequence"  # No valve for U
+
+    response = client.post("/queue/upload?format=csv", content="name\nfoo\n")
+    assert response.status_code == 400
+
+
+def test_validate_sequences():
+    response = client.post("/queue/validate?category=DNA", json=["ATCG", "ATXG", "AT"])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"sequence": "ATCG", "valid": True, "error": None},
+        {"sequence": "ATXG", "valid": False, "error": "Invalid DNA sequence"},
+        {"sequence": "AT", "valid": False, "error": "Sequence must be at least 3 bases long"},
+    ]
+
+    response = client.post("/queue/validate", json=[])
+    assert response.status_code == 422
+
+
 def test_get_all_tasks_in_synthesis_queue(db):
     response = client.get("/queue")
     assert response.status_code == 200
@@ -73,6 +137,95 @@ def test_get_all_tasks_in_synthesis_queue(db):
 #    ), "Not all tasks have the expected status"
 
 
+def test_get_properties_of_tasks_in_synthesis_queue(db):
+    client.post("/queue?sequence=ATCG&category=DNA")
+    client.post("/queue?sequence=GGGCCC&category=DNA&rank=1")
+
+    response = client.get("/queue/properties")
+    assert response.status_code == 200
+    tasks = response.json()
+    assert [task["sequence"] for task in tasks] == ["GGGCCC", "ATCG"]
+    assert tasks[0]["gc_content"] == 1.0
+    assert tasks[1]["cycle_count"] == 4
+    assert tasks[1]["amidite_counts"]["A"] == 1
+    assert tasks[1]["molecular_weight"] == pytest.approx(1173.84)
+
+    response = client.get("/queue/properties?filter_by=complete")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_get_identical_tasks_in_synthesis_queue(db):
+    client.post("/queue?sequence=ATCG&category=DNA")
+    client.post("/queue?sequence=GGCC&category=DNA")
+
+    response = client.get("/queue/identical?sequence=atcg")
+    assert response.status_code == 200
+    assert [task["sequence"] for task in response.json()] == ["ATCG"]
+
+    response = client.get("/queue/identical?sequence=ATCG&category=RNA")
+    assert response.json() == []
+
+
+def test_plan_queued_tasks_onto_columns(db):
+    ids = [
+        client.post(f"/queue?sequence={sequence}&category=DNA").json()["id"]
+        for sequence in ["ATCGATCG", "GGGA", "ATCGTTTT"]
+    ]
+
+    response = client.get("/queue/plan?columns=2")
+    assert response.status_code == 200
+    plan = response.json()
+    assert (plan["solo_cycles"], plan["planned_cycles"], plan["cycle_savings"]) == (20, 16, 4)
+    assert plan["groups"][0]["task_ids"] == [ids[0], ids[2]]
+    assert plan["groups"][0]["shared_cycles"] == 4
+
+    response = client.get("/queue/plan?columns=0")
+    assert response.status_code == 422
+
+
+def test_estimate_tasks_in_synthesis_queue(db):
+    first = client.post("/queue?sequence=ATCG&category=DNA").json()["id"]
+    second = client.post("/queue?sequence=GGCCA&category=DNA&rank=1").json()["id"]
+
+    response = client.get(f"/queue/{first}/estimate")
+    assert response.status_code == 200
+    estimate = response.json()
+    assert estimate["duration"] > 0
+    assert estimate["steps"]["detritylate"] == 200
+    assert estimate["reagent_time"]["act"] == 10 * 4  # Fills once per base, to couple
+    assert estimate["reagent_time"]["deb"] == 2 * 5 + 10 * 4 + 45  # Primed again to deprotect
+    assert client.get("/queue/1000/estimate").status_code == 404
+
+    response = client.get("/queue/eta")
+    assert response.status_code == 200
+    etas = response.json()
+    assert [eta["id"] for eta in etas] == [second, first]
+    assert etas[0]["start"] == 0
+    assert etas[1]["start"] == etas[0]["finish"]
+    assert etas[1]["finish"] - etas[1]["start"] == estimate["duration"]
+
+
+@pytest.mark.asyncio
+async def test_estimate_tasks_the_instrument_can_not_run(db):
+    first = client.post("/queue?sequence=ATCG&category=DNA").json()["id"]
+    task = await SynthesisQueue.create(sequence="AUGCU", category=SeqCategory.RNA, rank=1)
+
+    response = client.get(f"/queue/{task.id}/estimate")
+    assert response.status_code == 400
+    assert response.json()["detail"] == UNROUTABLE
+
+    response = client.get("/queue/eta")
+    assert response.status_code == 200
+    unroutable, eta = response.json()
+    assert (unroutable["id"], unroutable["start"], unroutable["error"]) == (
+        task.id,
+        None,
+        UNROUTABLE,
+    )
+    assert (eta["id"], eta["start"], eta["error"]) == (first, 0, None)
+
+
 def test_clear_all_queued_tasks_in_task_queue(db):
     response = client.delete("/queue")
     assert response.status_code == 200
@@ -1,8 +1,35 @@
 import pytest
 from tortoise.contrib.test import finalizer, initializer
 
+from openoligo.api.alphabet import alphabet_registry
+from openoligo.hal.board import Pinout
+from openoligo.hal.devices import Valve
+from openoligo.hal.instrument import Instrument, default_pinout
+from openoligo.hal.types import ValveRole, board
+
 
 @pytest.fixture(scope="function", autouse=False)
 def db(request):
     initializer(["openoligo.api.models"], "sqlite://:memory:", app_label="models")
+    alphabet_registry.invalidate()
     request.addfinalizer(finalizer)
+
+
+@pytest.fixture
+def instrument():
+    """An instrument with the default pinout, not the shared singleton instance."""
+    return type.__call__(Instrument, default_pinout)
+
+
+@pytest.fixture
+def column_instrument():
+    """An instrument with three reaction columns, not the shared singleton instance."""
+    pinout = type.__call__(
+        Pinout,
+        default_pinout.phosphoramidites,
+        columns={
+            "col2": Valve(gpio_pin=board.P32, role=ValveRole.TRANSIT),
+            "col3": Valve(gpio_pin=board.P35, role=ValveRole.TRANSIT),
+        },
+    )
+    return type.__call__(Instrument, pinout)
@@ -1,7 +1,7 @@
 import pytest
 
 from openoligo.hal.devices import Switch, Valve
-from openoligo.hal.types import ValveState, ValveType, board
+from openoligo.hal.types import ValveRole, ValveState, ValveType, board
 
 
 def test_nc_no_valve():
@@ -37,3 +37,23 @@ def test_simulated_switch():
 def test_get_type(valve_type):
     m = Valve(gpio_pin=board.P3, valve_type=valve_type)
     assert m.get_type == valve_type, "get_type should return the valve type"
+
+
+def test_devices_are_slotted():
+    valve, switch = Valve(gpio_pin=board.P40), Switch(gpio_pin=board.P40)
+    assert not hasattr(valve, "__dict__")
+    with pytest.raises(AttributeError):
+        valve.name = "sol"
+
+    assert valve == Valve(gpio_pin=board.P40, role=ValveRole.OUTLET)  # Same pin
+    assert valve != Valve(gpio_pin=board.P37)
+    assert valve != switch
+    assert len({valve, Valve(gpio_pin=board.P40), switch}) == 2
+
+
+def test_record_switch():
+    valve = Valve(gpio_pin=board.P3, valve_type=ValveType.NORMALLY_CLOSED)
+    valve.record_switch(False)
+    assert not valve.is_open and valve._switch_count == 0
+    valve.record_switch(True)
+    assert valve.is_open and valve._switch_count == 1
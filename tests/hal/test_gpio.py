@@ -3,7 +3,8 @@ from unittest.mock import Mock, mock_open, patch
 
 import pytest
 
-from openoligo.hal.gpio import GPIOInterface, GpioMode, MockGPIO, RPiGPIO, get_gpio
+from openoligo.hal.gpio import BbGPIO, GPIOInterface, GpioMode, MockGPIO, RPiGPIO, get_gpio
+from openoligo.hal.devices import DigitalSensor, Switch, Valve, setup_devices
 from openoligo.hal.platform import is_rpi
 from openoligo.hal.types import board
 
@@ -82,3 +83,58 @@ def test_not_on_raspberry_pi(mock_file):
     result = get_gpio()
     # Check that the right GPIO class was returned
     assert isinstance(result, MockGPIO)
+
+
+def test_set_many():
+    gpio = MockGPIO()
+    gpio.set_many({board.P21: True, "22": True})
+    assert gpio.value(board.P21) and gpio.value(board.P22)
+
+    gpio.write_mask([board.P21, board.P22, board.P23], 0b101)
+    assert [gpio.value(pin) for pin in (board.P21, board.P22, board.P23)] == [True, False, True]
+
+
+def test_RPiGPIO_set_many():
+    gpio_mock = Mock()
+    rpi_gpio = RPiGPIO(gpio_mock)
+    rpi_gpio.set_many({board.P5: True, board.P7: False})
+    gpio_mock.output.assert_called_once_with([5, 7], [gpio_mock.HIGH, gpio_mock.LOW])
+
+    gpio_mock.reset_mock()
+    rpi_gpio.set_many({})
+    gpio_mock.output.assert_not_called()
+
+
+def test_BbGPIO_set_many():
+    gpio_mock = Mock()
+    bb_gpio = BbGPIO(gpio_mock)
+    bb_gpio.set_many({"P8_10": True, "P8_12": False})
+    assert gpio_mock.output.call_count == 2
+    gpio_mock.output.assert_called_with("P8_12", gpio_mock.LOW, pull_up_down=gpio_mock.PUD_UP)
+
+
+def test_get_gpio_is_shared():
+    assert get_gpio() is get_gpio()
+    assert Valve(gpio_pin=board.P40).controller is Switch(gpio_pin=board.P37).controller
+
+
+def test_RPiGPIO_setup_pins():
+    gpio_mock = Mock()
+    rpi_gpio = RPiGPIO(gpio_mock)
+    rpi_gpio.setup_pins([board.P5, board.P7])
+    gpio_mock.setup.assert_called_once_with([5, 7], gpio_mock.OUT)
+
+    gpio_mock.reset_mock()
+    rpi_gpio.setup_pins([])
+    gpio_mock.setup.assert_not_called()
+
+
+def test_setup_devices():
+    controller = Mock(spec=GPIOInterface)
+    devices = [Valve(gpio_pin=board.P40), Switch(gpio_pin=board.P37), DigitalSensor(board.P27)]
+    for device in devices:
+        device.controller = controller
+    setup_devices(devices)
+    controller.setup_pins.assert_any_call([board.P40, board.P37], GpioMode.OUT)
+    controller.setup_pins.assert_any_call([board.P27], GpioMode.IN)
+    assert controller.setup_pins.call_count == 2
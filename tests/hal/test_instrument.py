@@ -1,12 +1,25 @@
+import asyncio
 from unittest.mock import Mock, patch
 
 import pytest
 
-from openoligo.hal.board import Pinout
+from openoligo.hal.board import Pinout, parse_columns
 from openoligo.hal.devices import Valve
-from openoligo.hal.gpio import get_gpio
-from openoligo.hal.instrument import Instrument
-from openoligo.hal.types import OneDestinationException, OneSourceException, ValveRole, board
+from openoligo.hal.gpio import GPIOInterface, MockGPIO, get_gpio
+from openoligo.hal.instrument import Instrument, default_pinout
+from openoligo.hal.types import (
+    NoSuchPinInPinout,
+    OneDestinationException,
+    OneSourceException,
+    ValveRole,
+    ValveState,
+    board,
+)
+from openoligo.protocols.compiler import compile_protocol
+from openoligo.protocols.estimator import estimate
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+from openoligo.utils.clock import run_virtual
 
 
 @pytest.fixture
@@ -84,12 +97,177 @@ def test_validate_valve_set(mock_pinout):
 
 
 def test_all_except(mock_pinout):
-    instrument = Instrument(mock_pinout)
+    instrument = type.__call__(Instrument, mock_pinout)
+    controller = Mock(spec=GPIOInterface)
+    for pin, valve in enumerate(mock_pinout.valves().values()):
+        valve.gpio_pin, valve.controller = f"P{pin}", controller
+        valve.is_open = True
+        valve.record_switch.side_effect = lambda state, v=valve: setattr(v, "is_open", state)
+
     instrument.all_except(["I1", "O1"])
 
-    assert instrument.pinout.get("I1").open.called
-    assert not instrument.pinout.get("O1").close.called
+    # The first switch writes every valve in one write, as the pins may have been reset
+    valves = mock_pinout.valves()
+    controller.set_many.assert_called_once_with(
+        {valve.gpio_pin: name in ("I1", "O1") for name, valve in valves.items()}
+    )
+    valves["I1"].record_switch.assert_called_once_with(True)
+    valves["O1"].record_switch.assert_called_once_with(True)
+    valves["I2"].record_switch.assert_called_once_with(False)
+    assert instrument.skew >= 0
+
+    # Later switches only write the valves that change
+    controller.reset_mock()
+    instrument.all_except(["I2", "O1"])
+    controller.set_many.assert_called_once_with(
+        {valves["I1"].gpio_pin: False, valves["I2"].gpio_pin: True}
+    )
+
+
+def test_pinout_columns(column_instrument):
+    pinout = column_instrument.pinout
+    assert pinout.column_outlets() == ["rxn_out", "col2", "col3"]
+    assert pinout.get("COL2").role == ValveRole.TRANSIT
+
+    with pytest.raises(ValueError):
+        type.__call__(Pinout, {}, columns={"col2": Valve(gpio_pin=board.P37)})
+
+
+def test_parse_columns():
+    columns = parse_columns(" col2=P32, col3 = P35,")
+    assert {name: valve.gpio_pin for name, valve in columns.items()} == {
+        "col2": board.P32,
+        "col3": board.P35,
+    }
+    assert all(valve.role == ValveRole.TRANSIT for valve in columns.values())
+    assert parse_columns("") == {}
+    for spec in ["col2", "col2=P99", "=P32"]:
+        with pytest.raises(ValueError):
+            parse_columns(spec)
+
+
+def test_pinout_columns_are_set_once():
+    assert Pinout({}) is default_pinout
+    with pytest.raises(ValueError):
+        Pinout({}, columns=parse_columns("col2=P32"))
+
+
+def test_all_except_with_columns(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "col3", "waste_rxn"])
+    is_open = {
+        name
+        for name, valve in column_instrument.pinout.valves().items()
+        if valve._state == ValveState.OPEN_FLOW
+    }
+    assert is_open == {"a", "branch", "rxn_out", "col3", "waste_rxn"}
+
+
+def test_close_all(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "waste_rxn"])
+    column_instrument.close_all()
+    assert all(
+        valve._state != ValveState.OPEN_FLOW for valve in column_instrument.pinout.valves().values()
+    )
+
+
+def test_route_mask_is_cached(column_instrument):
+    with patch.object(
+        column_instrument, "validate_valve_set", wraps=column_instrument.validate_valve_set
+    ) as validate:
+        mask = column_instrument.route_mask(["A", "branch", "rxn_out", "waste_rxn"])
+        assert column_instrument.route_mask(["waste_rxn", "rxn_out", "branch", "A"]) == mask
+    validate.assert_called_once()
+    names = column_instrument.valve_names
+    assert {name for bit, name in enumerate(names) if mask >> bit & 1} == {
+        "a",
+        "branch",
+        "rxn_out",
+        "waste_rxn",
+    }
+
+
+def test_set_mask_writes_only_changes(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "waste_rxn"])
+    counts = {name: v._switch_count for name, v in column_instrument.pinout.valves().items()}
+
+    column_instrument.all_except(["C", "branch", "rxn_out", "waste_rxn"])
+
+    valves = column_instrument.pinout.valves()
+    switched = {name for name, valve in valves.items() if valve._switch_count != counts[name]}
+    assert switched == {"a", "c"}
+    assert valves["c"]._state == ValveState.OPEN_FLOW
+    assert valves["a"]._state == ValveState.CLOSED_FLOW
+
+
+def test_pinout_indexes(column_instrument):
+    pinout = column_instrument.pinout
+    assert pinout.valves() is pinout.valves()
+    assert pinout.device(pinout.index("COL2")) is pinout.get("col2")
+    assert set(pinout.with_role(ValveRole.OUTLET)) == {"waste", "waste_rxn", "prod"}
+    assert set(pinout.with_role(ValveRole.TRANSIT)) == {"rxn_out", "col2", "col3"}
+    outlets = pinout.indexes_with_role(ValveRole.OUTLET)
+    assert {pinout.device(index) for index in outlets} == {
+        pinout.get(name) for name in pinout.with_role(ValveRole.OUTLET)
+    }
+    with pytest.raises(NoSuchPinInPinout):
+        pinout.index("nope")
+
+
+def test_snapshot_reads_no_pins(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "waste_rxn"])
+    with patch.object(MockGPIO, "value", side_effect=AssertionError("read a pin")):
+        snapshot = column_instrument.snapshot()
+        repr(column_instrument)
+    assert set(snapshot.open_valves()) == {"a", "branch", "rxn_out", "waste_rxn"}
+    assert snapshot.switches["liquid_pressure"] is False
+
+
+def test_verify_before_any_mask_is_set(instrument):
+    assert instrument.verify() == []
+    instrument.close_all()
+    assert instrument.verify() == []
+
+
+def test_verify(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "waste_rxn"])
+    assert column_instrument.verify() == []
+
+    valve = column_instrument.pinout.get("sol")
+    valve.controller.set(valve.gpio_pin, True)  # Behind the instrument's back
+    assert column_instrument.verify() == ["sol"]
+    assert not valve.is_open  # Reading back does not change the state as last set
+
+    mismatches = []
+
+    async def verify_twice():
+        task = asyncio.ensure_future(column_instrument.verify_periodically(1, mismatches.append))
+        await asyncio.sleep(2.5)
+        task.cancel()
+
+    run_virtual(verify_twice())
+    valve.controller.set(valve.gpio_pin, False)
+    assert mismatches == [["sol"], ["sol"]]
+
+
+def test_describing_touches_no_pins(column_instrument):
+    fail = AssertionError("The GPIO was used")
+    with patch("openoligo.hal.devices.get_gpio", side_effect=fail), patch.multiple(
+        MockGPIO, setup_pins=Mock(side_effect=fail), set=Mock(side_effect=fail)
+    ), patch.object(MockGPIO, "set_many", Mock(side_effect=fail)):
+        pinout = type.__call__(
+            Pinout,
+            {"A": Valve(gpio_pin=board.P26), "T": Valve(gpio_pin=board.P16)},
+            columns={"col2": Valve(gpio_pin=board.P32, role=ValveRole.TRANSIT)},
+        )
+        instrument = type.__call__(Instrument, pinout)
+        assert compile_protocol(synthesize_ssdna, instrument, Seq("AT")).duration > 0
+        assert estimate(Seq("AT"), column_instrument).duration > 0
+
 
-    for name in ["I2", "I3", "T1", "T2", "O2", "B1", "B2"]:
-        assert not instrument.pinout.get(name).open.called
-        assert instrument.pinout.get(name).close.called
+def test_setup(column_instrument):
+    column_instrument.all_except(["A", "branch", "rxn_out", "waste_rxn"])
+    with patch.object(MockGPIO, "setup_pins") as setup_pins:
+        column_instrument.setup()
+    pins = [pin for call in setup_pins.call_args_list for pin in call.args[0]]
+    assert sorted(pins) == sorted(d.gpio_pin for d in column_instrument.pinout.pins().values())
+    assert not any(valve.is_open for valve in column_instrument.pinout.valves().values())
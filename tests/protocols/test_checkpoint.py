@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from openoligo.hal.types import ValveState
+from openoligo.protocols.checkpoint import Checkpoint, CheckpointJournal, restore_valves
+
+
+def _checkpoint(task_id, cycle, valves=("gas", "waste")):
+    return Checkpoint(task_id, cycle, "oxidize", valves, 0.0)
+
+
+def test_journal_last(tmp_path):
+    path = str(tmp_path / "checkpoints.jsonl")
+    assert CheckpointJournal(path).last(1) is None
+
+    with CheckpointJournal(path) as journal:
+        journal.append(_checkpoint(1, 1))
+        journal.append(_checkpoint(2, 1))
+        journal.append(_checkpoint(1, 2))
+        assert journal.last(1) == _checkpoint(1, 2)  # Readable before it is synced
+
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"task_id": 1, "cycle": 3, "st')  # Cut short by a crash
+    journal = CheckpointJournal(path)
+    assert journal.last(1) == _checkpoint(1, 2)
+    assert journal.last(2) == _checkpoint(2, 1)
+    assert journal.last(3) is None
+
+
+def test_journal_forgets_tasks_that_are_over(tmp_path):
+    path = str(tmp_path / "checkpoints.jsonl")
+    CheckpointJournal(path).forget(1)  # Nothing to compact yet
+
+    with CheckpointJournal(path) as journal:
+        journal.append(_checkpoint(1, 1))
+        journal.append(_checkpoint(2, 1))
+        journal.forget(1)
+        assert journal.last(1) is None
+        journal.append(_checkpoint(2, 2))  # Appends to the compacted journal
+    with open(path, encoding="utf-8") as file:
+        assert len(file.readlines()) == 2
+    assert CheckpointJournal(path).last(2) == _checkpoint(2, 2)
+
+
+def test_journal_appends_after_a_torn_line(tmp_path):
+    path = tmp_path / "checkpoints.jsonl"
+    path.write_text('{"task_id": 1, "cycle": 3, "st')  # Cut short by a crash
+    with CheckpointJournal(str(path)) as journal:
+        journal.append(_checkpoint(1, 4))
+        assert journal.last(1) == _checkpoint(1, 4)
+
+
+def test_journal_syncs_in_batches(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "checkpoints.jsonl"), sync_every=3)
+    with patch("os.fsync") as fsync:
+        for cycle in range(7):
+            journal.append(_checkpoint(1, cycle))
+        assert fsync.call_count == 2
+        journal.close()
+        assert fsync.call_count == 3
+        journal.close()
+        assert fsync.call_count == 3
+
+
+def test_journal_syncs_old_batches(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "checkpoints.jsonl"), sync_interval=0)
+    with patch("os.fsync") as fsync:
+        journal.append(_checkpoint(1, 1))
+        assert fsync.call_count == 1
+
+
+def test_restore_valves(instrument):
+    def open_valves():
+        valves = instrument.pinout.valves()
+        return {name for name, valve in valves.items() if valve._state == ValveState.OPEN_FLOW}
+
+    restore_valves(instrument, _checkpoint(1, 2, ("gas", "branch", "rxn_out", "waste_rxn")))
+    assert open_valves() == {"gas", "branch", "rxn_out", "waste_rxn"}
+    restore_valves(instrument, _checkpoint(1, 2, ()))
+    assert open_valves() == set()
@@ -0,0 +1,129 @@
+import asyncio
+from itertools import groupby
+
+import pytest
+
+from openoligo.hal.types import OneSourceException, ValveState
+from openoligo.protocols.compiler import (
+    OTHER_STEP,
+    Instruction,
+    compile_protocol,
+    run_plan,
+    run_protocol,
+)
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+from openoligo.steps.flow import dry_all, send_to_waste_rxn, solvent_wash_all
+from openoligo.steps.types import step
+from openoligo.utils import record_waits, run_virtual, wait_async
+
+
+@step
+async def _couple(instrument, seq):
+    """Couple every base of the sequence"""
+    for base in seq:
+        await send_to_waste_rxn(instrument, base)
+        await wait_async(5)
+        await wait_async(1)
+        await dry_all(instrument)
+
+
+async def _protocol(instrument, seq):
+    await wait_async(2)
+    await _couple(instrument, seq)
+
+
+def test_compile_protocol(instrument):
+    plan = compile_protocol(_protocol, instrument, Seq("AT"))
+    assert plan.valves[:3] == ("waste", "waste_rxn", "prod")
+
+    route = ["a", "waste_rxn", "branch", "rxn_out"]
+    assert plan.instructions[0] == Instruction(None, 2, None)
+    assert plan.instructions[1].hold == 6
+    assert plan.instructions[1].step == "_couple"
+    assert sorted(plan.open_valves(plan.instructions[1].mask)) == sorted(route)
+    assert plan.open_valves(plan.instructions[3].mask) == ["waste", "gas"]
+    assert len(plan.instructions) == 7
+    assert plan.duration == 14
+
+
+def test_compile_protocol_is_cached(instrument):
+    plan = compile_protocol(synthesize_ssdna, instrument, Seq("ATCG"))
+    assert compile_protocol(synthesize_ssdna, instrument, Seq("ATCG")) is plan
+    assert compile_protocol(synthesize_ssdna, instrument, Seq("ATCC")) is not plan
+
+
+def test_compiled_protocol_matches_its_waits(instrument):
+    waits = []
+    with record_waits(waits.append):
+        asyncio.run(synthesize_ssdna(instrument, Seq("ATCG")))
+    plan = compile_protocol(synthesize_ssdna, instrument, Seq("ATCG"))
+    assert plan.duration == sum(waits)
+    steps = [step for step, _ in groupby(i.step for i in plan.instructions if i.step)]
+    assert steps[:4] == ["detritylate", "couple", "cap", "oxidize"]
+
+
+def test_compile_invalid_protocol(instrument):
+    async def no_outlet(instrument, seq):
+        instrument.all_except(["sol", "gas", "waste"])
+
+    async def sleeps(instrument, seq):
+        await asyncio.sleep(0)
+
+    with pytest.raises(OneSourceException):
+        compile_protocol(no_outlet, instrument, Seq("A"))
+    with pytest.raises(RuntimeError):
+        compile_protocol(sleeps, instrument, Seq("A"))
+
+
+def test_run_plan(instrument):
+    plan = compile_protocol(_protocol, instrument, Seq("AT"))
+    waits = []
+    with record_waits(waits.append):
+        asyncio.run(run_plan(instrument, plan))
+    assert waits == [2, 6, 6]
+
+    valves = instrument.pinout.valves()
+    is_open = {name for name, valve in valves.items() if valve._state == ValveState.OPEN_FLOW}
+    assert is_open == {"waste", "gas"}
+
+    with record_waits(waits.append):
+        asyncio.run(run_protocol(_protocol, instrument, Seq("AT")))
+    assert waits == [2, 6, 6] * 2
+
+
+def test_resume_plan(instrument):
+    seq = Seq("ATCG")
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    assert len(plan.cycles) == len(seq)
+
+    checkpoints = []
+    with record_waits(lambda _: None):
+        asyncio.run(run_plan(instrument, plan, on_cycle=lambda *args: checkpoints.append(args)))
+    assert [cycle for cycle, _, _ in checkpoints] == [1, 2, 3, 4]
+    assert {step for _, step, _ in checkpoints} == {"oxidize"}
+    assert set(checkpoints[0][2]) == {"gas", "branch", "rxn_out", "waste_rxn"}
+
+    waits = []
+    with record_waits(waits.append):
+        asyncio.run(run_plan(instrument, plan, 2))
+    start = plan.cycles[1]
+    assert sum(waits) == sum(instruction.hold for instruction in plan.instructions[start:])
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_plan(instrument, plan, 5))
+
+
+def test_run_plan_other_pinout(instrument, column_instrument):
+    plan = compile_protocol(synthesize_ssdna, column_instrument, Seq("AT"))
+    with pytest.raises(ValueError):
+        asyncio.run(run_plan(instrument, plan))
+
+
+def test_run_plan_report(instrument):
+    plan = compile_protocol(synthesize_ssdna, instrument, Seq("AT"))
+    report = run_virtual(run_plan(instrument, plan))
+    assert report.planned == plan.duration
+    assert report.elapsed == plan.duration
+    assert set(report.lateness) >= {"detritylate", "couple", "cap", "oxidize", OTHER_STEP}
+    assert max(report.lateness.values()) == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from openoligo.hal.types import ValveRole
+from openoligo.protocols.compiler import Instruction, Plan, compile_protocol
+from openoligo.protocols.estimator import OTHER_STEP, estimate, estimate_plan, estimate_queue
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.protocols.timing import DEFAULT_TIMINGS
+from openoligo.seq import Seq
+from openoligo.utils import get_clock, run_virtual
+
+
+def test_estimate_plan():
+    plan = Plan(
+        ("sol", "gas", "waste"),
+        (
+            Instruction(None, 1),
+            Instruction(0b101, 10, "wash"),
+            Instruction(0b110, 0, "dry"),
+            Instruction(0b110, 5, "dry"),
+            Instruction(0b101, 2),
+        ),
+    )
+    roles = {"sol": ValveRole.INLET, "gas": ValveRole.INLET, "waste": ValveRole.OUTLET}
+    result = estimate_plan(plan, roles)
+
+    assert result.duration == 18
+    assert dict(result.steps) == {OTHER_STEP: 3, "wash": 10, "dry": 5}
+    assert dict(result.actuations) == {"sol": 3, "gas": 2, "waste": 1}
+    assert dict(result.open_time) == {"sol": 12, "gas": 5, "waste": 17}
+    assert dict(result.reagent_time) == {"sol": 12, "gas": 5}
+    assert estimate_plan(plan).reagent_time == {}
+
+
+def test_estimate_is_exact(instrument):
+    seq = Seq("ATCGA")
+
+    async def run():
+        clock = get_clock()
+        start = clock.now()
+        await synthesize_ssdna(instrument, seq)
+        return clock.now() - start
+
+    result = estimate(seq, instrument)
+    assert result.duration == run_virtual(run())
+    assert result.duration == compile_protocol(synthesize_ssdna, instrument, seq).duration
+    assert result.steps["detritylate"] == 50 * len(seq)
+    fill, prime = DEFAULT_TIMINGS.fill, DEFAULT_TIMINGS.prime
+    # Detritylation fills the columns with deb, primed once and kept primed, then deprotection
+    # primes it again and flows it while it incubates
+    deprotect = DEFAULT_TIMINGS.steps["deprotect"]
+    assert result.reagent_time["deb"] == 2 * prime + fill * len(seq) + deprotect
+    assert result.reagent_time["act"] == fill * len(seq)  # Follows the amidite to couple
+    assert result.reagent_time["a"] == 2 * (prime + fill)  # Not used for 3 cycles
+    assert result.reagent_time["cap2"] == fill * len(seq)
+    assert "waste" not in result.reagent_time
+    assert estimate(seq, instrument) is result
+
+
+def test_estimate_queue(instrument):
+    seqs = [Seq("ATCG"), Seq("AT"), Seq("ATCG")]
+    times = estimate_queue(seqs, instrument)
+    durations = [estimate(seq, instrument).duration for seq in seqs]
+    assert times[0] == (0, durations[0])
+    assert times[2][1] == pytest.approx(sum(durations))
+    assert [start for start, _ in times[1:]] == [finish for _, finish in times[:-1]]
+    assert estimate_queue([], instrument) == []
+
+    times = estimate_queue([Seq("ATCG"), Seq("AUGC"), Seq("AT")], instrument)
+    assert times[1] is None
+    assert times[2][0] == times[0][1]
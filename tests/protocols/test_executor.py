@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from openoligo.protocols.compiler import compile_protocol
+from openoligo.protocols.executor import PlanExecutor, measure_jitter, queued_logging
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+from openoligo.utils import run_virtual
+
+
+def test_executor_runs_on_its_thread():
+    async def where():
+        return threading.get_ident()
+
+    assert asyncio.run(PlanExecutor().run(where)) != threading.get_ident()
+
+
+def test_executor_raises():
+    async def fails():
+        raise KeyError("valve")
+
+    with pytest.raises(KeyError):
+        asyncio.run(PlanExecutor().run(fails))
+
+
+def test_executor_hands_off():
+    executor = PlanExecutor()
+    threads = []
+
+    async def saved(value):
+        threads.append((value, threading.get_ident()))
+
+    async def work():
+        executor.hand_off(saved, 1)
+        executor.hand_off(lambda value: threads.append((value, threading.get_ident())), 2)
+        return threading.get_ident()
+
+    timing_thread = asyncio.run(executor.run(work))
+    assert sorted(value for value, _ in threads) == [1, 2]
+    assert timing_thread not in {thread for _, thread in threads}
+
+
+def test_executor_runs_plan(instrument):
+    seq = Seq("ATC")
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    cycles = []
+
+    def on_cycle(cycle, step, valves):
+        cycles.append((cycle, threading.get_ident()))
+
+    report = run_virtual(PlanExecutor().run_plan(instrument, plan, on_cycle=on_cycle))
+    assert report.elapsed == plan.duration
+    assert [cycle for cycle, _ in cycles] == [1, 2, 3]
+    assert {thread for _, thread in cycles} == {threading.get_ident()}
+
+
+def test_queued_logging():
+    logger = logging.getLogger("test_queued_logging")
+    logger.propagate = False
+    threads = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            threads.append((record.getMessage(), threading.get_ident()))
+
+    handler = Handler()
+    logger.addHandler(handler)
+    with queued_logging(logger):
+        assert handler not in logger.handlers
+        logger.warning("valve %s", "act")
+    assert logger.handlers == [handler]
+    assert threads[0][0] == "valve act"
+    assert threads[0][1] != threading.get_ident()
+
+
+def test_measure_jitter(instrument):
+    report = asyncio.run(measure_jitter(instrument, "sol", period=0.005, samples=40))
+    assert report.samples == 40
+    assert 0 <= report.mean <= report.p99 <= report.worst
+    assert report.worst < 0.1  # Far from the loop blocking every millisecond
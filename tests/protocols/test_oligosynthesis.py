@@ -1,11 +1,16 @@
 import asyncio
 from unittest.mock import AsyncMock, patch  # , call
 
+import pytest
+
 from openoligo.hal.instrument import Instrument
-from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.protocols.compiler import compile_protocol
+from openoligo.protocols.estimator import estimate
+from openoligo.protocols.oligosynthesis import synthesize_batch, synthesize_ssdna
+from openoligo.protocols.timing import DEFAULT_TIMINGS
 from openoligo.seq import Seq
 from openoligo.steps.flow import send_to_waste_rxn
-from openoligo.utils import wait_async
+from openoligo.utils import run_virtual, wait_async
 
 
 def test_synthesize():
@@ -17,7 +22,7 @@ def test_synthesize():
         mock_seq = Seq("ATGC")  # or use a mock, depending on Seq class complexity
 
         # Running the function
-        asyncio.run(synthesize_ssdna(mock_instrument, mock_seq))
+        run_virtual(synthesize_ssdna(mock_instrument, mock_seq))
 
         ## Checking that the function calls the correct functions in the correct order
         # mock_wait_async.assert_has_calls(
@@ -25,3 +30,39 @@ def test_synthesize():
         #        call(mock_instrument, "send_to_waste_rxn", "act")
         #    ]
         # )
+
+
+def test_synthesize_batch(column_instrument):
+    seqs = (Seq("ATCG"), Seq("ATGG"), Seq("AT"))
+    plan = compile_protocol(synthesize_batch, column_instrument, seqs)
+    routes = [set(plan.open_valves(i.mask)) for i in plan.instructions if i.mask is not None]
+
+    assert {"act", "branch", "rxn_out", "col2", "col3", "waste_rxn"} in routes
+    assert {"c", "branch", "rxn_out", "waste_rxn"} in routes
+    assert {"g", "branch", "col2", "waste_rxn"} in routes
+    assert {"oxi", "branch", "rxn_out", "col2", "waste_rxn"} in routes
+
+    result = estimate(seqs, column_instrument, synthesize_batch)
+    # One per distinct base per cycle, the amidite fills the columns before the activator
+    assert result.steps["couple"] == (50 + DEFAULT_TIMINGS.fill) * (1 + 1 + 2 + 1)
+    assert result.steps["detritylate"] == 50 * 4
+
+    alone = sum(estimate(seq, column_instrument).duration for seq in seqs)
+    assert result.duration < alone / 2
+
+
+def test_synthesize_batch_on_too_few_columns(instrument):
+    with pytest.raises(ValueError):
+        compile_protocol(synthesize_batch, instrument, (Seq("AT"), Seq("GC")))
+
+
+def test_reagents_fill_the_columns(instrument):
+    plan = compile_protocol(synthesize_ssdna, instrument, Seq("AT"))
+    reagents = {"act", "a", "t", "cap1", "cap2", "oxi", "clde", "deb"}
+    deliveries = [
+        (valves & reagents, hold)
+        for valves, hold in ((set(plan.open_valves(i.mask)), i.hold) for i in plan.instructions)
+        if "rxn_out" in valves and valves & reagents
+    ]
+    assert len(deliveries) == 2 * 6 + 2
+    assert all(hold >= DEFAULT_TIMINGS.fill for _, hold in deliveries)
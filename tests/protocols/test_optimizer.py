@@ -0,0 +1,161 @@
+import pytest
+
+from openoligo.hal.types import ValveRole
+from openoligo.protocols.compiler import Instruction, Plan, compile_protocol
+from openoligo.protocols.optimizer import OptimizerOptions, optimize, optimize_plan
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+
+ROLES = {
+    "sol": ValveRole.INLET,
+    "gas": ValveRole.INLET,
+    "act": ValveRole.INLET,
+    "oxi": ValveRole.INLET,
+    "waste": ValveRole.OUTLET,
+}
+
+PLAN = Plan(
+    ("sol", "gas", "act", "oxi", "waste"),
+    (
+        Instruction(None, 1),
+        Instruction(0b10100, 50, "detritylate"),
+        Instruction(0b10001, 10),
+        Instruction(0b10010, 0),
+        Instruction(0b10010, 0),
+        Instruction(0b11000, 45, "oxidize"),
+        Instruction(0b11000, 5, "oxidize"),
+        Instruction(0b10001, 10),
+    ),
+)
+
+
+def test_optimize_plan_merges():
+    result = optimize_plan(PLAN, ROLES)
+    assert result.valves == PLAN.valves
+    assert result.duration == PLAN.duration
+    assert result.instructions == (
+        Instruction(None, 1),
+        Instruction(0b10100, 50, "detritylate"),
+        Instruction(0b10001, 10),
+        Instruction(0b10010, 0),
+        Instruction(0b11000, 50, "oxidize"),
+        Instruction(0b10001, 10),
+    )
+
+
+def test_optimize_plan_drops_zero_holds():
+    plan = Plan(
+        PLAN.valves,
+        (
+            Instruction(0b10001, 10),
+            Instruction(0b10000, 0),  # Opens no inlet
+            Instruction(0b10100, 0),  # Reagent route, kept
+            Instruction(0b10100, 0),  # Already set
+            Instruction(0b10010, 0),  # Gas dry, kept
+            Instruction(0b11000, 50, "oxidize"),
+        ),
+    )
+    options = OptimizerOptions(merge_identical=False, drop_zero_holds=True)
+    assert optimize_plan(plan, ROLES, options).instructions == (
+        Instruction(0b10001, 10),
+        Instruction(0b10100, 0),
+        Instruction(0b10010, 0),
+        Instruction(0b11000, 50, "oxidize"),
+    )
+
+
+def test_optimize_plan_keeps_zero_hold_before_hold_only():
+    plan = Plan(("sol", "waste"), (Instruction(0b10, 0), Instruction(None, 2)))
+    options = OptimizerOptions(drop_zero_holds=True)
+    assert optimize_plan(plan, ROLES, options).instructions == (Instruction(0b10, 2),)
+
+
+def test_optimize_plan_disabled():
+    options = OptimizerOptions(merge_identical=False, drop_zero_holds=False)
+    assert optimize_plan(PLAN, ROLES, options) == PLAN
+
+
+def test_optimize_plan_skips_compatible_washes():
+    options = OptimizerOptions(compatible=frozenset({("act", "oxi")}))
+    result = optimize_plan(PLAN, ROLES, options)
+    assert result.instructions == (
+        Instruction(None, 1),
+        Instruction(0b10100, 50, "detritylate"),
+        Instruction(0b11000, 50, "oxidize"),
+        Instruction(0b10001, 10),
+    )
+
+    reverse = OptimizerOptions(compatible=frozenset({("oxi", "act")}))
+    assert optimize_plan(PLAN, ROLES, reverse) == optimize_plan(PLAN, ROLES)
+
+
+def test_optimize(instrument):
+    seq = Seq("ATCG")
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+
+    optimized, report = optimize(synthesize_ssdna, instrument, seq)
+    assert optimized == plan  # Every state of the plan delivers something
+    assert report.time_saved == 0
+    assert report.instructions_before == report.instructions_after == len(plan.instructions)
+
+    seq = Seq("TTTT")  # The same base is not primed again, so deb is followed by T
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    options = OptimizerOptions(compatible=frozenset({("deb", "T")}))
+    optimized, report = optimize(synthesize_ssdna, instrument, seq, options)
+    assert report.time_saved > 0
+    assert optimized.duration == pytest.approx(plan.duration - report.time_saved)
+    assert report.time_saved_per_base == pytest.approx(report.time_saved / len(seq))
+
+
+def test_skipping_washes_keeps_the_steps(instrument):
+    def step_holds(plan):
+        holds = {}
+        for instruction in plan.instructions:
+            holds[instruction.step] = holds.get(instruction.step, 0) + instruction.hold
+        return holds
+
+    seq = Seq("TTT")
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    options = OptimizerOptions(compatible=frozenset({("DEB", "t")}))
+    optimized, report = optimize(synthesize_ssdna, instrument, seq, options)
+    assert report.time_saved > 0
+    before, after = step_holds(plan), step_holds(optimized)
+    for step in ["detritylate", "couple", "cap", "oxidize"]:
+        assert after[step] == before[step]
+    assert after[None] == before[None] - report.time_saved
+    assert sum(not i.mask for i in optimized.instructions) == sum(
+        not i.mask for i in plan.instructions
+    )
+
+
+def test_optimize_keeps_cycles(instrument):
+    seq = Seq("ATCG")
+    optimized, _ = optimize(synthesize_ssdna, instrument, seq)
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    assert len(optimized.cycles) == len(seq)
+    for end, optimized_end in zip(plan.cycles, optimized.cycles):
+        before = sum(i.hold for i in plan.instructions[:end])
+        assert sum(i.hold for i in optimized.instructions[:optimized_end]) == before
+
+
+def test_optimize_keeps_reagent_deliveries(instrument):
+    seq = Seq("AT")
+    valves = instrument.pinout.valves()
+    inlets = {name for name, valve in valves.items() if valve.role == ValveRole.INLET}
+
+    def deliveries(plan):
+        routes = [i.mask for i in plan.instructions if i.mask is not None]
+        routes = [
+            mask for index, mask in enumerate(routes) if index == 0 or routes[index - 1] != mask
+        ]
+        return [
+            {name for bit, name in enumerate(plan.valves) if mask >> bit & 1 and name in inlets}
+            for mask in routes
+        ]
+
+    plan = compile_protocol(synthesize_ssdna, instrument, seq)
+    optimized, report = optimize(
+        synthesize_ssdna, instrument, seq, OptimizerOptions(drop_zero_holds=True)
+    )
+    assert report.time_saved == 0
+    assert [d for d in deliveries(optimized) if d] == [d for d in deliveries(plan) if d]
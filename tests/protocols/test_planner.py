@@ -0,0 +1,66 @@
+import pytest
+
+from openoligo.protocols.planner import PlannedCycle, PrefixTrie, plan_batch
+from openoligo.seq import Seq
+
+
+def test_prefix_trie_cycles():
+    trie = PrefixTrie([Seq("ATCG"), Seq("ATGG"), Seq("AT")])
+    assert len(trie) == 3
+    assert trie[1] == Seq("ATGG")
+    assert trie.cycles() == [
+        PlannedCycle("A", (0, 1, 2)),
+        PlannedCycle("T", (0, 1, 2)),
+        PlannedCycle("G", (1,)),
+        PlannedCycle("G", (1,)),
+        PlannedCycle("C", (0,)),
+        PlannedCycle("G", (0,)),
+    ]
+
+
+def test_prefix_trie_cycles_follow_each_sequence():
+    seqs = [Seq("ATCGATCG"), Seq("ATCGTT"), Seq("A5mCG"), Seq("ATCGATCC")]
+    cycles = PrefixTrie(seqs).cycles()
+    for column, seq in enumerate(seqs):
+        assert [c.amidite for c in cycles if column in c.columns] == list(seq)
+
+
+def test_prefix_trie_groups_deepest_first():
+    trie = PrefixTrie(map(Seq, ["ATCGATCG", "GGGA", "ATCA", "ATCGTTTT", "GGGT"]))
+    assert trie.groups(2) == [[0, 3], [1, 4], [2]]
+    assert trie.groups(3) == [[2, 0, 3], [1, 4]]
+
+
+def test_plan_batch():
+    plan = plan_batch(["ATCGATCG", "GGGA", "ATCA", Seq("ATCGTTTT"), "GGGT"], 2)
+    assert plan.columns == 2
+    assert [group.indices for group in plan.groups] == [(0, 3), (1, 4), (2,)]
+    assert plan.solo_cycles == 28
+    assert plan.planned_cycles == 21
+    assert plan.cycle_savings == 7
+
+    group = plan.groups[0]
+    assert group.shared_cycles == 4
+    assert group.cycle_savings == 4
+    assert [seq.seq for seq in group.seqs] == ["ATCGATCG", "ATCGTTTT"]
+
+
+def test_plan_batch_single_column():
+    plan = plan_batch(["ATCG", "ATCG", "GGCC"], 1)
+    assert len(plan.groups) == 3
+    assert plan.cycle_savings == 0
+
+
+def test_plan_batch_identical_sequences():
+    plan = plan_batch(["ATCG"] * 4, 4)
+    assert plan.groups[0].shared_cycles == 4
+    assert plan.planned_cycles == 4
+    assert plan.cycle_savings == 12
+
+
+def test_plan_batch_errors():
+    with pytest.raises(ValueError):
+        plan_batch(["ATCG"], 0)
+    with pytest.raises(ValueError):
+        plan_batch(["ATXG"], 2)
+    assert plan_batch([], 2).groups == ()
@@ -0,0 +1,45 @@
+from functools import partial
+from types import MappingProxyType
+
+from openoligo.protocols.compiler import compile_protocol
+from openoligo.protocols.estimator import estimate
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.protocols.timing import DEFAULT_TIMINGS, TimingTable, seq_category
+from openoligo.seq import Phosphoramidite, Seq, SeqCategory
+
+
+def test_seq_category():
+    assert seq_category(Seq("ATCG").amidites) == SeqCategory.DNA
+    assert seq_category(Seq("AUCG").amidites) == SeqCategory.RNA
+    assert seq_category(Seq("AT5mCG").amidites) == SeqCategory.MODIFIED
+    assert seq_category([]) == SeqCategory.DNA
+
+
+def test_coupling_time():
+    assert DEFAULT_TIMINGS.coupling_time(Phosphoramidite.A, SeqCategory.DNA) == 50
+    assert DEFAULT_TIMINGS.coupling_time(Phosphoramidite.A, SeqCategory.RNA) == 360
+    assert DEFAULT_TIMINGS.coupling_time(Phosphoramidite.GALNAC, SeqCategory.DNA) == 300
+
+    table = TimingTable(coupling=MappingProxyType({SeqCategory.DNA: 30}))
+    assert table.coupling_time(Phosphoramidite.U, SeqCategory.RNA) == 30
+
+
+def test_protocol_reads_timings(instrument):
+    seq = Seq("ATCG")
+    slow = TimingTable(coupling=MappingProxyType({SeqCategory.DNA: 100}))
+    protocol = partial(synthesize_ssdna, timings=slow)
+
+    plan = compile_protocol(protocol, instrument, seq)
+    assert compile_protocol(protocol, instrument, seq) is plan
+    default = compile_protocol(synthesize_ssdna, instrument, seq)
+    assert plan.duration - default.duration == 50 * len(seq)
+
+
+def test_repeated_bases_are_not_primed_again(instrument):
+    homopolymer = estimate(Seq("TTTTT"), instrument)
+    alternating = estimate(Seq("TATAT"), instrument)
+
+    fill, prime = DEFAULT_TIMINGS.fill, DEFAULT_TIMINGS.prime
+    assert homopolymer.reagent_time["t"] == prime + 5 * fill
+    assert alternating.reagent_time["t"] == 3 * (prime + fill)
+    assert homopolymer.duration <= alternating.duration
@@ -0,0 +1,23 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from openoligo.api.models import SynthesisQueue, TaskStatus
+from openoligo.protocols.checkpoint import Checkpoint, CheckpointJournal
+from openoligo.scripts.runner import run_task
+
+
+@pytest.mark.asyncio
+async def test_failed_task_is_marked_failed(db, instrument, tmp_path, monkeypatch):
+    monkeypatch.setenv("OO_TMP_DIR", str(tmp_path))
+    task = await SynthesisQueue.create(sequence="ATCG", status=TaskStatus.IN_PROGRESS)
+    executor = MagicMock(run_plan=AsyncMock(side_effect=RuntimeError("valve stuck")))
+
+    journal = CheckpointJournal(str(tmp_path / "checkpoints.jsonl"))
+    journal.append(Checkpoint(task.id, 1, "oxidize", (), 0.0))
+
+    with patch("openoligo.scripts.runner.update_task_status") as update_task_status:
+        await run_task(instrument, task, journal, executor)
+    update_task_status.assert_not_called()  # Marked failed once, by set_failed_now
+    assert (await SynthesisQueue.get(id=task.id)).status == TaskStatus.FAILED
+    assert journal.last(task.id) is None
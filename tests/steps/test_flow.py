@@ -1,12 +1,19 @@
 import asyncio
+from functools import partial
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 import openoligo.steps.flow as flowmodule
+from openoligo.protocols.compiler import compile_protocol
 from openoligo.steps.flow import (
+    clean_reaction_branch,
+    clean_reagent_branch,
     dry,
     dry_all,
+    incubate,
+    PrimedLines,
+    prime,
     send_to_prod,
     send_to_waste_rxn,
     solvent_wash,
@@ -54,7 +61,7 @@ def test_solvent_wash_all():
     with patch("openoligo.steps.flow.solvent_wash", new=solvent_wash):
         asyncio.run(solvent_wash_all(instrument))
 
-    solvent_wash.assert_any_call(instrument, FlowBranch.REACTION)
+    solvent_wash.assert_any_call(instrument, FlowBranch.REACTION, columns=())
     solvent_wash.assert_any_call(instrument, FlowBranch.REAGENTS)
 
 
@@ -81,5 +88,93 @@ def test_dry_all():
     with patch("openoligo.steps.flow.dry", new=dry):
         asyncio.run(dry_all(instrument))
 
-    dry.assert_any_call(instrument, FlowBranch.REACTION)
+    dry.assert_any_call(instrument, FlowBranch.REACTION, columns=())
     dry.assert_any_call(instrument, FlowBranch.REAGENTS)
+
+
+def test_flow_through_columns():
+    instrument = MagicMock()
+    columns = ["rxn_out", "col2"]
+
+    asyncio.run(send_to_waste_rxn(instrument, "act", columns))
+    instrument.all_except.assert_called_with(["act", "branch", "rxn_out", "col2", "waste_rxn"])
+
+    asyncio.run(solvent_wash(instrument, FlowBranch.REACTION, 0, columns))
+    instrument.all_except.assert_called_with(["sol", "rxn_out", "col2", "branch", "waste_rxn"])
+
+    asyncio.run(dry(instrument, FlowBranch.REACTION, ["col2"]))
+    instrument.all_except.assert_called_with(["gas", "col2", "branch", "waste_rxn"])
+
+
+def test_prime():
+    instrument = MagicMock()
+    asyncio.run(prime(instrument, "oxi"))
+    instrument.all_except.assert_called_once_with(["oxi", "waste"])
+
+
+def test_clean_reaction_branch():
+    instrument = MagicMock()
+    asyncio.run(clean_reaction_branch(instrument, ["col2"]))
+    assert instrument.all_except.call_args_list == [
+        ((["sol", "col2", "branch", "waste_rxn"],),),
+        ((["gas", "col2", "branch", "waste_rxn"],),),
+    ]
+
+
+def test_incubate_without_operations():
+    instrument = MagicMock()
+    with patch("openoligo.steps.flow.wait_async", new_callable=AsyncMock) as wait_async:
+        asyncio.run(incubate(instrument, 50))
+    wait_async.assert_awaited_once_with(50)
+    instrument.all_except.assert_not_called()
+    instrument.close_all.assert_not_called()
+
+
+def test_incubate_overlaps_reagent_branch(instrument):
+    async def protocol(instrument, _seq):
+        await send_to_waste_rxn(instrument, "act")
+        await incubate(instrument, 50, clean_reagent_branch("oxi"), fill=10)
+
+    plan = compile_protocol(protocol, instrument, None)
+    routes = [(set(plan.open_valves(mask)), hold) for mask, hold, _ in plan.instructions]
+    assert routes == [
+        ({"act", "branch", "rxn_out", "waste_rxn"}, 10),  # The columns fill before sealing
+        ({"sol", "waste"}, 10),
+        ({"gas", "waste"}, 0),
+        ({"oxi", "waste"}, 0),
+        (set(), 30),
+    ]
+    assert plan.duration == 50
+
+
+def test_incubate_rejects_reaction_branch(instrument):
+    async def protocol(instrument, _seq):
+        await incubate(instrument, 50, [partial(solvent_wash, branch=FlowBranch.REACTION)])
+
+    with pytest.raises(ValueError):
+        compile_protocol(protocol, instrument, None)
+
+
+def test_incubate_overrun(instrument):
+    async def protocol(instrument, _seq):
+        await incubate(instrument, 5, clean_reagent_branch())
+
+    assert compile_protocol(protocol, instrument, None).duration == 10
+
+
+def test_primed_lines():
+    lines = PrimedLines()
+    assert lines.claim("t")
+    assert not lines.claim("t")
+    lines.next_cycle()
+    assert not lines.claim("t")  # Used in the previous cycle
+    lines.next_cycle()
+    lines.next_cycle()
+    assert lines.claim("t")  # Unused for a whole cycle
+
+
+def test_clean_reagent_branch_skips_primed_lines():
+    lines = PrimedLines()
+    assert len(clean_reagent_branch("t", 5, lines)) == 3
+    assert len(clean_reagent_branch("t", 5, lines)) == 2
+    assert len(clean_reagent_branch()) == 2
@@ -1,6 +1,20 @@
+import pickle
+
 import pytest
 
-from openoligo.seq import Seq, is_valid_dna
+from openoligo.seq import (
+    Phosphoramidite,
+    Seq,
+    SeqCategory,
+    Tokenizer,
+    builtin_alphabet,
+    default_tokenizer,
+    is_valid_dna,
+    parse_many,
+    parse_sequence,
+    sequence_properties,
+    validate_many,
+)
 
 
 def test_is_valid_dna():
@@ -13,7 +27,8 @@ def test_is_valid_dna():
 def test_Seq_initialization():
     seq = Seq("ATCG")
     assert seq.seq == "ATCG"
-    assert seq.index == 0
+    assert Seq("atcg").seq == "ATCG"
+    assert Seq("AT5mCM5C-GalNAc").seq == "AT5mC5mC-GalNAc"
 
     with pytest.raises(ValueError):
         Seq("ABCDE")
@@ -21,17 +36,19 @@ def test_Seq_initialization():
 
 def test_Seq_iter():
     seq = Seq("ATCG")
-    assert iter(seq) == seq
+    assert list(seq) == ["A", "T", "C", "G"]
+    assert list(seq) == ["A", "T", "C", "G"], "A Seq can be iterated more than once"
+    assert list(Seq("A5mCU")) == ["A", "5mC", "U"]
 
 
 def test_Seq_next():
-    seq = Seq("ATCG")
-    assert next(seq) == "A"
-    assert next(seq) == "T"
-    assert next(seq) == "C"
-    assert next(seq) == "G"
+    it = iter(Seq("ATCG"))
+    assert next(it) == "A"
+    assert next(it) == "T"
+    assert next(it) == "C"
+    assert next(it) == "G"
     with pytest.raises(StopIteration):
-        next(seq)
+        next(it)
 
 
 def test_Seq_repr():
@@ -50,5 +67,192 @@ def test_Seq_getitem():
     assert seq[1] == "T"
     assert seq[2] == "C"
     assert seq[3] == "G"
+    assert seq[-1] == "G"
     with pytest.raises(IndexError):
         seq[4]
+
+    modified = Seq("A5mC-GalNAcU")
+    assert modified[1] == "5mC"
+    assert modified[-2] == "-GalNAc"
+
+
+def test_Seq_slice():
+    seq = Seq("ATCGGCTAAT")
+    assert seq[2:6] == Seq("CGGC")
+    assert seq[2:6][1:3] == Seq("GG")
+    assert seq[::-1] == Seq("TAATCGGCTA")
+    assert seq[8:100] == Seq("AT")
+    assert len(seq[5:2]) == 0
+    assert Seq("A5mCGU")[1:3] == Seq("5mCG")
+
+
+def test_Seq_immutable():
+    seq = Seq("ATCG")
+    with pytest.raises(AttributeError):
+        seq.seq = "GGGG"
+    with pytest.raises(AttributeError):
+        seq._length = 2
+    with pytest.raises(AttributeError):
+        seq.other = 2
+
+
+def test_Seq_eq_and_hash():
+    assert Seq("ATCG") == Seq("atcg")
+    assert Seq("ATCG") != Seq("ATCC")
+    assert Seq("ATCG") != Seq("ATC")
+    assert Seq("ATCG") != "ATCG"
+    assert hash(Seq("ATCG")) == hash(Seq("ATCG"))
+    assert hash(Seq("TATCGT")[1:5]) == hash(Seq("ATCG"))
+    assert len({Seq("ATCG"), Seq("ATCG"), Seq("5mCG"), Seq("5mCG")}) == 2
+
+
+def test_Seq_pickle():
+    seq = Seq("AT5mCG")
+    assert pickle.loads(pickle.dumps(seq)) == seq
+
+
+def test_parse_sequence():
+    P = Phosphoramidite
+    assert parse_sequence("AAT5mC5mCAT5mC-GalNAc") == [
+        P.A,
+        P.A,
+        P.T,
+        P.M5C,
+        P.M5C,
+        P.A,
+        P.T,
+        P.M5C,
+        P.GALNAC,
+    ]
+    assert parse_sequence("atcgU") == [P.A, P.T, P.C, P.G, P.U]
+    assert parse_sequence("AM5CGalNAc") == [P.A, P.M5C, P.GALNAC]
+    assert parse_sequence("") == []
+
+    with pytest.raises(ValueError):
+        parse_sequence("ATXG")
+    with pytest.raises(ValueError):
+        parse_sequence("A5m")
+
+
+def test_parse_many():
+    P = Phosphoramidite
+    assert parse_many(["AT", "5mCG"]) == [[P.A, P.T], [P.M5C, P.G]]
+
+
+def test_tokenizer_longest_match():
+    tokenizer = Tokenizer({"A": 1, "AB": 2, "ABC": 3, "B": 4, "C": 5})
+    assert tokenizer.tokenize("ABCAB") == [3, 2]
+    assert tokenizer.tokenize("ABBC") == [2, 4, 5]
+
+    with pytest.raises(ValueError):
+        Tokenizer({"": 1})
+
+
+def test_validate_many():
+    assert validate_many(["ATCG", "atcg", "GG"]) == [None, None, None]
+    assert validate_many(["ATCG", "AUCG", "AT\nCG", "ATCé"]) == [
+        None,
+        "Invalid DNA sequence",
+        "Invalid DNA sequence",
+        "Invalid DNA sequence",
+    ]
+    assert validate_many(["AUCG", "ATCG"], SeqCategory.RNA) == [None, "Invalid RNA sequence"]
+    assert validate_many(["A5mC-GalNAc", "A5m"], SeqCategory.MODIFIED)[0] is None
+    assert validate_many(["A5mC-GalNAc", "A5m"], SeqCategory.MODIFIED)[1].startswith(
+        "Invalid sequence"
+    )
+    assert validate_many([]) == []
+
+
+def test_validate_many_lengths():
+    assert validate_many(["AT", "ATCG", "ATCGATCG"], min_length=3, max_length=5) == [
+        "Sequence must be at least 3 bases long",
+        None,
+        "Sequence must be at most 5 bases long",
+    ]
+    # Modified sequences are measured in amidites, not characters
+    assert validate_many(["5mC5mC5mC"], SeqCategory.MODIFIED, max_length=3) == [None]
+
+
+def test_validate_many_categories():
+    assert validate_many(
+        ["ATCG", "AUCG", "5mCG"], [SeqCategory.DNA, SeqCategory.RNA, SeqCategory.MODIFIED]
+    ) == [None, None, None]
+
+    with pytest.raises(ValueError):
+        validate_many(["ATCG", "AUCG"], [SeqCategory.DNA])
+
+
+@pytest.mark.parametrize(
+    "sequence,expected",
+    [
+        ("ATCG", "CGAT"),
+        ("AAACCG", "CGGTTT"),
+        ("", ""),
+        ("AUGC", "GCAU"),
+        ("A5mCTU", "AAGT"),
+        ("5mCAU", "AUG"),
+    ],
+)
+def test_Seq_reverse_complement(sequence, expected):
+    assert Seq(sequence).reverse_complement() == Seq(expected)
+
+
+def test_Seq_reverse_complement_slices():
+    seq = Seq("GATTACAGATTACA")
+    for start in range(len(seq)):
+        for stop in range(start, len(seq) + 1):
+            expected = Seq(seq.seq[start:stop]).reverse_complement()
+            assert seq[start:stop].reverse_complement() == expected
+
+
+def test_Seq_reverse_complement_cached():
+    seq = Seq("ATTGC")
+    assert seq.reverse_complement() is seq.reverse_complement()
+    assert seq.reverse_complement().reverse_complement() is seq
+
+    modified = Seq("A5mC")
+    assert modified.reverse_complement().reverse_complement() == Seq("AC")
+
+    with pytest.raises(ValueError):
+        Seq("A-GalNAc").reverse_complement()
+
+
+def test_Seq_properties():
+    P = Phosphoramidite
+    seq = Seq("ATCG")
+    assert seq.cycle_count == 4
+    assert seq.amidite_counts[P.A] == 1
+    assert seq.amidite_counts[P.U] == 0
+    assert seq.gc_content == 0.5
+    assert seq.melting_temperature == 12.0
+    assert seq.molecular_weight == pytest.approx(1173.84)
+    assert seq.properties is seq.properties
+
+    with pytest.raises(TypeError):
+        seq.amidite_counts[P.A] = 10
+
+
+def test_sequence_properties():
+    assert sequence_properties("ATCG") is sequence_properties("ATCG")
+    assert sequence_properties("ATCG") == Seq("ATCG").properties
+
+
+def test_Seq_properties_long_and_modified():
+    long = Seq("GGGCCCAAATTTGGGCCC")
+    assert long.melting_temperature == pytest.approx(64.9 + 41 * (12 - 16.4) / 18)
+
+    modified = Seq("A5mCU-GalNAc")
+    assert modified.cycle_count == 4
+    assert modified.gc_content == pytest.approx(1 / 3)
+    assert modified.molecular_weight is None
+
+    assert Seq("").molecular_weight == 0.0
+    assert Seq("").gc_content == 0.0
+
+
+def test_builtin_alphabet():
+    assert builtin_alphabet.amidites == set(Phosphoramidite)
+    assert builtin_alphabet.accronyms[Phosphoramidite.GALNAC] == "-GalNAc"
+    assert builtin_alphabet.bases[SeqCategory.RNA] == b"AUCGaucg"
+    assert builtin_alphabet.tokenizer is default_tokenizer
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from openoligo.utils.clock import (
+    RealClock,
+    VirtualClock,
+    VirtualTimeEventLoop,
+    get_clock,
+    run_virtual,
+    use_clock,
+)
+from openoligo.utils.wait import wait_async
+
+
+async def _elapsed(*durations):
+    clock = get_clock()
+    start = clock.now()
+    await asyncio.gather(*(wait_async(duration) for duration in durations))
+    return clock.now() - start
+
+
+def test_run_virtual():
+    start = time.monotonic()
+    assert run_virtual(_elapsed(3600)) == 3600
+    assert run_virtual(_elapsed(100, 50, 75)) == 100
+    assert time.monotonic() - start < 0.5
+
+
+def test_run_virtual_is_deterministic():
+    async def ticks():
+        order = []
+
+        async def tick(name, period):
+            for _ in range(3):
+                await wait_async(period)
+                order.append((name, get_clock().now()))
+
+        await asyncio.gather(tick("a", 2), tick("b", 3))
+        return order
+
+    assert run_virtual(ticks(), start=10) == run_virtual(ticks(), start=10)
+    assert run_virtual(ticks())[:3] == [("a", 2), ("b", 3), ("a", 4)]
+
+
+def test_run_virtual_with_threads():
+    async def in_thread():
+        loop = asyncio.get_running_loop()
+        await wait_async(5)
+        return await loop.run_in_executor(None, sum, [1, 2, 3])
+
+    assert run_virtual(in_thread()) == 6
+
+
+def test_virtual_clock_needs_a_virtual_loop():
+    with use_clock(VirtualClock()):
+        with pytest.raises(RuntimeError):
+            asyncio.run(wait_async(1))
+
+
+def test_virtual_time_event_loop():
+    loop = VirtualTimeEventLoop(start=5)
+    try:
+        assert loop.time() == 5
+        loop.run_until_complete(asyncio.sleep(60))
+        assert loop.time() == pytest.approx(65)
+    finally:
+        loop.close()
+
+
+def test_real_clock_reads_the_speedup_factor():
+    clock = RealClock()
+    assert isinstance(get_clock(), RealClock)
+    with patch.dict("openoligo.utils.sim.__dict__", {"SIMULATION_SPEEDUP_FACTOR": 100}):
+        start = time.monotonic()
+        asyncio.run(clock.sleep(5))
+        assert time.monotonic() - start == pytest.approx(0.05, abs=0.04)
+        assert clock.now() == pytest.approx(time.monotonic() * 100, abs=1)
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from openoligo.utils.clock import Clock, use_clock
+from openoligo.utils.scheduler import DeadlineScheduler, get_scheduler, scheduling
+from openoligo.utils.wait import wait_async
+
+
+class SlowClock(Clock):
+    """Clock whose sleeps always overshoot, and where work between sleeps takes time."""
+
+    def __init__(self, overshoot: float = 0.1):
+        self.time = 0.0
+        self.overshoot = overshoot
+
+    def now(self) -> float:
+        return self.time
+
+    async def sleep(self, seconds: float) -> None:
+        self.time += seconds + self.overshoot
+
+
+async def _relative(clock, waits):
+    for seconds in waits:
+        await clock.sleep(seconds)
+
+
+def test_scheduler_does_not_drift():
+    relative = SlowClock()
+    asyncio.run(_relative(relative, [1] * 100))
+    assert relative.time == pytest.approx(110)  # Every overshoot adds up
+
+    clock = SlowClock()
+    scheduler = DeadlineScheduler(clock)
+
+    async def run():
+        for _ in range(100):
+            await scheduler.wait(1)
+            clock.time += 0.05  # Logging, valves, database
+
+    asyncio.run(run())
+    assert scheduler.planned == 100
+    assert scheduler.drift == pytest.approx(0.15)  # Only the last overshoot and work remain
+    assert scheduler.lateness == pytest.approx([0.1] * 100)
+
+
+def test_scheduler_catches_up():
+    clock = SlowClock(overshoot=0)
+    scheduler = DeadlineScheduler(clock)
+
+    async def run():
+        clock.time += 3  # Late by more than the next wait
+        assert await scheduler.wait(2) == pytest.approx(1)
+        assert await scheduler.wait(2) == 0
+
+    asyncio.run(run())
+    assert scheduler.elapsed == scheduler.planned == 4
+
+
+def test_scheduling():
+    clock = SlowClock(overshoot=0)
+    assert get_scheduler() is None
+    with use_clock(clock), scheduling() as scheduler:
+        assert get_scheduler() is scheduler
+        assert scheduler.clock is clock
+        asyncio.run(wait_async(2))
+        asyncio.run(wait_async(3))
+    assert get_scheduler() is None
+    assert scheduler.planned == 5
+    assert clock.time == 5
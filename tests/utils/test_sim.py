@@ -2,6 +2,8 @@ import os
 from importlib import reload
 from unittest.mock import patch
 
+import pytest
+
 import openoligo.utils.sim as simulation_params
 from openoligo.hal.types import Platform, __platform__
 
@@ -9,6 +11,12 @@ from openoligo.hal.types import Platform, __platform__
 from openoligo.utils.sim import SIMULATION_SPEEDUP_FACTOR
 
 
+@pytest.fixture(autouse=True)
+def restore_simulation_params():
+    yield
+    reload(simulation_params)  # The factor is read at call time, do not leak a patched one
+
+
 def test_simulation_speedup_env_var_set():
     with patch.dict(os.environ, {"OO_SIM_SPEED": "500"}):
         reload(simulation_params)  # This will reload the module with new environment
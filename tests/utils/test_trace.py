@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from openoligo.protocols.compiler import compile_protocol, run_plan
+from openoligo.protocols.oligosynthesis import synthesize_ssdna
+from openoligo.seq import Seq
+from openoligo.steps.types import step, substep
+from openoligo.utils.clock import VirtualClock, run_virtual, use_clock
+from openoligo.utils.trace import Tracer, tracer
+
+
+@pytest.fixture
+def tracing():
+    tracer.start()
+    yield tracer
+    tracer.stop()
+
+
+def test_tracer_disabled_records_nothing():
+    trace = Tracer(capacity=4)
+
+    @trace.traced("test")
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    assert trace.spans() == []
+
+
+def test_tracer_ring_buffer():
+    trace = Tracer(capacity=4)
+    trace.start()
+    for index in range(10):
+        trace.record(f"span {index}", "test", index, index + 1)
+    assert [span[0] for span in trace.spans()] == [f"span {i}" for i in range(6, 10)]
+
+    trace.start()
+    assert trace.spans() == []
+
+
+def test_traced_coroutine_function():
+    trace = Tracer()
+    trace.start()
+
+    @trace.traced("db", name="query")
+    async def query():
+        await asyncio.sleep(0)
+        return 1
+
+    assert asyncio.run(query()) == 1
+    ((name, category, start, end, _, _),) = trace.spans()
+    assert (name, category) == ("query", "db")
+    assert end >= start
+
+
+def test_chrome_trace_export(tmp_path):
+    trace = Tracer()
+    trace.start()
+    trace.record("open", "gpio", 2000, 5000, args={"state": True})
+    path = tmp_path / "task.trace.json"
+    trace.export(str(path))
+
+    events = json.loads(path.read_text())["traceEvents"]
+    span = next(event for event in events if event["ph"] == "X")
+    assert span["name"] == "open"
+    assert span["cat"] == "gpio"
+    assert span["ts"] == 2
+    assert span["dur"] == 3
+    assert span["args"] == {"state": True}
+    assert any(event["ph"] == "M" and event["name"] == "thread_name" for event in events)
+
+
+def test_steps_are_traced(instrument, tracing):  # pylint: disable=redefined-outer-name
+    @substep
+    async def rinse(_instrument):
+        """Rinse"""
+
+    @step
+    async def couple(_instrument):
+        """Couple"""
+        await rinse(_instrument)
+
+    asyncio.run(couple(instrument))
+    assert [(span[0], span[1]) for span in tracing.spans()] == [
+        ("couple", "step"),
+        ("rinse", "substep"),
+    ]
+
+
+def test_plan_run_is_traced(instrument, tracing):  # pylint: disable=redefined-outer-name
+    plan = compile_protocol(synthesize_ssdna, instrument, Seq("ATCG"))
+    assert tracing.spans() == []  # Compiling only records the waits
+
+    with use_clock(VirtualClock()):
+        run_virtual(run_plan(instrument, plan))
+
+    categories = {span[1] for span in tracing.spans()}
+    assert {"hold", "cycle", "gpio"} <= categories
+    assert sum(span[1] == "cycle" for span in tracing.spans()) == len(plan.cycles)
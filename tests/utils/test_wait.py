@@ -4,7 +4,7 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from openoligo.utils.wait import ms, wait, wait_async
+from openoligo.utils.wait import counting_waits, ms, record_waits, recording_waits, wait, wait_async
 
 
 def test_wait():
@@ -24,13 +24,32 @@ def test_wait_async(factor):
         DURATION = 1
         asyncio.run(wait_async(DURATION))
         elapsed_time = time.time() - start_time
-        assert elapsed_time == pytest.approx(
-            (DURATION / SIMULATION_SPEEDUP_FACTOR) / 1000, abs=0.01
-        )
+        assert elapsed_time == pytest.approx(DURATION / SIMULATION_SPEEDUP_FACTOR, abs=0.05)
 
 
 @pytest.mark.asyncio
 async def test_wait_async_calls_sleep():
-    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep, patch.dict(
+        "openoligo.utils.sim.__dict__", {"SIMULATION_SPEEDUP_FACTOR": 1000}
+    ):
         await wait_async(1)
         mock_sleep.assert_awaited_once_with(1 / 1000)
+
+
+def test_record_waits():
+    waits = []
+    with record_waits(waits.append):
+        assert recording_waits()
+        asyncio.run(wait_async(3600))
+        asyncio.run(wait_async(0.5))
+    assert waits == [3600, 0.5]
+    assert not recording_waits()
+
+
+def test_counting_waits():
+    with record_waits(lambda _: None), counting_waits() as outer:
+        asyncio.run(wait_async(1))
+        with counting_waits() as inner:
+            asyncio.run(wait_async(2))
+    assert outer == [1, 2]
+    assert inner == [2]